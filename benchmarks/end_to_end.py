@@ -0,0 +1,91 @@
+"""Time the create, upload and download commands against a local fake API.
+
+Usage::
+
+    python -m benchmarks.end_to_end [--strings N] [--locales L] [--latency S]
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from stringsheet import api
+from stringsheet import main as commands
+from stringsheet.fakesheets import FakeSheetsServer
+from stringsheet.scheduler import RequestScheduler
+
+from . import synthetic
+
+
+@contextlib.contextmanager
+def _silenced():
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+
+def _timed(function, *args, **kwargs):
+    start = time.time()
+    with _silenced():
+        function(*args, **kwargs)
+    return time.time() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--strings', type=int, default=2000)
+    arg_parser.add_argument('--arrays', type=int, default=100)
+    arg_parser.add_argument('--plurals', type=int, default=200)
+    arg_parser.add_argument('--locales', type=int, default=10)
+    arg_parser.add_argument('--latency', type=float, default=0.05,
+                            help='Seconds added to every API response')
+    arg_parser.add_argument('--bandwidth', type=float, default=0,
+                            help='Simulated transfer speed in bytes per '
+                                 'second')
+    arg_parser.add_argument('--multi-sheet', action='store_true')
+    arg_parser.add_argument('--batch-size', type=int,
+                            help='Sheets requested at once by download')
+    arg_parser.add_argument('--connections', type=int, default=4,
+                            help='Concurrent requests of upload and download')
+    args = arg_parser.parse_args()
+
+    # Measure StringSheet itself rather than waiting for Sheets API quotas
+    api.set_scheduler(RequestScheduler([]))
+
+    work_dir = tempfile.mkdtemp()
+    res_dir = os.path.join(work_dir, 'res')
+    target_dir = os.path.join(work_dir, 'downloaded')
+    try:
+        synthetic.generate_res(res_dir, args.strings, args.arrays,
+                               args.plurals, args.locales)
+        with FakeSheetsServer(latency=args.latency,
+                              bandwidth=args.bandwidth) as server:
+            os.environ[api.ENDPOINT_ENV_VAR] = server.url
+            create = _timed(commands.create, 'Benchmark', res_dir,
+                            args.multi_sheet)
+            spreadsheet_id, = server.api.spreadsheets.keys()
+            upload = _timed(commands.upload, spreadsheet_id, res_dir,
+                            connections=args.connections)
+            download = _timed(commands.download, spreadsheet_id, target_dir,
+                              batch_size=args.batch_size,
+                              connections=args.connections)
+    finally:
+        shutil.rmtree(work_dir)
+
+    print('Latency:  %d ms' % (args.latency * 1000))
+    if args.bandwidth:
+        print('Bandwidth: %.1f MB/s' % (args.bandwidth / 1e6))
+    print('Create:   %.3f s' % create)
+    print('Upload:   %.3f s' % upload)
+    print('Download: %.3f s' % download)
+
+
+if __name__ == '__main__':
+    main()
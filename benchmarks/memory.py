@@ -0,0 +1,146 @@
+"""Measure memory retained by models parsed from a large synthetic project.
+
+The models are compared with a baseline of the eager, dict-based layout used
+before: plain objects with instance dictionaries, names which aren't shared
+between languages and missing plural quantities stored as copies of 'other'.
+
+Usage::
+
+    python -m benchmarks.memory [--strings N] [--locales L]
+"""
+import argparse
+import gc
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from lxml import etree
+
+from stringsheet import constants
+from stringsheet import parser
+
+from . import synthetic
+
+
+class _Model(object):
+    """Plain object storing its fields in an instance dictionary."""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def _parse_eager_file(path, resources):
+    latest_comment = ''
+    for element in etree.parse(path).getroot():
+        if element.tag is etree.Comment:
+            latest_comment = element.text.strip()
+            continue
+
+        name = element.get('name')
+        if element.tag == 'string':
+            resources['strings'][name] = _Model(
+                name=name, text=element.text, comment=latest_comment)
+        elif element.tag == 'string-array':
+            resources['arrays'][name] = _Model(
+                name=name, comment=latest_comment,
+                items=[_Model(text=item.text, comment=latest_comment)
+                       for item in element if item.tag == 'item'])
+        elif element.tag == 'plurals':
+            items = dict(
+                (item.get('quantity'),
+                 _Model(quantity=item.get('quantity'), text=item.text,
+                        comment=latest_comment))
+                for item in element if item.tag == 'item')
+            for quantity in constants.QUANTITIES:
+                if quantity not in items:
+                    items[quantity] = _Model(
+                        quantity=quantity, text=items['other'].text,
+                        comment=latest_comment)
+            resources['plurals'][name] = _Model(
+                name=name, comment=latest_comment, items=items)
+        latest_comment = ''
+
+
+def parse_eager(res_dir):
+    """Parse ``res_dir`` into the eager, dict-based layout of the baseline.
+
+    Returns:
+        dict: Dictionaries of strings, arrays and plurals by language.
+    """
+    container = {}
+    for directory in os.listdir(res_dir):
+        if directory == 'values':
+            language = 'default'
+        elif directory.startswith('values-'):
+            language = directory[len('values-'):]
+        else:
+            continue
+
+        resources = {'strings': {}, 'arrays': {}, 'plurals': {}}
+        values_dir = os.path.join(res_dir, directory)
+        for file_name in os.listdir(values_dir):
+            if file_name.endswith('.xml'):
+                _parse_eager_file(os.path.join(values_dir, file_name),
+                                  resources)
+        container[language] = resources
+    return container
+
+
+def _traced(function, argument):
+    """Return the result of ``function(argument)`` with its memory usage."""
+    gc.collect()
+    tracemalloc.start()
+    result = function(argument)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak
+
+
+def measure(res_dir):
+    resources, retained, peak = _traced(parser.parse_resources, res_dir)
+    items = sum(resources[language].item_count()
+                for language in ['default'] + resources.languages())
+    return retained, peak, items
+
+
+def measure_baseline(res_dir):
+    _, retained, peak = _traced(parse_eager, res_dir)
+    return retained, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--strings', type=int, default=5000)
+    arg_parser.add_argument('--arrays', type=int, default=200)
+    arg_parser.add_argument('--plurals', type=int, default=500)
+    arg_parser.add_argument('--locales', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    res_dir = tempfile.mkdtemp()
+    try:
+        synthetic.generate_res(res_dir, args.strings, args.arrays,
+                               args.plurals, args.locales)
+        retained, peak, items = measure(res_dir)
+        baseline_retained, baseline_peak = measure_baseline(res_dir)
+    finally:
+        shutil.rmtree(res_dir)
+
+    mib = 1024.0 * 1024.0
+    print('Items: %d' % items)
+    print('%-16s %10s %10s %7s' % ('', 'models', 'baseline', 'ratio'))
+    print('%-16s %10.1f %10.1f %6.2fx'
+          % ('Retained (MiB)', retained / mib, baseline_retained / mib,
+             retained / float(baseline_retained)))
+    print('%-16s %10.1f %10.1f %6.2fx'
+          % ('Peak (MiB)', peak / mib, baseline_peak / mib,
+             peak / float(baseline_peak)))
+    print('%-16s %10.1f %10.1f %6.2fx'
+          % ('Bytes per item', retained / float(items),
+             baseline_retained / float(items),
+             retained / float(baseline_retained)))
+
+
+if __name__ == '__main__':
+    main()
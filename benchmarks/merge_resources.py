@@ -0,0 +1,70 @@
+"""Compare merging resources entry by entry with ``Resources.merge``.
+
+Usage::
+
+    python -m benchmarks.merge_resources [--strings N] [--overlap F]
+"""
+import argparse
+import timeit
+
+from stringsheet import model
+
+
+def merge_sorted(resources, other):
+    """The previous merge of ``ResourceContainer.update``."""
+    for string in other.sorted_strings:
+        resources.add_string(string)
+    for array in other.sorted_arrays:
+        resources.add_array(array)
+    for plural in other.sorted_plurals:
+        resources.add_plural(plural)
+
+
+def generate_resources(strings, start=0):
+    """Create resources with ``strings`` strings and a tenth as many arrays
+    and plurals, named from ``start``.
+    """
+    resources = model.Resources()
+    for index in range(start, start + strings):
+        resources.add_string(model.String('string_%d' % index, 'Text', ''))
+    for index in range(start, start + strings // 10):
+        name = 'array_%d' % index
+        for item in range(3):
+            resources.add_array_item(name, 'Item', '', item)
+        resources.add_plural_item('plural_%d' % index, 'Other', '', 'other')
+    return resources
+
+
+def _timed_merge(merge, existing, other, repeat):
+    def run():
+        resources = model.Resources()
+        resources.merge(existing)
+        merge(resources, other)
+    return min(timeit.repeat(run, number=1, repeat=repeat))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--strings', type=int, default=200000)
+    arg_parser.add_argument('--overlap', type=float, default=0.5,
+                            help='Fraction of names present in both models')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    existing = generate_resources(args.strings)
+    other = generate_resources(
+        args.strings, int(args.strings * (1 - args.overlap)))
+
+    old = _timed_merge(merge_sorted, existing, other, args.repeat)
+    new = _timed_merge(model.Resources.merge, existing, other, args.repeat)
+    base = _timed_merge(lambda resources, other: None, existing, other,
+                        args.repeat)
+
+    print('Merged %d into %d entries' % (other.count(), existing.count()))
+    print('Sorted properties: %.3f s' % (old - base))
+    print('Resources.merge:   %.3f s' % (new - base))
+    print('Speedup:           %.1fx' % ((old - base) / (new - base)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Time parsing of spreadsheet values into resources.
+
+Compares the single pass parser with the previous implementation which
+validated every row and matched its id again for each language column.
+
+Usage::
+
+    python -m benchmarks.parse_spreadsheet [--rows N] [--locales L]
+"""
+import argparse
+import timeit
+
+from stringsheet import comparator
+from stringsheet import model
+from stringsheet import parser
+
+from . import synthetic
+
+
+def parse_per_column(resource_container, values):
+    """The previous ``parser.parse_spreadsheet_values``."""
+    title_row = values[0]
+
+    for lang_index in range(2, len(title_row)):
+        language = title_row[lang_index]
+
+        resources = model.Resources()
+        for row in values[1:]:
+            column_count = len(row)
+            if column_count < 3:
+                break
+
+            translation = row[lang_index] if column_count > lang_index else ''
+            string_id = row[0]
+            comment = row[1]
+            default_text = row[2]
+
+            if not string_id or not default_text:
+                break
+
+            if ' ' in string_id:
+                break
+
+            array_match = comparator.ARRAY_ID_PATTERN.match(string_id)
+            if array_match:
+                name = array_match.group(1)
+                index = int(array_match.group(2))
+                resources.add_array_item(name, translation, comment, index)
+                continue
+
+            plural_match = comparator.PLURAL_ID_PATTERN.match(string_id)
+            if plural_match:
+                name = plural_match.group(1)
+                quantity = plural_match.group(2)
+                resources.add_plural_item(name, translation, comment, quantity)
+                continue
+
+            resources.add_string(model.String(string_id, translation, comment))
+
+        resource_container.update(language, resources)
+
+
+def _parse(function, values):
+    container = model.ResourceContainer()
+    function(container, values)
+    return container
+
+
+def _texts(container, values):
+    keys = [comparator.parse_string_id(row[0]) for row in values[1:]]
+    return dict((language, container[language].get_texts(keys))
+                for language in values[0][2:])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--rows', type=int, default=20000)
+    arg_parser.add_argument('--locales', type=int, default=97,
+                            help='Language columns next to id, comment and '
+                                 'default')
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    values = synthetic.spreadsheet_values(args.rows, args.locales)
+    if (_texts(_parse(parse_per_column, values), values) !=
+            _texts(_parse(parser.parse_spreadsheet_values, values), values)):
+        raise SystemExit('Parsed resources are different')
+
+    old = min(timeit.repeat(lambda: _parse(parse_per_column, values),
+                            number=1, repeat=args.repeat))
+    new = min(timeit.repeat(
+        lambda: _parse(parser.parse_spreadsheet_values, values),
+        number=1, repeat=args.repeat))
+
+    print('Parsed %d rows x %d columns' % (args.rows, len(values[0])))
+    print('Per column parse:  %.3f s' % old)
+    print('Single pass parse: %.3f s' % new)
+    print('Speedup:           %.1fx' % (old / new))
+
+
+if __name__ == '__main__':
+    main()
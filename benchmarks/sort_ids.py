@@ -0,0 +1,58 @@
+"""Compare sorting spreadsheet ids with a comparison function and a key.
+
+Usage::
+
+    python -m benchmarks.sort_ids [--count N]
+"""
+import argparse
+import functools
+import random
+import timeit
+
+from stringsheet import comparator
+from stringsheet import constants
+
+
+def generate_ids(count, seed=0):
+    rng = random.Random(seed)
+    ids = []
+    while len(ids) < count:
+        name = 'string_%d' % rng.randint(0, count)
+        kind = rng.random()
+        if kind < 0.6:
+            ids.append(name)
+        elif kind < 0.8:
+            ids.extend('%s[%d]' % (name, index) for index in range(3))
+        else:
+            ids.extend('%s{%s}' % (name, quantity)
+                       for quantity in constants.QUANTITIES)
+    ids = ids[:count]
+    rng.shuffle(ids)
+    return ids
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--count', type=int, default=100000)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    ids = generate_ids(args.count)
+    cmp_key = functools.cmp_to_key(comparator.compare_strings)
+
+    if sorted(ids, key=cmp_key) != sorted(ids, key=comparator.string_order):
+        raise SystemExit('Orders are different')
+
+    old = min(timeit.repeat(lambda: sorted(ids, key=cmp_key),
+                            number=1, repeat=args.repeat))
+    new = min(timeit.repeat(lambda: sorted(ids, key=comparator.string_order),
+                            number=1, repeat=args.repeat))
+
+    print('Sorted %d ids' % len(ids))
+    print('cmp_to_key(compare_strings): %.3f s' % old)
+    print('string_order key:            %.3f s' % new)
+    print('Speedup:                     %.1fx' % (old / new))
+
+
+if __name__ == '__main__':
+    main()
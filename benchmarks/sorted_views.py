@@ -0,0 +1,87 @@
+"""Time repeated traversals of the sorted views of resources.
+
+Creates spreadsheet values and writes strings files of all languages, which
+walk the sorted strings, arrays and plurals of each language several times.
+
+Usage::
+
+    python -m benchmarks.sorted_views [--strings N] [--locales L]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+from stringsheet import model
+from stringsheet import parser
+from stringsheet import writer
+
+from . import synthetic
+
+
+def _traverse(resources):
+    parser.create_spreadsheet_values(resources)
+    for language in ['default'] + resources.languages():
+        writer.get_strings_text(resources[language])
+
+
+def _sorted_views(resources):
+    for language in ['default'] + resources.languages():
+        strings = resources[language]
+        strings.sorted_strings
+        strings.sorted_arrays
+        strings.sorted_plurals
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--strings', type=int, default=20000)
+    arg_parser.add_argument('--arrays', type=int, default=1000)
+    arg_parser.add_argument('--plurals', type=int, default=2000)
+    arg_parser.add_argument('--locales', type=int, default=10)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    res_dir = tempfile.mkdtemp()
+    try:
+        synthetic.generate_res(res_dir, args.strings, args.arrays,
+                               args.plurals, args.locales)
+        resources = parser.parse_resources(res_dir)
+    finally:
+        shutil.rmtree(res_dir)
+
+    def parse_and_sort():
+        copy = model.ResourceContainer()
+        for language in ['default'] + resources.languages():
+            copy[language] = model.Resources()
+            copy[language].merge(resources[language])
+        _sorted_views(copy)
+
+    first = min(timeit.repeat(parse_and_sort, number=1, repeat=args.repeat))
+    cached = min(timeit.repeat(lambda: _sorted_views(resources), number=1,
+                               repeat=args.repeat))
+
+    def add_and_sort():
+        strings = model.Resources()
+        strings.merge(resources['default'])
+        strings.sorted_strings
+        for index in range(100):
+            strings.add_string(model.String('added_%d' % index, 'Text', ''))
+            strings.sorted_strings
+
+    incremental = min(timeit.repeat(add_and_sort, number=1,
+                                    repeat=args.repeat))
+    traverse = min(timeit.repeat(lambda: _traverse(resources), number=1,
+                                 repeat=args.repeat))
+
+    print('Languages: %d, entries per language: %d'
+          % (len(resources), resources['default'].count()))
+    print('First access of sorted views: %.4f s' % first)
+    print('Cached sorted views:          %.4f s' % cached)
+    print('100 additions with accesses:  %.4f s' % incremental)
+    print('Values and strings files:     %.3f s' % traverse)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Measure startup time of the command line interface.
+
+Reports the import time of ``stringsheet.cli`` measured with
+``python -X importtime`` and the wall time of ``stringsheet --version``.
+Exits with an error when the import time exceeds the budget or when a heavy
+dependency is imported at startup.
+
+Usage::
+
+    python -m benchmarks.startup [--budget MS] [--top N]
+"""
+import argparse
+import re
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ('lxml', 'googleapiclient', 'apiclient', 'httplib2',
+                 'oauth2client')
+"""Dependencies which should only be imported by the commands using them."""
+
+_IMPORT_TIME_PATTERN = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+def import_times(module):
+    """Return ``(self_us, cumulative_us, depth, name)`` of each import."""
+    process = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, stderr = process.communicate()
+    if process.returncode:
+        raise SystemExit(stderr.decode('utf-8', 'replace'))
+
+    times = []
+    for line in stderr.decode('utf-8').splitlines():
+        match = _IMPORT_TIME_PATTERN.match(line)
+        if match:
+            times.append((int(match.group(1)), int(match.group(2)),
+                          (len(match.group(3)) - 1) // 2, match.group(4)))
+    return times
+
+
+def version_time(repeat):
+    command = [sys.executable, '-m', 'stringsheet.cli', '--version']
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        subprocess.check_call(command, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--budget', type=float, default=50,
+                            help='Maximum import time of stringsheet.cli in '
+                                 'milliseconds')
+    arg_parser.add_argument('--top', type=int, default=10,
+                            help='Number of slowest imports to show')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    times = import_times('stringsheet.cli')
+    total = max(cumulative for _, cumulative, _, name in times
+                if name == 'stringsheet.cli')
+    heavy = sorted(set(name for _, _, _, name in times
+                       if name.split('.')[0] in HEAVY_MODULES))
+
+    print('Import stringsheet.cli:     %.1f ms' % (total / 1000.0))
+    print('stringsheet --version:      %.1f ms'
+          % (version_time(args.repeat) * 1000))
+    print('Slowest imports (self time):')
+    for self_us, cumulative, _, name in sorted(times, reverse=True)[:args.top]:
+        print(' > %-40s %7.1f ms (%.1f ms cumulative)'
+              % (name, self_us / 1000.0, cumulative / 1000.0))
+
+    errors = []
+    if heavy:
+        errors.append('Heavy modules imported at startup: ' +
+                      ', '.join(heavy))
+    if total / 1000.0 > args.budget:
+        errors.append('Import time %.1f ms exceeds budget of %.1f ms'
+                      % (total / 1000.0, args.budget))
+    if errors:
+        raise SystemExit('\n'.join(errors))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Time the core operations on synthetic projects of several sizes.
+
+Results are compared with ``benchmarks/baseline.json`` and operations which
+became slower than the baseline by more than the threshold are reported as
+regressions.
+
+Each run of an operation follows a run of a fixed calibration workload and
+the comparison uses the ratio of the two times. This keeps the comparison
+meaningful on machines whose speed varies between and during runs, but
+baselines are still specific to the machine they were recorded on. Record a
+new one with ``--save-baseline`` before comparing changes.
+
+Usage::
+
+    python -m benchmarks.suite [--sizes small,medium] [--save-baseline]
+"""
+import argparse
+import collections
+import json
+import os
+import pickle
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from stringsheet import model
+from stringsheet import parser
+from stringsheet import writer
+
+from . import synthetic
+
+Size = collections.namedtuple(
+    'Size', ['strings', 'arrays', 'plurals', 'locales', 'files'])
+
+SIZES = collections.OrderedDict([
+    ('small', Size(1000, 100, 100, 5, 1)),
+    ('medium', Size(5000, 500, 500, 20, 2)),
+    ('large', Size(20000, 2000, 2000, 50, 4)),
+])
+"""Synthetic projects by name. Each has 80% of its strings translated."""
+
+OPERATIONS = ('parse_resources', 'create_spreadsheet_values',
+              'parse_spreadsheet_values', 'write_strings_to_directory')
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'baseline.json')
+
+_CALIBRATION_WORDS = ['string_%d' % (i * 7919 % 20000) for i in range(20000)]
+
+
+def _calibrate():
+    """Return the time of a fixed workload independent of stringsheet."""
+    start = time.time()
+    sorted(_CALIBRATION_WORDS, key=str.lower)
+    return time.time() - start
+
+
+def _best_of(function, setup, repeat):
+    """Time ``function(argument)`` where ``argument`` is returned by ``setup``.
+
+    Only the call of ``function`` is timed. ``setup`` returns a tuple
+    ``(argument, cleanup)`` and ``cleanup`` is called after each call unless
+    it is ``None``.
+
+    Returns:
+        dict: The shortest time in ``seconds`` and the lowest ratio of a time
+        to the calibration run just before it as ``relative``.
+    """
+    best = None
+    relative = None
+    for _ in range(repeat):
+        argument, cleanup = setup()
+        try:
+            calibration = _calibrate()
+            start = time.time()
+            function(argument)
+            seconds = time.time() - start
+        finally:
+            if cleanup:
+                cleanup()
+        best = seconds if best is None else min(best, seconds)
+        ratio = seconds / calibration
+        relative = ratio if relative is None else min(relative, ratio)
+    return {'seconds': best, 'relative': relative}
+
+
+def _copy(resources):
+    # Copies don't share the cached sorted views of the original
+    return pickle.loads(pickle.dumps(resources, pickle.HIGHEST_PROTOCOL))
+
+
+def run_size(size, repeat):
+    """Time all operations on a synthetic project of the given ``size``.
+
+    Returns:
+        dict: Timings of each operation as returned by ``_best_of``.
+    """
+    work_dir = tempfile.mkdtemp()
+    res_dir = os.path.join(work_dir, 'res')
+    try:
+        synthetic.generate_res(res_dir, size.strings, size.arrays,
+                               size.plurals, size.locales, files=size.files)
+        resources = parser.parse_resources(res_dir)
+        values = parser.create_spreadsheet_values(resources)
+
+        def target_dir():
+            path = tempfile.mkdtemp(dir=work_dir)
+            return path, lambda: shutil.rmtree(path)
+
+        return {
+            'parse_resources': _best_of(
+                parser.parse_resources, lambda: (res_dir, None), repeat),
+            'create_spreadsheet_values': _best_of(
+                parser.create_spreadsheet_values,
+                lambda: (_copy(resources), None), repeat),
+            'parse_spreadsheet_values': _best_of(
+                lambda values: parser.parse_spreadsheet_values(
+                    model.ResourceContainer(), values),
+                lambda: (values, None), repeat),
+            'write_strings_to_directory': _best_of(
+                lambda path: writer.write_strings_to_directory(
+                    resources, path),
+                target_dir, repeat),
+        }
+    finally:
+        shutil.rmtree(work_dir)
+
+
+def load_baseline(path):
+    """Return the stored results of sizes which didn't change since."""
+    try:
+        with open(path) as f:
+            baseline = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    sizes = baseline.get('sizes', {})
+    return dict((name, timings)
+                for name, timings in baseline.get('results', {}).items()
+                if name in SIZES and sizes.get(name) == SIZES[name]._asdict())
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'sizes': dict((name, SIZES[name]._asdict()) for name in results),
+            'results': results
+        }, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, threshold):
+    """Print results next to the baseline.
+
+    Returns:
+        list: ``(size, operation, ratio)`` of regressions.
+    """
+    regressions = []
+    print('%-7s %-27s %9s %9s %7s'
+          % ('size', 'operation', 'seconds', 'baseline', 'ratio'))
+    for name, timings in results.items():
+        for operation in OPERATIONS:
+            timing = timings[operation]
+            base = baseline.get(name, {}).get(operation)
+            if not base:
+                print('%-7s %-27s %9.3f %9s %7s'
+                      % (name, operation, timing['seconds'], '-', '-'))
+                continue
+
+            ratio = timing['relative'] / base['relative']
+            mark = ''
+            if ratio > threshold:
+                mark = '  REGRESSION'
+                regressions.append((name, operation, ratio))
+            print('%-7s %-27s %9.3f %9.3f %6.2fx%s'
+                  % (name, operation, timing['seconds'], base['seconds'],
+                     ratio, mark))
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--sizes', default='small,medium',
+                            help='Comma separated names of sizes: %s'
+                                 % ', '.join(SIZES))
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--baseline', default=BASELINE_PATH)
+    arg_parser.add_argument('--threshold', type=float, default=1.25,
+                            help='Ratio to the baseline reported as a '
+                                 'regression')
+    arg_parser.add_argument('--save-baseline', action='store_true',
+                            help='Store the results as the new baseline')
+    args = arg_parser.parse_args()
+
+    names = [name.strip() for name in args.sizes.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SIZES]
+    if unknown:
+        arg_parser.error('unknown sizes: %s' % ', '.join(unknown))
+
+    results = collections.OrderedDict()
+    for name in names:
+        results[name] = run_size(SIZES[name], args.repeat)
+
+    if args.save_baseline:
+        baseline = load_baseline(args.baseline)
+        baseline.update(results)
+        save_baseline(args.baseline, baseline)
+        print('Saved baseline to %s' % args.baseline)
+
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results, baseline, args.threshold)
+    missing = [name for name in results
+               if not all(operation in baseline.get(name, {})
+                          for operation in OPERATIONS)]
+    if regressions:
+        print()
+        print('%d operations are slower than the baseline by more than '
+              '%.0f%%' % (len(regressions), (args.threshold - 1) * 100))
+    if missing:
+        print()
+        print('No baseline for sizes: %s. Record it with --save-baseline '
+              '--sizes %s' % (', '.join(missing), ','.join(missing)))
+    if regressions or missing:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Generator of synthetic Android ``res`` directories for benchmarks."""
+import itertools
+import os
+import random
+import string
+
+from xml.sax.saxutils import escape
+
+_WORDS = ('lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur',
+          'adipiscing', 'elit', 'sed', 'do', 'eiusmod', 'tempor')
+
+
+def language_codes(count):
+    """Return ``count`` distinct two letter language codes."""
+    letters = string.ascii_lowercase
+    codes = (''.join(pair) for pair in itertools.product(letters, repeat=2))
+    return list(itertools.islice(codes, count))
+
+
+def _text(rng, suffix):
+    words = rng.sample(_WORDS, rng.randint(2, 6))
+    return escape(' '.join(words)) + ' ' + suffix
+
+
+def _write_strings_file(path, lines):
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<resources>\n')
+        f.write('\n'.join(lines))
+        f.write('\n</resources>\n')
+
+
+def _values_elements(rng, suffix, strings, arrays, plurals, array_size,
+                     fill_ratio, comment_ratio, is_default):
+    """Return the lines of each element, preceded by its comment."""
+    elements = []
+
+    def include():
+        return is_default or rng.random() < fill_ratio
+
+    def element(name):
+        lines = []
+        if is_default and comment_ratio and rng.random() < comment_ratio:
+            lines.append('\t<!-- Comment for %s -->' % name)
+        elements.append(lines)
+        return lines
+
+    for index in range(strings):
+        name = 'string_%d' % index
+        if include():
+            element(name).append('\t<string name="%s">%s</string>'
+                                 % (name, _text(rng, suffix)))
+
+    for index in range(arrays):
+        name = 'array_%d' % index
+        if include():
+            lines = element(name)
+            lines.append('\t<string-array name="%s">' % name)
+            for _ in range(array_size):
+                lines.append('\t\t<item>%s</item>' % _text(rng, suffix))
+            lines.append('\t</string-array>')
+
+    for index in range(plurals):
+        name = 'plural_%d' % index
+        if include():
+            lines = element(name)
+            lines.append('\t<plurals name="%s">' % name)
+            # Only some quantities are defined so that the remaining ones are
+            # filled from "other".
+            for quantity in ('one', 'other'):
+                lines.append('\t\t<item quantity="%s">%s</item>'
+                             % (quantity, _text(rng, suffix)))
+            lines.append('\t</plurals>')
+
+    return elements
+
+
+def generate_res(directory, strings=1000, arrays=100, plurals=100, locales=10,
+                 array_size=3, fill_ratio=0.8, comment_ratio=0.3, seed=0,
+                 files=1):
+    """Generate a synthetic ``res`` directory.
+
+    Args:
+        directory (str): The path of the res directory to create.
+        strings (int): Number of <string> tags in the default language.
+        arrays (int): Number of <string-array> tags in the default language.
+        plurals (int): Number of <plurals> tags in the default language.
+        locales (int): Number of translated languages.
+        array_size (int): Number of items in each array.
+        fill_ratio (float): Fraction of strings that are translated in each
+            language.
+        comment_ratio (float): Fraction of default strings with a comment.
+            No comments are added if 0.
+        seed (int): Seed of the random generator used to create texts.
+        files (int): Number of XML files the strings of each language are
+            split into. Limited to the number of strings of the language.
+
+    Returns:
+        list: The generated language codes.
+    """
+    rng = random.Random(seed)
+    languages = ['default'] + language_codes(locales)
+    for language in languages:
+        if language == 'default':
+            values_dir = os.path.join(directory, 'values')
+        else:
+            values_dir = os.path.join(directory, 'values-' + language)
+        if not os.path.isdir(values_dir):
+            os.makedirs(values_dir)
+
+        elements = _values_elements(rng, language, strings, arrays, plurals,
+                                    array_size, fill_ratio, comment_ratio,
+                                    language == 'default')
+        num_files = max(1, min(files, len(elements)))
+        per_file = -(-len(elements) // num_files)
+        for index in range(num_files):
+            file_name = 'strings_%d.xml' % index if index else 'strings.xml'
+            file_elements = elements[index * per_file:(index + 1) * per_file]
+            _write_strings_file(
+                os.path.join(values_dir, file_name),
+                [line for lines in file_elements for line in lines])
+    return languages[1:]
+
+
+def spreadsheet_values(rows=1000, locales=10, fill_ratio=0.8, seed=0):
+    """Generate values of a single sheet with all languages.
+
+    About 60% of the rows are regular strings, 20% array items and 20%
+    plural items, in the layout returned by the Sheets API.
+
+    Args:
+        rows (int): Number of string rows below the header.
+        locales (int): Number of translated language columns.
+        fill_ratio (float): Fraction of translated cells.
+        seed (int): Seed of the random generator used to create texts.
+
+    Returns:
+        list: Rows of the sheet including the header row.
+    """
+    rng = random.Random(seed)
+    languages = language_codes(locales)
+    values = [['id', 'comment', 'default'] + languages]
+    index = 0
+    while len(values) <= rows:
+        name = 'string_%d' % index
+        index += 1
+        kind = rng.random()
+        if kind < 0.6:
+            ids = [name]
+        elif kind < 0.8:
+            ids = ['%s[%d]' % (name, item) for item in range(3)]
+        else:
+            ids = ['%s{%s}' % (name, quantity)
+                   for quantity in ('one', 'few', 'many', 'other')]
+        for string_id in ids:
+            comment = 'Comment' if rng.random() < 0.3 else ''
+            row = [string_id, comment, _text(rng, 'default')]
+            row.extend(_text(rng, language)
+                       if rng.random() < fill_ratio else ''
+                       for language in languages)
+            values.append(row)
+    return values[:rows + 1]
@@ -0,0 +1,25 @@
+"""Conversion of column indexes to and from the A1 notation of ranges."""
+
+
+def column_index(name):
+    """Return the index of the column with the specified A1 notation name.
+
+    Example: ``A`` -> ``0``, ``AB`` -> ``27``
+    """
+    index = 0
+    for char in name:
+        index = index * 26 + ord(char) - ord('A') + 1
+    return index - 1
+
+
+def column_name(index):
+    """Return the A1 notation name of the column with the specified index.
+
+    Example: ``0`` -> ``A``, ``27`` -> ``AB``
+    """
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
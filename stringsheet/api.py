@@ -1,15 +1,34 @@
+import json
 import os
+import socket
 import sys
+import tempfile
+import threading
+import time
 import webbrowser
 
 import httplib2
 from apiclient import discovery
+from apiclient import errors
 from oauth2client import client
 from oauth2client.file import Storage
 
+from . import scheduler as request_scheduler
+
 SCOPES = 'https://www.googleapis.com/auth/spreadsheets'
 CLIENT_SECRET_FILE = 'client_secret.json'
 APPLICATION_NAME = 'StringSheet'
+DISCOVERY_URL = 'https://sheets.googleapis.com/$discovery/rest?version=v4'
+
+ENDPOINT_ENV_VAR = 'STRINGSHEET_ENDPOINT'
+"""Environment variable with the base URL of an alternative API server."""
+
+DISCOVERY_CACHE_FILE = 'sheets.googleapis.discovery.v4.json'
+DISCOVERY_CACHE_TTL = 24 * 60 * 60
+"""Number of seconds after which the cached discovery document is fetched
+again."""
+
+_replace = getattr(os, 'replace', os.rename)
 
 _BROWSER_OPENED_MESSAGE = """
 Your browser has been opened to visit:
@@ -20,6 +39,75 @@ Your browser has been opened to visit:
 _CODE_PROMPT = 'Please authenticate and enter verification code: '
 
 
+class TrafficCounter(object):
+    """Thread-safe totals of HTTP requests sent by services.
+
+    Sizes are of the request URI and body and of the response content after
+    decompression, HTTP headers are not counted.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    def add(self, bytes_sent, bytes_received):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+
+
+class _CountingHttp(object):
+    """Wrapper of an ``httplib2.Http`` compatible transport counting traffic.
+    """
+
+    def __init__(self, http, counter):
+        self._http = http
+        self._counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
+
+    def request(self, uri, method='GET', body=None, *args, **kwargs):
+        response, content = self._http.request(uri, method, body, *args,
+                                               **kwargs)
+        self._counter.add(len(uri) + (len(body) if body else 0),
+                          len(content) if content else 0)
+        return response, content
+
+
+_scheduler = request_scheduler.RequestScheduler()
+
+_traffic = TrafficCounter()
+
+
+def get_traffic():
+    """Return the counter of HTTP traffic of all services."""
+    return _traffic
+
+
+def get_scheduler():
+    """Return the scheduler used to execute all API requests."""
+    return _scheduler
+
+
+def set_scheduler(scheduler):
+    """Replace the scheduler used to execute all API requests."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def _execute(request, idempotent=None):
+    return _scheduler.execute(request, idempotent)
+
+
+def _get_credential_dir():
+    home_dir = os.path.expanduser('~')
+    return os.path.join(home_dir, '.cache', 'credentials')
+
+
 def _get_credentials():
     """Get valid user credentials from storage.
 
@@ -29,8 +117,7 @@ def _get_credentials():
     Returns:
         Credentials, the obtained credential.
     """
-    home_dir = os.path.expanduser('~')
-    credential_dir = os.path.join(home_dir, '.cache', 'credentials')
+    credential_dir = _get_credential_dir()
     if not os.path.exists(credential_dir):
         os.makedirs(credential_dir)
     credential_path = os.path.join(
@@ -73,44 +160,187 @@ def _get_credentials():
     return credentials
 
 
-def get_service():
-    """Construct a Resource for interacting with Google Spreadsheets API."""
+def create_http(endpoint=None):
+    """Create the HTTP transport used to send API requests.
+
+    Requests sent to a custom ``endpoint`` are not authenticated.
+    """
+    if endpoint:
+        return httplib2.Http()
     credentials = _get_credentials()
-    http = credentials.authorize(httplib2.Http())
-    discovery_url = 'https://sheets.googleapis.com/$discovery/rest?version=v4'
-    return discovery.build('sheets', 'v4', http=http,
-                           discoveryServiceUrl=discovery_url)
+    return credentials.authorize(httplib2.Http())
+
+
+def create_service_factory(endpoint=None):
+    """Authenticate once and return a function creating new services.
+
+    Services aren't thread-safe. Each service created by the returned
+    function has its own HTTP transport, but all of them share the
+    credentials read here, so threads never start the OAuth2 flow.
+
+    Args:
+        endpoint (str): The base URL of a server implementing the Sheets API.
+            Read from the ``STRINGSHEET_ENDPOINT`` environment variable if
+            not specified.
+    """
+    if endpoint is None:
+        endpoint = os.environ.get(ENDPOINT_ENV_VAR)
+    credentials = None if endpoint else _get_credentials()
+
+    def create_service():
+        http = httplib2.Http()
+        if credentials is not None:
+            http = credentials.authorize(http)
+        return get_service(http, endpoint)
+
+    return create_service
+
+
+def get_discovery_url(endpoint=None):
+    if not endpoint:
+        return DISCOVERY_URL
+    return endpoint.rstrip('/') + '/$discovery/rest?version=v4'
+
+
+def _fetch_discovery_document(http, url):
+    resp, content = http.request(url)
+    if resp.status >= 400:
+        raise errors.HttpError(resp, content, uri=url)
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    return content
+
+
+def _read_cached_discovery(cache_path, url):
+    try:
+        with open(cache_path) as f:
+            entry = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if (entry.get('url') != url or entry.get('version') != 'v4' or
+            'document' not in entry):
+        return None
+    return entry
+
+
+def _write_cached_discovery(cache_path, url, document, fetched):
+    version = json.loads(document).get('version')
+    directory = os.path.dirname(cache_path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'url': url, 'version': version, 'fetched': fetched,
+                       'document': document}, f)
+        _replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def load_discovery_document(http, url=DISCOVERY_URL, cache_path=None,
+                            ttl=DISCOVERY_CACHE_TTL, clock=time.time):
+    """Return the discovery document of Sheets API, using a local copy.
+
+    The document is cached next to the stored credentials. A cached copy is
+    used when it was fetched from the same ``url`` within ``ttl`` seconds and
+    describes the v4 version of the API. When fetching of a newer copy fails,
+    for example because there is no network connection, the expired copy is
+    used instead.
+
+    Args:
+        http: The ``httplib2.Http`` compatible transport used to fetch the
+            document.
+        url (str): The URL of the discovery document.
+        cache_path (str): The path of the cache file. Defaults to a file in
+            the credentials directory.
+        ttl (float): Maximum age of the cached copy in seconds.
+        clock: Function returning the current time in seconds.
+
+    Returns:
+        str: The discovery document as JSON text.
+    """
+    if cache_path is None:
+        cache_path = os.path.join(_get_credential_dir(), DISCOVERY_CACHE_FILE)
+
+    now = clock()
+    entry = _read_cached_discovery(cache_path, url)
+    if entry and 0 <= now - entry.get('fetched', 0) < ttl:
+        return entry['document']
+
+    try:
+        document = _fetch_discovery_document(http, url)
+    except (errors.HttpError, httplib2.HttpLib2Error, socket.error):
+        if entry:
+            return entry['document']
+        raise
+
+    try:
+        _write_cached_discovery(cache_path, url, document, now)
+    except (IOError, OSError, ValueError):
+        # Caching is only an optimization
+        pass
+    return document
+
+
+def get_service(http=None, endpoint=None):
+    """Construct a Resource for interacting with Google Spreadsheets API.
+
+    Args:
+        http: The ``httplib2.Http`` compatible transport used to send
+            requests. Authorized with the stored credentials if not specified.
+        endpoint (str): The base URL of a server implementing the Sheets API,
+            for example ``stringsheet.fakesheets``. Read from the
+            ``STRINGSHEET_ENDPOINT`` environment variable if not specified.
+            Google servers are used if neither is set. The discovery document
+            is only cached for Google servers.
+    """
+    if endpoint is None:
+        endpoint = os.environ.get(ENDPOINT_ENV_VAR)
+    if http is None:
+        http = create_http(endpoint)
+    http = _CountingHttp(http, _traffic)
+    if endpoint:
+        return discovery.build('sheets', 'v4', http=http,
+                               discoveryServiceUrl=get_discovery_url(endpoint),
+                               cache_discovery=False)
+
+    document = load_discovery_document(http)
+    return discovery.build_from_document(document, http=http)
 
 
 def create_spreadsheet(service, body):
-    return service.spreadsheets().create(body=body).execute()
+    return _execute(service.spreadsheets().create(body=body))
 
 
-def get_spreadsheet(service, spreadsheet_id):
-    return service.spreadsheets().get(
-        spreadsheetId=spreadsheet_id
-    ).execute()
+def get_spreadsheet(service, spreadsheet_id, fields=None):
+    return _execute(service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        fields=fields
+    ))
 
 
 def batch_update_values(service, spreadsheet_id, body):
-    return service.spreadsheets().values().batchUpdate(
+    # Writing the same values to the same ranges again has no other effect
+    return _execute(service.spreadsheets().values().batchUpdate(
         spreadsheetId=spreadsheet_id,
         body=body
-    ).execute()
+    ), idempotent=True)
 
 
 def batch_get_values(service, spreadsheet_id, ranges):
-    return service.spreadsheets().values().batchGet(
+    return _execute(service.spreadsheets().values().batchGet(
         spreadsheetId=spreadsheet_id,
         ranges=ranges
-    ).execute()
+    ))
 
 
 def batch_update(service, spreadsheet_id, requests):
-    return service.spreadsheets().batchUpdate(
+    return _execute(service.spreadsheets().batchUpdate(
         spreadsheetId=spreadsheet_id,
         body={"requests": requests}
-    ).execute()
+    ))
 
 
 def create_add_sheet_request(sheet_id, title):
@@ -124,6 +354,33 @@ def create_add_sheet_request(sheet_id, title):
     }
 
 
+def create_insert_rows_request(sheet_id, start_index, end_index):
+    return {
+        'insertDimension': {
+            'range': {
+                'sheetId': sheet_id,
+                'dimension': 'ROWS',
+                'startIndex': start_index,
+                'endIndex': end_index
+            },
+            'inheritFromBefore': False
+        }
+    }
+
+
+def create_delete_rows_request(sheet_id, start_index, end_index):
+    return {
+        'deleteDimension': {
+            'range': {
+                'sheetId': sheet_id,
+                'dimension': 'ROWS',
+                'startIndex': start_index,
+                'endIndex': end_index
+            }
+        }
+    }
+
+
 def create_value_range(language, values):
     return {
         'range': language + "!A:Z",
@@ -0,0 +1,139 @@
+import errno
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import zlib
+
+from . import model
+from . import parser
+
+CACHE_VERSION = 3
+"""Version of the cache format.
+
+Must be increased whenever the format or the pickled models change so that
+stale entries are parsed again.
+"""
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def get_default_directory():
+    """Return the default location of the parse cache."""
+    home_dir = os.path.expanduser('~')
+    return os.path.join(home_dir, '.cache', 'stringsheet', 'parse')
+
+
+def _file_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def _modification_time(stat):
+    return getattr(stat, 'st_mtime_ns', stat.st_mtime)
+
+
+class ParseCache(object):
+    """Persistent cache of parsed Android string files.
+
+    Each parsed file is stored as a separate compressed entry in the cache
+    ``directory``. An entry is reused without reading the source file when
+    its path, modification time and size are unchanged. Otherwise the content
+    hash is compared, so touched but unmodified files are not parsed again.
+
+    The ``hits`` and ``misses`` counters only track lookups made in the
+    current process.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or get_default_directory()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        return {'directory': self.directory}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'])
+
+    def parse_file(self, file_path, streaming=False):
+        """Parse the specified file or load its strings from the cache.
+
+        Args:
+            file_path (str): The path to the XML file to parse.
+            streaming (bool): Parse the file incrementally on a cache miss.
+
+        Returns:
+            model.Resources: A model with strings found in the file.
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        mtime = _modification_time(stat)
+        entry_path = self._entry_path(path)
+        entry = self._load_entry(entry_path)
+
+        if entry and entry['path'] != path:
+            entry = None
+
+        if entry and entry['mtime'] == mtime and entry['size'] == stat.st_size:
+            self.hits += 1
+            return entry['resources']
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = _file_digest(data)
+
+        if entry and entry['digest'] == digest:
+            self.hits += 1
+            resources = entry['resources']
+        else:
+            self.misses += 1
+            resources = model.Resources()
+            parser.parse_file(io.BytesIO(data), resources, streaming)
+
+        self._store_entry(entry_path, {
+            'version': CACHE_VERSION,
+            'path': path,
+            'mtime': mtime,
+            'size': stat.st_size,
+            'digest': digest,
+            'resources': resources
+        })
+        return resources
+
+    def _entry_path(self, path):
+        name = hashlib.sha1(path.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + '.cache')
+
+    @staticmethod
+    def _load_entry(entry_path):
+        try:
+            with open(entry_path, 'rb') as f:
+                entry = pickle.loads(zlib.decompress(f.read()))
+        except (IOError, OSError, EOFError, zlib.error,
+                pickle.UnpicklingError, AttributeError, ImportError):
+            # Unreadable or corrupted entries and entries with classes of
+            # other versions are parsed again
+            return None
+
+        if (not isinstance(entry, dict) or
+                entry.get('version') != CACHE_VERSION):
+            return None
+        return entry
+
+    def _store_entry(self, entry_path, entry):
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        data = zlib.compress(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            _replace(temp_path, entry_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
@@ -1,19 +1,91 @@
 import argparse
+import sys
 
-import stringsheet.main as ss
 from . import __version__
 
+# Commands import stringsheet.main only when they run. It pulls in lxml and
+# the Google API client which would slow down --help and --version.
+
 
 def create(args):
-    ss.create(args.project_name, args.source_dir, args.multi_sheet)
+    import stringsheet.main as ss
+    ss.create(args.project_name, args.source_dir, args.multi_sheet,
+              args.jobs, args.streaming, args.cache_dir)
 
 
 def upload(args):
-    ss.upload(args.spreadsheet_id, args.source_dir)
+    import stringsheet.main as ss
+    ss.upload(args.spreadsheet_id, args.source_dir, args.jobs,
+              args.streaming, args.cache_dir, args.diff, args.connections,
+              args.resume, _mirror_dir(args))
 
 
 def download(args):
-    ss.download(args.spreadsheet_id, args.target_dir)
+    import stringsheet.main as ss
+    ss.download(args.spreadsheet_id, args.target_dir, args.jobs,
+                args.batch_size, args.connections, _mirror_dir(args))
+
+
+def status(args):
+    import stringsheet.main as ss
+    if ss.status(args.spreadsheet_id, args.source_dir, args.jobs,
+                 args.streaming, args.cache_dir) is None:
+        sys.exit(1)
+
+
+def _mirror_dir(args):
+    if not args.mirror:
+        return None
+    from stringsheet import mirror
+    return mirror.get_default_directory()
+
+
+def batch(args):
+    import stringsheet.main as ss
+    try:
+        results = ss.batch(args.manifest, args.jobs, args.connections,
+                           args.streaming, args.cache_dir)
+    except (IOError, ValueError) as e:
+        sys.exit(str(e))
+    if any(result.error for result in results):
+        sys.exit(1)
+
+
+def _add_parse_arguments(subparser):
+    subparser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes used to parse strings')
+    subparser.add_argument(
+        '--streaming',
+        action='store_true',
+        help='Parse string files incrementally to limit memory usage')
+    subparser.add_argument(
+        '--cache-dir',
+        help='Directory for cached parse results. Files which did not change '
+             'since the last run are not parsed again')
+
+
+def _add_instrumentation_arguments(subparser):
+    subparser.add_argument(
+        '--timings',
+        metavar='FILE',
+        help='Write wall and CPU time, HTTP traffic and API requests of each '
+             'phase of the command as JSON to FILE, or to standard error if '
+             'FILE is -')
+    subparser.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='Profile the command with cProfile and save the stats to FILE')
+
+
+def _add_mirror_argument(subparser):
+    subparser.add_argument(
+        '--mirror',
+        action='store_true',
+        help='Keep a local copy of the synchronized strings. It is used by '
+             'the status command and to upload only changed cells')
 
 
 def parse_args():
@@ -42,6 +114,8 @@ def parse_args():
         '-m', '--multi-sheet',
         action='store_true',
         help='Upload each language to a separate sheet (in the same file)')
+    _add_parse_arguments(parser_create)
+    _add_instrumentation_arguments(parser_create)
     parser_create.set_defaults(func=create)
 
     parser_upload = subparsers.add_parser(
@@ -53,6 +127,23 @@ def parse_args():
     parser_upload.add_argument(
         'source_dir',
         help='A path to resources directory of Android project')
+    _add_parse_arguments(parser_upload)
+    parser_upload.add_argument(
+        '--diff',
+        action='store_true',
+        help='Only upload cells that differ from the spreadsheet. Existing '
+             'translations in the spreadsheet are kept')
+    parser_upload.add_argument(
+        '--connections',
+        type=int,
+        default=1,
+        help='Number of value chunks uploaded at the same time')
+    parser_upload.add_argument(
+        '--resume',
+        action='store_true',
+        help='Skip value chunks uploaded by a previous failed run')
+    _add_mirror_argument(parser_upload)
+    _add_instrumentation_arguments(parser_upload)
     parser_upload.set_defaults(func=upload)
 
     parser_download = subparsers.add_parser(
@@ -64,14 +155,95 @@ def parse_args():
     parser_download.add_argument(
         'target_dir',
         help='A path to directory where to save downloaded strings')
+    parser_download.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes used to write strings')
+    parser_download.add_argument(
+        '--batch-size',
+        type=int,
+        help='Number of sheets requested at once. By default sheets are '
+             'divided evenly between connections')
+    parser_download.add_argument(
+        '--connections',
+        type=int,
+        default=4,
+        help='Number of batches of sheets downloaded at the same time')
+    _add_mirror_argument(parser_download)
+    _add_instrumentation_arguments(parser_download)
     parser_download.set_defaults(func=download)
 
+    parser_status = subparsers.add_parser(
+        'status',
+        help='Show strings changed since the last mirrored upload or '
+             'download')
+    parser_status.add_argument(
+        'spreadsheet_id',
+        help='Id of the mirrored spreadsheet')
+    parser_status.add_argument(
+        'source_dir',
+        help='A path to resources directory of Android project')
+    _add_parse_arguments(parser_status)
+    _add_instrumentation_arguments(parser_status)
+    parser_status.set_defaults(func=status)
+
+    parser_batch = subparsers.add_parser(
+        'batch',
+        help='Upload or download strings of multiple projects listed in a '
+             'manifest file')
+    parser_batch.add_argument(
+        'manifest',
+        help='A path to JSON file with a list of projects')
+    _add_parse_arguments(parser_batch)
+    parser_batch.add_argument(
+        '--connections',
+        type=int,
+        default=4,
+        help='Number of projects synchronized at the same time')
+    _add_instrumentation_arguments(parser_batch)
+    parser_batch.set_defaults(func=batch)
+
     return arg_parser.parse_args()
 
 
+def _write_timings(report, path):
+    import json
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path == '-':
+        # Standard output is used for the progress of the command
+        sys.stdout.flush()
+        sys.stderr.write(text + '\n')
+    else:
+        with open(path, 'w') as f:
+            f.write(text + '\n')
+
+
+def run(args):
+    """Run the command of parsed ``args`` with the requested instrumentation.
+    """
+    if args.timings:
+        from stringsheet import timings
+        timings.start(args.operation)
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        args.func(args)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.timings:
+            _write_timings(timings.stop(), args.timings)
+
+
 def main():
-    args = parse_args()
-    args.func(args)
+    run(parse_args())
 
 
 if __name__ == '__main__':
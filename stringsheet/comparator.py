@@ -1,4 +1,3 @@
-import functools
 import re
 
 from . import constants
@@ -15,6 +14,18 @@ PLURAL_ID_PATTERN = re.compile('^(\w+){(zero|one|two|few|many|other)\}$')
 Example: ``name{zero}``, ``name{many}``
 """
 
+STRING = 0
+"""Kind of regular string ids."""
+
+ARRAY = 1
+"""Kind of string array ids."""
+
+PLURAL = 2
+"""Kind of plural ids."""
+
+_QUANTITY_ORDER = dict((quantity, index)
+                       for index, quantity in enumerate(constants.QUANTITIES))
+
 
 def _compare_alphabetically(a, b):
     return (a > b) - (a < b)
@@ -87,7 +98,48 @@ def compare_strings(a, b):
 
 
 def quantity_order(quantity):
-    return constants.QUANTITIES.index(quantity)
+    return _QUANTITY_ORDER[quantity]
+
 
+def parse_string_id(string_id):
+    """Split a spreadsheet string id into its parts.
 
-string_order = functools.cmp_to_key(compare_strings)
+    Args:
+        string_id (str): The string id in spreadsheet string id format.
+
+    Returns:
+        tuple: The kind of the id (``STRING``, ``ARRAY`` or ``PLURAL``), the
+            name of the string and its qualifier. The qualifier is the item
+            index for arrays, the quantity for plurals and ``None`` for
+            regular strings.
+    """
+    if string_id.endswith(']'):
+        array_match = ARRAY_ID_PATTERN.match(string_id)
+        if array_match:
+            return ARRAY, array_match.group(1), int(array_match.group(2))
+    elif string_id.endswith('}'):
+        plural_match = PLURAL_ID_PATTERN.match(string_id)
+        if plural_match:
+            return PLURAL, plural_match.group(1), plural_match.group(2)
+    return STRING, string_id, None
+
+
+def string_order(string_id):
+    """Return a sort key for spreadsheet string ids.
+
+    The resulting order is the same as the one defined by
+    :func:`compare_strings`, but each id is parsed only once.
+
+    Args:
+        string_id (str): The string id in spreadsheet string id format.
+
+    Returns:
+        tuple: The kind of the id, the name of the string and the rank of its
+            index or quantity.
+    """
+    kind, name, qualifier = parse_string_id(string_id)
+    if kind == ARRAY:
+        return kind, name, qualifier
+    if kind == PLURAL:
+        return kind, name, _QUANTITY_ORDER[qualifier]
+    return kind, name, 0
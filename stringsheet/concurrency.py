@@ -0,0 +1,29 @@
+import multiprocessing
+
+
+def process_map(function, items, jobs=1):
+    """Apply ``function`` to every item and return a list with the results.
+
+    When ``jobs`` is greater than 1 the items are processed in a pool of
+    worker processes. The ``function`` and all items must be picklable in
+    that case. The order of the results always matches the order of
+    ``items``.
+
+    Args:
+        function: A module level function to call with each item.
+        items (list): The items to process.
+        jobs (int): The maximum number of worker processes to use.
+
+    Returns:
+        list: The results of calling ``function`` on each item.
+    """
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+
+    pool = multiprocessing.Pool(min(jobs, len(items)))
+    try:
+        return pool.map(function, items)
+    finally:
+        pool.close()
+        pool.join()
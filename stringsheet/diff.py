@@ -0,0 +1,228 @@
+import bisect
+import collections
+
+from . import api
+from .a1 import column_name
+
+SheetDiff = collections.namedtuple(
+    'SheetDiff',
+    ['requests', 'value_ranges', 'inserted_rows', 'deleted_rows',
+     'updated_cells'])
+"""Changes needed to turn the values of a sheet into the local values.
+
+Attributes:
+    requests (list): Requests for ``spreadsheets.batchUpdate`` which insert
+        and delete rows. They must be executed before writing the values.
+    value_ranges (list): Value ranges for ``values.batchUpdate`` with only
+        the cells that have changed.
+    inserted_rows (int): Number of inserted rows.
+    deleted_rows (int): Number of deleted rows.
+    updated_cells (int): Number of cells that will be written.
+"""
+
+_NUM_INFO_COLUMNS = 3
+"""Number of columns with id, comment and default text."""
+
+
+def _a1_range(title, start_row, start_column, end_row, end_column):
+    return "'%s'!%s%d:%s%d" % (title.replace("'", "''"),
+                               column_name(start_column), start_row + 1,
+                               column_name(end_column - 1), end_row)
+
+
+def _normalize(row, width):
+    row = ['' if value is None else value for value in row[:width]]
+    if len(row) < width:
+        row.extend([''] * (width - len(row)))
+    return row
+
+
+def _increasing_subsequence(positions):
+    """Return indexes of the longest increasing subsequence of ``positions``.
+    """
+    tails = []
+    tail_indexes = []
+    previous = [None] * len(positions)
+    for index, position in enumerate(positions):
+        i = bisect.bisect_left(tails, position)
+        if i:
+            previous[index] = tail_indexes[i - 1]
+        if i == len(tails):
+            tails.append(position)
+            tail_indexes.append(index)
+        else:
+            tails[i] = position
+            tail_indexes[i] = index
+
+    result = set()
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        result.add(index)
+        index = previous[index]
+    return result
+
+
+def _group_indexes(indexes):
+    """Group sorted indexes into ``(start, end)`` ranges of adjacent values."""
+    groups = []
+    for index in indexes:
+        if groups and groups[-1][1] == index:
+            groups[-1][1] = index + 1
+        else:
+            groups.append([index, index + 1])
+    return groups
+
+
+def _merged_header(local_header, remote_header):
+    """Return the local header followed by languages only in the sheet."""
+    header = list(local_header)
+    for language in remote_header[_NUM_INFO_COLUMNS:]:
+        if language and language not in header:
+            header.append(language)
+    return header
+
+
+def _column_indexes(header, remote_header):
+    """Return the index of each column of ``header`` in ``remote_header``.
+
+    Columns are matched by their language code. Columns missing from the
+    sheet have the index ``None``.
+    """
+    index_by_language = {}
+    for index, language in enumerate(remote_header):
+        if language:
+            index_by_language.setdefault(language, index)
+    return [index_by_language.get(language) for language in header]
+
+
+def diff_sheet_values(sheet_id, title, remote_values, local_values):
+    """Compute the changes needed to upload ``local_values`` to a sheet.
+
+    Rows are matched by their string id in the first column. Rows which
+    don't exist locally are deleted and new rows are inserted at their
+    position, so cells of the existing rows stay attached to their strings.
+    The id, comment and default columns always take the local values.
+    Translation cells are only written when the local text isn't empty, so
+    translations entered in the spreadsheet are never cleared.
+
+    Translation columns of the sheet are matched with the local ones by
+    their language code. If the columns differ (for example when a language
+    column was added) the sheet is rearranged to the local order, followed
+    by the languages which only exist in the sheet.
+
+    Args:
+        sheet_id (int): The id of the sheet.
+        title (str): The title of the sheet.
+        remote_values (list): The values currently stored in the sheet.
+        local_values (list): The values created from local strings.
+
+    Returns:
+        SheetDiff: The requests and value ranges to send.
+    """
+    remote_values = remote_values or [[]]
+    remote_header = _normalize(remote_values[0], len(remote_values[0]))
+    header = _merged_header(
+        _normalize(local_values[0], len(local_values[0])), remote_header)
+    width = len(header)
+    columns = _column_indexes(header, remote_header)
+
+    local_rows = [_normalize(row, width) for row in local_values]
+    local_rows[0] = header
+    remote_width = max(width, len(remote_header))
+    remote_rows = [_normalize(row, remote_width) for row in remote_values]
+
+    local_position = {}
+    for position, row in enumerate(local_rows[1:], 1):
+        local_position.setdefault(row[0], position)
+
+    # Remote rows matching local strings, in sheet order
+    matched = []
+    matched_positions = []
+    claimed = set()
+    for remote_index, row in enumerate(remote_rows[1:], 1):
+        position = local_position.get(row[0])
+        if position is not None and position not in claimed:
+            claimed.add(position)
+            matched.append(remote_index)
+            matched_positions.append(position)
+
+    # Rows that changed their order are deleted and inserted again
+    kept_indexes = _increasing_subsequence(matched_positions)
+    remote_by_position = {}
+    kept_remote_indexes = set()
+    for i, (remote_index, position) in enumerate(zip(matched,
+                                                     matched_positions)):
+        remote_by_position[position] = remote_rows[remote_index]
+        if i in kept_indexes:
+            kept_remote_indexes.add(remote_index)
+    kept_positions = set(matched_positions[i] for i in kept_indexes)
+
+    requests = []
+    deleted = [index for index in range(1, len(remote_rows))
+               if index not in kept_remote_indexes]
+    for start, end in reversed(_group_indexes(deleted)):
+        requests.append(api.create_delete_rows_request(sheet_id, start, end))
+
+    row_count = len(remote_rows) - len(deleted)
+    inserted = [position for position in range(1, len(local_rows))
+                if position not in kept_positions]
+    for start, end in _group_indexes(inserted):
+        if start < row_count:
+            requests.append(
+                api.create_insert_rows_request(sheet_id, start, end))
+            row_count += end - start
+        else:
+            row_count = end
+
+    blank_row = [''] * remote_width
+    blocks = []
+    updated_cells = 0
+    for position, local_row in enumerate(local_rows):
+        if position:
+            remote_row = remote_by_position.get(position, blank_row)
+            current_row = (remote_row if position in kept_positions
+                           else blank_row)[:width]
+            desired_row = local_row[:_NUM_INFO_COLUMNS] + [
+                local_text or ('' if index is None else remote_row[index])
+                for local_text, index in
+                zip(local_row[_NUM_INFO_COLUMNS:],
+                    columns[_NUM_INFO_COLUMNS:])]
+        else:
+            current_row = remote_rows[0][:width]
+            desired_row = local_row
+        if desired_row == current_row:
+            continue
+
+        changed = [column for column in range(width)
+                   if desired_row[column] != current_row[column]]
+        runs = _group_indexes(changed)
+        for start, end in runs:
+            updated_cells += end - start
+
+        # Adjacent rows with the same changed columns are sent as one range
+        last = blocks[-1] if blocks else None
+        if (len(runs) == 1 and last and last['end_row'] == position and
+                last['mergeable'] and
+                [last['start_column'], last['end_column']] == runs[0]):
+            last['values'].append(desired_row[runs[0][0]:runs[0][1]])
+            last['end_row'] = position + 1
+            continue
+
+        for start, end in runs:
+            blocks.append({
+                'start_row': position,
+                'end_row': position + 1,
+                'mergeable': len(runs) == 1,
+                'start_column': start,
+                'end_column': end,
+                'values': [desired_row[start:end]]
+            })
+
+    value_ranges = [{
+        'range': _a1_range(title, block['start_row'], block['start_column'],
+                           block['end_row'], block['end_column']),
+        'values': block['values']
+    } for block in blocks]
+
+    return SheetDiff(requests, value_ranges, len(inserted), len(deleted),
+                     updated_cells)
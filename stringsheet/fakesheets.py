@@ -0,0 +1,636 @@
+"""Local stand-in for the subset of Google Sheets API v4 used by StringSheet.
+
+The server keeps all spreadsheets in memory and can delay every response to
+simulate network latency. It makes it possible to run and benchmark the
+``create``, ``upload`` and ``download`` commands without network access::
+
+    $ python -m stringsheet.fakesheets --port 8080 --latency 0.1
+    $ STRINGSHEET_ENDPOINT=http://localhost:8080 stringsheet upload ...
+
+Supported methods: ``spreadsheets.create``, ``spreadsheets.get``,
+``spreadsheets.batchUpdate``, ``spreadsheets.values.batchGet`` and
+``spreadsheets.values.batchUpdate``.
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, unquote, urlparse
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urlparse import parse_qs, urlparse
+
+from .a1 import column_index
+from .a1 import column_name
+
+_DEFAULT_ROW_COUNT = 1000
+_DEFAULT_COLUMN_COUNT = 26
+
+_A1_PATTERN = re.compile(r'^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$')
+_PATH_PATTERN = re.compile(
+    r'^/v4/spreadsheets(?:/(?P<id>[^/:]+))?'
+    r'(?P<values>/values)?(?::(?P<method>\w+))?$')
+_FIELDS_PATTERN = re.compile(r'^sheets\.properties(?:\(([\w,]+)\))?$')
+
+
+def _method(method_id, path, http_method, parameters=None, request=None):
+    method = {
+        'id': 'sheets.' + method_id,
+        'path': path,
+        'flatPath': path,
+        'httpMethod': http_method,
+        'parameters': parameters or {},
+        'parameterOrder': [],
+        'response': {'$ref': 'Response'}
+    }
+    if '{spreadsheetId}' in path:
+        method['parameters']['spreadsheetId'] = {
+            'type': 'string', 'location': 'path', 'required': True}
+        method['parameterOrder'].append('spreadsheetId')
+    if request:
+        method['request'] = {'$ref': 'Request'}
+    return method
+
+
+def create_discovery_document(root_url):
+    """Create a minimal discovery document describing the fake API.
+
+    Args:
+        root_url (str): The base URL of the server, ending with a slash.
+
+    Returns:
+        dict: The discovery document.
+    """
+    return {
+        'kind': 'discovery#restDescription',
+        'discoveryVersion': 'v1',
+        'id': 'sheets:v4',
+        'name': 'sheets',
+        'version': 'v4',
+        'protocol': 'rest',
+        'rootUrl': root_url,
+        'servicePath': '',
+        'baseUrl': root_url,
+        'batchPath': 'batch',
+        'parameters': {
+            'alt': {'type': 'string', 'location': 'query', 'default': 'json'},
+            'fields': {'type': 'string', 'location': 'query'}
+        },
+        'schemas': {
+            'Request': {'id': 'Request', 'type': 'object'},
+            'Response': {'id': 'Response', 'type': 'object'}
+        },
+        'resources': {
+            'spreadsheets': {
+                'methods': {
+                    'create': _method('spreadsheets.create', 'v4/spreadsheets',
+                                      'POST', request=True),
+                    'get': _method('spreadsheets.get',
+                                   'v4/spreadsheets/{spreadsheetId}', 'GET', {
+                                       'includeGridData': {
+                                           'type': 'boolean',
+                                           'location': 'query'}}),
+                    'batchUpdate': _method(
+                        'spreadsheets.batchUpdate',
+                        'v4/spreadsheets/{spreadsheetId}:batchUpdate', 'POST',
+                        request=True)
+                },
+                'resources': {
+                    'values': {
+                        'methods': {
+                            'batchGet': _method(
+                                'spreadsheets.values.batchGet',
+                                'v4/spreadsheets/{spreadsheetId}'
+                                '/values:batchGet', 'GET', {
+                                    'ranges': {'type': 'string',
+                                               'location': 'query',
+                                               'repeated': True}}),
+                            'batchUpdate': _method(
+                                'spreadsheets.values.batchUpdate',
+                                'v4/spreadsheets/{spreadsheetId}'
+                                '/values:batchUpdate', 'POST', request=True)
+                        }
+                    }
+                }
+            }
+        }
+    }
+
+
+class ApiError(Exception):
+    """Error returned to the client as a Google API error response."""
+
+    def __init__(self, code, status, message):
+        super(ApiError, self).__init__(message)
+        self.code = code
+        self.status = status
+        self.message = message
+
+    def to_json(self):
+        return {'error': {'code': self.code,
+                          'message': self.message,
+                          'status': self.status}}
+
+
+def _trim(rows):
+    """Remove trailing empty cells and rows like the real API does."""
+    result = []
+    for row in rows:
+        row = list(row)
+        while row and row[-1] in ('', None):
+            row.pop()
+        result.append(row)
+    while result and not result[-1]:
+        result.pop()
+    return result
+
+
+class _Sheet(object):
+    def __init__(self, properties):
+        self.properties = properties
+        self.rows = []
+        self.protected_ranges = []
+        self.conditional_formats = []
+
+    @property
+    def title(self):
+        return self.properties['title']
+
+    def to_json(self, property_fields=None):
+        properties = self.properties
+        if property_fields is not None:
+            properties = dict((key, value) for key, value in
+                              properties.items() if key in property_fields)
+            return {'properties': properties}
+        return {
+            'properties': properties,
+            'protectedRanges': self.protected_ranges,
+            'conditionalFormats': self.conditional_formats
+        }
+
+    def read(self, start_row, start_column, end_row, end_column):
+        rows = self.rows[start_row:end_row]
+        return _trim([row[start_column:end_column] for row in rows])
+
+    def write(self, start_row, start_column, values):
+        for offset, row_values in enumerate(values):
+            row_index = start_row + offset
+            while len(self.rows) <= row_index:
+                self.rows.append([])
+            row = self.rows[row_index]
+            end_column = start_column + len(row_values)
+            if len(row) < end_column:
+                row.extend([''] * (end_column - len(row)))
+            row[start_column:end_column] = [
+                '' if value is None else value for value in row_values]
+
+        grid = self.properties['gridProperties']
+        grid['rowCount'] = max(grid['rowCount'], len(self.rows))
+
+    def insert_rows(self, start, end):
+        while len(self.rows) < start:
+            self.rows.append([])
+        self.rows[start:start] = [[] for _ in range(end - start)]
+        self.properties['gridProperties']['rowCount'] += end - start
+
+    def delete_rows(self, start, end):
+        del self.rows[start:end]
+        grid = self.properties['gridProperties']
+        grid['rowCount'] = max(1, grid['rowCount'] - (end - start))
+
+
+class _Spreadsheet(object):
+    def __init__(self, spreadsheet_id, properties):
+        self.spreadsheet_id = spreadsheet_id
+        self.properties = properties
+        self.sheets = []
+
+    def add_sheet(self, properties):
+        properties = dict(properties)
+        title = properties.get('title') or 'Sheet%d' % (len(self.sheets) + 1)
+        if self.find_sheet(title):
+            raise ApiError(400, 'INVALID_ARGUMENT',
+                           'A sheet with the name "%s" already exists.'
+                           % title)
+        sheet_id = properties.get('sheetId')
+        if sheet_id is None:
+            sheet_id = max([it.properties['sheetId']
+                            for it in self.sheets] + [-1]) + 1
+        elif self.find_sheet_by_id(sheet_id):
+            raise ApiError(400, 'INVALID_ARGUMENT',
+                           'Sheet with id %d already exists.' % sheet_id)
+
+        grid = dict(properties.get('gridProperties', {}))
+        grid.setdefault('rowCount', _DEFAULT_ROW_COUNT)
+        grid.setdefault('columnCount', _DEFAULT_COLUMN_COUNT)
+        properties.update({
+            'sheetId': sheet_id,
+            'title': title,
+            'index': len(self.sheets),
+            'sheetType': 'GRID',
+            'gridProperties': grid
+        })
+        sheet = _Sheet(properties)
+        self.sheets.append(sheet)
+        return sheet
+
+    def find_sheet(self, title):
+        for sheet in self.sheets:
+            if sheet.title == title:
+                return sheet
+        return None
+
+    def find_sheet_by_id(self, sheet_id):
+        for sheet in self.sheets:
+            if sheet.properties['sheetId'] == sheet_id:
+                return sheet
+        return None
+
+    def require_sheet_by_id(self, sheet_id):
+        sheet = self.find_sheet_by_id(sheet_id)
+        if sheet is None:
+            raise ApiError(400, 'INVALID_ARGUMENT',
+                           'No grid with id: %s' % sheet_id)
+        return sheet
+
+    def resolve_range(self, a1_range):
+        """Return the sheet and cell bounds addressed by ``a1_range``."""
+        title, sep, cells = a1_range.rpartition('!')
+        if not sep:
+            if _A1_PATTERN.match(a1_range) and a1_range:
+                title, cells = None, a1_range
+            else:
+                title, cells = a1_range, ''
+
+        if title is None:
+            sheet = self.sheets[0] if self.sheets else None
+        else:
+            if len(title) > 1 and title.startswith("'") and \
+                    title.endswith("'"):
+                title = title[1:-1].replace("''", "'")
+            sheet = self.find_sheet(title)
+        if sheet is None:
+            raise ApiError(400, 'INVALID_ARGUMENT',
+                           'Unable to parse range: %s' % a1_range)
+
+        match = _A1_PATTERN.match(cells)
+        if not match:
+            raise ApiError(400, 'INVALID_ARGUMENT',
+                           'Unable to parse range: %s' % a1_range)
+        start_column, start_row, end_column, end_row = match.groups()
+        bounds = (
+            int(start_row) - 1 if start_row else 0,
+            column_index(start_column) if start_column else 0,
+            int(end_row) if end_row else (int(start_row) if start_row and
+                                          end_row is None else None),
+            (column_index(end_column) + 1 if end_column else
+             (column_index(start_column) + 1 if start_column and
+              end_column is None else None)),
+        )
+        return sheet, bounds
+
+    def to_json(self, fields=None):
+        property_fields = None
+        if fields:
+            match = _FIELDS_PATTERN.match(fields.replace(' ', ''))
+            if match:
+                property_fields = (match.group(1).split(',')
+                                   if match.group(1) else
+                                   list(itertools.chain.from_iterable(
+                                       it.properties for it in self.sheets)))
+                return {'sheets': [sheet.to_json(property_fields)
+                                   for sheet in self.sheets]}
+        return {
+            'spreadsheetId': self.spreadsheet_id,
+            'properties': self.properties,
+            'sheets': [sheet.to_json() for sheet in self.sheets],
+            'spreadsheetUrl': 'https://docs.google.com/spreadsheets/d/%s/edit'
+                              % self.spreadsheet_id
+        }
+
+
+class FakeSheetsApi(object):
+    """In-memory implementation of the supported Sheets API methods."""
+
+    def __init__(self):
+        self.spreadsheets = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._failures = []
+
+    def fail_next(self, count=1, code=503):
+        """Make the next ``count`` requests fail with the ``code`` status."""
+        status = {400: 'INVALID_ARGUMENT',
+                  429: 'RESOURCE_EXHAUSTED'}.get(code, 'UNAVAILABLE')
+        with self._lock:
+            self._failures.extend(
+                [ApiError(code, status, 'Injected error.')] * count)
+
+    def check_failure(self):
+        """Raise the next injected error if there is one."""
+        with self._lock:
+            if self._failures:
+                raise self._failures.pop(0)
+
+    def _get(self, spreadsheet_id):
+        spreadsheet = self.spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            raise ApiError(404, 'NOT_FOUND', 'Requested entity was not found.')
+        return spreadsheet
+
+    def create(self, body):
+        with self._lock:
+            spreadsheet_id = 'fake-spreadsheet-%d' % next(self._ids)
+            properties = dict(body.get('properties', {}))
+            properties.setdefault('title', 'Untitled spreadsheet')
+            spreadsheet = _Spreadsheet(spreadsheet_id, properties)
+            for sheet in body.get('sheets') or [{}]:
+                spreadsheet.add_sheet(sheet.get('properties', {}))
+            self.spreadsheets[spreadsheet_id] = spreadsheet
+            return spreadsheet.to_json()
+
+    def get(self, spreadsheet_id, fields=None):
+        with self._lock:
+            return self._get(spreadsheet_id).to_json(fields)
+
+    def batch_update(self, spreadsheet_id, body):
+        with self._lock:
+            spreadsheet = self._get(spreadsheet_id)
+            replies = [self._apply_request(spreadsheet, request)
+                       for request in body.get('requests', [])]
+            return {'spreadsheetId': spreadsheet_id, 'replies': replies}
+
+    @staticmethod
+    def _apply_request(spreadsheet, request):
+        if 'addSheet' in request:
+            properties = request['addSheet'].get('properties', {})
+            sheet = spreadsheet.add_sheet(properties)
+            return {'addSheet': {'properties': sheet.properties}}
+
+        if 'updateSheetProperties' in request:
+            properties = request['updateSheetProperties']['properties']
+            sheet = spreadsheet.require_sheet_by_id(properties['sheetId'])
+            for key, value in properties.items():
+                if isinstance(value, dict):
+                    sheet.properties.setdefault(key, {}).update(value)
+                else:
+                    sheet.properties[key] = value
+            return {}
+
+        if 'addProtectedRange' in request:
+            protected_range = request['addProtectedRange']['protectedRange']
+            sheet_id = protected_range['range']['sheetId']
+            sheet = spreadsheet.require_sheet_by_id(sheet_id)
+            sheet.protected_ranges.append(protected_range)
+            return {'addProtectedRange': {'protectedRange': protected_range}}
+
+        if 'addConditionalFormatRule' in request:
+            rule = request['addConditionalFormatRule']['rule']
+            sheet_id = rule['ranges'][0]['sheetId']
+            sheet = spreadsheet.require_sheet_by_id(sheet_id)
+            sheet.conditional_formats.append(rule)
+            return {}
+
+        for name in ('insertDimension', 'deleteDimension'):
+            if name in request:
+                dimension_range = request[name]['range']
+                if dimension_range.get('dimension') != 'ROWS':
+                    raise ApiError(400, 'INVALID_ARGUMENT',
+                                   'Only row dimensions are supported.')
+                sheet = spreadsheet.require_sheet_by_id(
+                    dimension_range['sheetId'])
+                start = dimension_range['startIndex']
+                end = dimension_range['endIndex']
+                if name == 'insertDimension':
+                    sheet.insert_rows(start, end)
+                else:
+                    sheet.delete_rows(start, end)
+                return {}
+
+        raise ApiError(400, 'INVALID_ARGUMENT',
+                       'Unsupported request: %s' % ', '.join(request))
+
+    def batch_get_values(self, spreadsheet_id, ranges):
+        with self._lock:
+            spreadsheet = self._get(spreadsheet_id)
+            value_ranges = []
+            for a1_range in ranges:
+                sheet, bounds = spreadsheet.resolve_range(a1_range)
+                start_row, start_column, end_row, end_column = bounds
+                values = sheet.read(start_row, start_column, end_row,
+                                    end_column)
+                value_range = {
+                    'range': "'%s'!%s%d:%s%d" % (
+                        sheet.title.replace("'", "''"),
+                        column_name(start_column), start_row + 1,
+                        column_name((end_column or _DEFAULT_COLUMN_COUNT) - 1),
+                        end_row or max(start_row + len(values), 1)),
+                    'majorDimension': 'ROWS'
+                }
+                if values:
+                    value_range['values'] = values
+                value_ranges.append(value_range)
+            return {'spreadsheetId': spreadsheet_id,
+                    'valueRanges': value_ranges}
+
+    def batch_update_values(self, spreadsheet_id, body):
+        with self._lock:
+            spreadsheet = self._get(spreadsheet_id)
+            responses = []
+            sheets = set()
+            totals = {'rows': 0, 'columns': 0, 'cells': 0}
+            for value_range in body.get('data', []):
+                sheet, bounds = spreadsheet.resolve_range(
+                    value_range['range'])
+                start_row, start_column, _, _ = bounds
+                values = value_range.get('values', [])
+                sheet.write(start_row, start_column, values)
+
+                num_columns = max([len(row) for row in values] + [0])
+                num_cells = sum(len(row) for row in values)
+                totals['rows'] += len(values)
+                totals['columns'] += num_columns
+                totals['cells'] += num_cells
+                sheets.add(sheet.title)
+                responses.append({
+                    'spreadsheetId': spreadsheet_id,
+                    'updatedRange': value_range['range'],
+                    'updatedRows': len(values),
+                    'updatedColumns': num_columns,
+                    'updatedCells': num_cells
+                })
+            return {
+                'spreadsheetId': spreadsheet_id,
+                'totalUpdatedRows': totals['rows'],
+                'totalUpdatedColumns': totals['columns'],
+                'totalUpdatedCells': totals['cells'],
+                'totalUpdatedSheets': len(sheets),
+                'responses': responses
+            }
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _handle(self, http_method):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length).decode('utf-8') or '{}') \
+            if length else {}
+
+        try:
+            if url.path == '/$discovery/rest':
+                result = create_discovery_document(server.url + '/')
+            else:
+                server.api.check_failure()
+                result = self._dispatch(http_method, unquote(url.path), query,
+                                        body)
+            self._send(200, result)
+        except ApiError as e:
+            self._send(e.code, e.to_json())
+
+    def _dispatch(self, http_method, path, query, body):
+        api = self.server.api
+        match = _PATH_PATTERN.match(path)
+        if not match:
+            raise ApiError(404, 'NOT_FOUND', 'Unknown path: %s' % path)
+
+        spreadsheet_id = match.group('id')
+        is_values = bool(match.group('values'))
+        method = match.group('method')
+
+        if http_method == 'POST' and not spreadsheet_id and not method:
+            return api.create(body)
+        if http_method == 'GET' and spreadsheet_id and not method \
+                and not is_values:
+            fields = query.get('fields', [None])[0]
+            return api.get(spreadsheet_id, fields)
+        if http_method == 'POST' and method == 'batchUpdate':
+            if is_values:
+                return api.batch_update_values(spreadsheet_id, body)
+            return api.batch_update(spreadsheet_id, body)
+        if http_method == 'GET' and is_values and method == 'batchGet':
+            return api.batch_get_values(spreadsheet_id,
+                                        query.get('ranges', []))
+        raise ApiError(404, 'NOT_FOUND', 'Unknown method: %s' % path)
+
+    def _send(self, status, result):
+        data = json.dumps(result).encode('utf-8')
+        if self.server.bandwidth:
+            time.sleep(len(data) / float(self.server.bandwidth))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeSheetsServer(object):
+    """HTTP server serving :class:`FakeSheetsApi` on a local port.
+
+    Can be used as a context manager which starts the server in a background
+    thread and stops it on exit.
+
+    Args:
+        host (str): The address to listen on.
+        port (int): The port to listen on. A free port is picked if 0.
+        latency (float): Number of seconds to wait before each response.
+        bandwidth (float): Simulated transfer speed of responses in bytes
+            per second. Unlimited if 0.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, bandwidth=0.0):
+        self.api = FakeSheetsApi()
+        self._server = _ThreadingHTTPServer((host, port), _RequestHandler)
+        self._server.api = self.api
+        self._server.latency = latency
+        self._server.bandwidth = bandwidth
+        self._server.url = self.url
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    @property
+    def latency(self):
+        return self._server.latency
+
+    @latency.setter
+    def latency(self, value):
+        self._server.latency = value
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Run a local fake Google Sheets API server')
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8080)
+    arg_parser.add_argument(
+        '--latency', type=float, default=0.0,
+        help='Number of seconds to wait before each response')
+    arg_parser.add_argument(
+        '--bandwidth', type=float, default=0.0,
+        help='Simulated transfer speed of responses in bytes per second')
+    args = arg_parser.parse_args()
+
+    server = FakeSheetsServer(args.host, args.port, args.latency,
+                              args.bandwidth)
+    print('Serving fake Sheets API on %s' % server.url)
+    print('Use it with: STRINGSHEET_ENDPOINT=%s stringsheet ...' % server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
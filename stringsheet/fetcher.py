@@ -0,0 +1,105 @@
+"""Concurrent download of spreadsheet values in batches of sheets.
+
+Instead of requesting all sheets in a single ``values.batchGet`` call, the
+ranges are divided into batches which are fetched by a pool of threads.
+Batches are yielded as soon as they arrive, so the caller can process one
+batch while the next ones are being downloaded. At most ``connections``
+batches are requested or waiting at any time which keeps memory bounded.
+"""
+import math
+import threading
+
+from multiprocessing.pool import ThreadPool
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from . import api
+
+DEFAULT_CONNECTIONS = 4
+"""Number of batches downloaded at the same time."""
+
+
+def split_batches(ranges, batch_size=None, connections=1):
+    """Divide ``ranges`` into batches of ``batch_size`` ranges.
+
+    If ``batch_size`` is not specified the ranges are divided evenly between
+    the ``connections``.
+    """
+    if not batch_size:
+        batch_size = int(math.ceil(len(ranges) / float(max(1, connections))))
+    batch_size = max(1, batch_size)
+    return [ranges[start:start + batch_size]
+            for start in range(0, len(ranges), batch_size)]
+
+
+def iter_value_ranges(service, spreadsheet_id, ranges, batch_size=None,
+                      connections=1, service_factory=None):
+    """Fetch values of ``ranges`` and yield them batch by batch.
+
+    ``httplib2`` connections can't be shared between threads, so with more
+    than one connection each thread creates its own service with
+    ``service_factory``.
+
+    Args:
+        service: The service used when values are fetched sequentially.
+        spreadsheet_id (str): The id of the spreadsheet to download.
+        ranges (list): A1 notation ranges of the sheets to download.
+        batch_size (int): The number of ranges requested at once. Ranges
+            are divided evenly between connections if not specified.
+        connections (int): The number of batches requested at the same time.
+        service_factory: Function creating a new service for each thread.
+
+    Yields:
+        list: Value ranges of a batch in the order of its ranges. Batches are
+            yielded in the order in which they were downloaded.
+    """
+    batches = split_batches(ranges, batch_size, connections)
+
+    if connections <= 1 or len(batches) <= 1:
+        for batch in batches:
+            response = api.batch_get_values(service, spreadsheet_id, batch)
+            yield response['valueRanges']
+        return
+
+    local = threading.local()
+    results = queue.Queue()
+
+    def fetch(batch):
+        try:
+            if not hasattr(local, 'service'):
+                local.service = service_factory()
+            response = api.batch_get_values(local.service, spreadsheet_id,
+                                            batch)
+            results.put((response['valueRanges'], None))
+        except Exception as e:
+            results.put((None, e))
+
+    pending = iter(batches)
+    pool = ThreadPool(min(connections, len(batches)))
+    try:
+        in_flight = 0
+        for batch in pending:
+            pool.apply_async(fetch, (batch,))
+            in_flight += 1
+            if in_flight == connections:
+                break
+
+        while in_flight:
+            value_ranges, error = results.get()
+            in_flight -= 1
+            if error is not None:
+                raise error
+
+            # Keep the connections busy while the caller processes values
+            batch = next(pending, None)
+            if batch is not None:
+                pool.apply_async(fetch, (batch,))
+                in_flight += 1
+
+            yield value_ranges
+    finally:
+        pool.close()
+        pool.join()
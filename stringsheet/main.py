@@ -1,10 +1,56 @@
+import collections
+import functools
+import json
+import operator
+import os
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from . import a1
 from . import api
+from . import cache
+from . import concurrency
+from . import diff
+from . import fetcher
+from . import metadata
+from . import mirror
 from . import model
 from . import parser
+from . import planner
+from . import timings
 from . import writer
 
+_output = threading.local()
+
+_metadata = metadata.MetadataCache()
+"""Sheet properties fetched by the running command."""
+
+BatchProject = collections.namedtuple(
+    'BatchProject',
+    ['name', 'res_dir', 'spreadsheet_id', 'direction', 'diff_only'])
+"""A project synchronized by the batch command."""
+
+BatchResult = collections.namedtuple(
+    'BatchResult', ['project', 'error', 'seconds', 'output'])
+"""Outcome of synchronizing a project. ``error`` is ``None`` on success."""
+
+_DIRECTIONS = ('upload', 'download')
+
 
-def create(project_name, source_dir='.', multi_sheet=False):
+def _print(*args):
+    """Print a message or collect it when running a project of a batch."""
+    message = ' '.join(str(arg) for arg in args)
+    lines = getattr(_output, 'lines', None)
+    if lines is None:
+        print(message)
+    else:
+        lines.append(message)
+
+
+def create(project_name, source_dir='.', multi_sheet=False, jobs=1,
+           streaming=False, cache_dir=None):
     """Create new Google Spreadsheet for managing translations.
 
     Args:
@@ -14,22 +60,32 @@ def create(project_name, source_dir='.', multi_sheet=False):
             Android project.
         multi_sheet (bool): Upload each language to a separate sheet
             (in the same file)
+        jobs (int): The number of worker processes used to parse strings.
+        streaming (bool): Parse string files incrementally to limit memory
+            usage.
+        cache_dir (str): A path to the directory with cached parse results.
+            Files which didn't change since the last run are not parsed
+            again. Caching is disabled if not specified.
     """
     service = _authenticate()
-    resources = _parse_resources(source_dir)
+    _metadata.clear()
+    resources = _parse_resources(source_dir, jobs, streaming, cache_dir)
     spreadsheet_id = _create_spreadsheet(service, project_name, multi_sheet,
                                          resources)
 
     spreadsheet_link = create_link(spreadsheet_id)
-    print('Link:', spreadsheet_link)
+    _print('Link:', spreadsheet_link)
 
     _upload(service, spreadsheet_id, resources)
     _create_formatting_rules(service, spreadsheet_id, multi_sheet, resources)
-    print()
-    print('Success')
+    _print_request_stats()
+    _print()
+    _print('Success')
 
 
-def upload(spreadsheet_id, source_dir='.'):
+def upload(spreadsheet_id, source_dir='.', jobs=1, streaming=False,
+           cache_dir=None, diff_only=False, connections=1, resume=False,
+           mirror_dir=None):
     """Uploads project strings to Google Spreadsheet.
 
     If ``spreadsheet_id`` is empty a new spreadsheet will be created.
@@ -41,15 +97,64 @@ def upload(spreadsheet_id, source_dir='.'):
         spreadsheet_id (str): The id of the Google Spreadsheet to use.
         source_dir (str): A path to the resources directory of your Android
             project.
+        jobs (int): The number of worker processes used to parse strings.
+        streaming (bool): Parse string files incrementally to limit memory
+            usage.
+        cache_dir (str): A path to the directory with cached parse results.
+            Files which didn't change since the last run are not parsed
+            again. Caching is disabled if not specified.
+        diff_only (bool): Compare the local strings with the spreadsheet and
+            only write the cells that changed. Rows of new and removed strings
+            are inserted and deleted and translations entered in the
+            spreadsheet are kept.
+        connections (int): The number of value chunks uploaded at the same
+            time.
+        resume (bool): Skip the chunks which were uploaded by a previous
+            failed run with the same values.
+        mirror_dir (str): A path to the directory with local mirrors of
+            spreadsheets. Nothing is uploaded if the strings didn't change
+            since the last synchronization and only the changed cells are
+            written if no strings or languages were added or removed.
+            Mirroring is disabled if not specified.
     """
-    service = _authenticate()
-    resources = _parse_resources(source_dir)
-    _upload(service, spreadsheet_id, resources)
-    print()
-    print('Success')
-
+    resources = _parse_resources(source_dir, jobs, streaming, cache_dir)
+
+    spreadsheet_mirror = None
+    stored_cells = None
+    if mirror_dir:
+        spreadsheet_mirror = mirror.Mirror.for_spreadsheet(spreadsheet_id,
+                                                           mirror_dir)
+        with timings.phase('mirror'):
+            cells = _local_cells(resources)
+            if spreadsheet_mirror.last_sync():
+                stored_cells = spreadsheet_mirror.load_cells()
+            unchanged = (stored_cells is not None and
+                         not any(mirror.compare_cells(stored_cells, cells)))
+        if unchanged:
+            spreadsheet_mirror.close()
+            _print('No changes since the last sync')
+            _print()
+            _print('Success')
+            return
+
+    if stored_cells is not None and not _has_same_rows(stored_cells, cells):
+        stored_cells = None
 
-def download(spreadsheet_id, target_dir='.'):
+    service = _authenticate()
+    _metadata.clear()
+    _upload(service, spreadsheet_id, resources, diff_only, connections,
+            resume, stored_cells)
+    if spreadsheet_mirror:
+        with timings.phase('mirror'), spreadsheet_mirror:
+            changes = spreadsheet_mirror.record(cells, 'upload')
+        _print_mirror_changes(changes)
+    _print_request_stats()
+    _print()
+    _print('Success')
+
+
+def download(spreadsheet_id, target_dir='.', jobs=1, batch_size=None,
+             connections=fetcher.DEFAULT_CONNECTIONS, mirror_dir=None):
     """Parse Google spreadsheet and save the result as Android strings.
 
     Parse the spreadsheet with the specified ``spreadsheet_id`` and save
@@ -61,12 +166,248 @@ def download(spreadsheet_id, target_dir='.'):
         target_dir (str): A path to the directory where the resulting files
             should be saved. Usually you want to set this to the resources
             directory of your Android project.
+        jobs (int): The number of worker processes used to write strings.
+        batch_size (int): The number of sheets requested at once. Sheets are
+            divided evenly between connections if not specified.
+        connections (int): The number of batches of sheets downloaded at the
+            same time. Each batch is parsed and saved as soon as it arrives.
+        mirror_dir (str): A path to the directory with local mirrors of
+            spreadsheets. The downloaded cells are stored in the mirror.
+            Mirroring is disabled if not specified.
     """
     service = _authenticate()
-    strings_by_language = _download_strings(service, spreadsheet_id)
-    _write_strings(strings_by_language, target_dir)
-    print()
-    print('Success')
+    _metadata.clear()
+    cells = {} if mirror_dir else None
+    _download(service, spreadsheet_id, target_dir, jobs, batch_size,
+              connections, cells)
+    if mirror_dir:
+        with timings.phase('mirror'), mirror.Mirror.for_spreadsheet(
+                spreadsheet_id, mirror_dir) as spreadsheet_mirror:
+            changes = spreadsheet_mirror.record(cells, 'download')
+        _print_mirror_changes(changes)
+    _print_request_stats()
+    _print()
+    _print('Success')
+
+
+def status(spreadsheet_id, source_dir='.', jobs=1, streaming=False,
+           cache_dir=None, mirror_dir=None):
+    """Show strings which changed since the last upload or download.
+
+    Local strings are compared with the mirror stored by ``upload`` or
+    ``download`` with mirroring enabled. No API requests are made, so
+    changes made in the spreadsheet itself are not detected.
+
+    Args:
+        spreadsheet_id (str): The id of the mirrored Google Spreadsheet.
+        source_dir (str): A path to the resources directory of your Android
+            project.
+        jobs (int): The number of worker processes used to parse strings.
+        streaming (bool): Parse string files incrementally to limit memory
+            usage.
+        cache_dir (str): A path to the directory with cached parse results.
+        mirror_dir (str): A path to the directory with local mirrors of
+            spreadsheets. Uses the default location if not specified.
+
+    Returns:
+        mirror.Changes: The changed cells or ``None`` if the spreadsheet
+            was never synchronized with mirroring enabled.
+    """
+    resources = _parse_resources(source_dir, jobs, streaming, cache_dir)
+
+    _print(':: Comparing with the mirror...')
+    with timings.phase('mirror'), mirror.Mirror.for_spreadsheet(
+            spreadsheet_id, mirror_dir) as spreadsheet_mirror:
+        sync = spreadsheet_mirror.last_sync()
+        if sync is None:
+            _print('The spreadsheet is not mirrored. Run upload or download '
+                   'with --mirror first.')
+            return None
+        changes = spreadsheet_mirror.changes(_local_cells(resources))
+
+    _print('Last sync: %s at %s (revision %d)'
+           % (sync.direction,
+              time.strftime('%Y-%m-%d %H:%M:%S',
+                            time.localtime(sync.timestamp)),
+              sync.revision))
+    _print_mirror_changes(changes, True)
+    return changes
+
+
+def batch(manifest_path, jobs=1, connections=4, streaming=False,
+          cache_dir=None):
+    """Upload or download strings of multiple projects.
+
+    The manifest is a JSON file listing the projects::
+
+        {
+            "projects": [
+                {"res": "app/src/main/res", "spreadsheet": "<id>",
+                 "direction": "upload", "diff": true},
+                {"res": "lib/src/main/res", "spreadsheet": "<id>",
+                 "direction": "download"}
+            ]
+        }
+
+    Paths are relative to the manifest file. Authentication happens only
+    once. Strings of all uploaded projects are parsed in parallel and then
+    the API calls of up to ``connections`` projects run at the same time.
+    A failure of one project doesn't stop the others.
+
+    Args:
+        manifest_path (str): A path to the manifest file.
+        jobs (int): The number of worker processes used to parse strings.
+        connections (int): The number of projects synchronized at the same
+            time.
+        streaming (bool): Parse string files incrementally to limit memory
+            usage.
+        cache_dir (str): A path to the directory with cached parse results.
+
+    Returns:
+        list: ``BatchResult`` of each project in the order of the manifest.
+    """
+    start = time.time()
+    projects = load_manifest(manifest_path)
+    _print(':: Authenticating...')
+    with timings.phase('authenticate'):
+        create_service = api.create_service_factory()
+    _metadata.clear()
+
+    uploads = [project for project in projects
+               if project.direction == 'upload']
+    _print(':: Parsing strings of %d projects...' % len(uploads))
+    parse = functools.partial(_parse_project, streaming=streaming,
+                              cache_dir=cache_dir)
+    parsed = dict(zip(uploads, concurrency.process_map(
+        parse, [project.res_dir for project in uploads], jobs)))
+
+    _print(':: Synchronizing %d projects...' % len(projects))
+    tasks = [(index, project) + parsed.get(project, (None, None))
+             for index, project in enumerate(projects)]
+    indexed_results = []
+    if tasks:
+        run = functools.partial(_run_batch_task, create_service)
+        pool = ThreadPool(max(1, min(connections, len(tasks))))
+        try:
+            for index, result in pool.imap_unordered(run, tasks):
+                indexed_results.append((index, result))
+                _print_batch_progress(result, len(indexed_results),
+                                      len(tasks))
+        finally:
+            pool.close()
+            pool.join()
+
+    indexed_results.sort(key=operator.itemgetter(0))
+    results = [result for _, result in indexed_results]
+    _print_batch_report(results, time.time() - start)
+    _print_request_stats()
+    return results
+
+
+def load_manifest(manifest_path):
+    """Read the projects listed in a batch manifest file.
+
+    Raises:
+        ValueError: If the manifest contains an invalid entry.
+    """
+    with open(manifest_path) as f:
+        data = json.load(f)
+    entries = data.get('projects', []) if isinstance(data, dict) else data
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    projects = []
+    for index, entry in enumerate(entries):
+        direction = entry.get('direction', 'upload')
+        if (not entry.get('res') or not entry.get('spreadsheet') or
+                direction not in _DIRECTIONS):
+            raise ValueError('Invalid manifest entry %d: expected "res", '
+                             '"spreadsheet" and "direction" (upload or '
+                             'download)' % index)
+        projects.append(BatchProject(
+            entry.get('name', entry['res']),
+            os.path.join(base_dir, entry['res']),
+            entry['spreadsheet'],
+            direction,
+            bool(entry.get('diff', False))))
+    return projects
+
+
+def _parse_project(res_dir, streaming=False, cache_dir=None):
+    try:
+        parse_cache = cache.ParseCache(cache_dir) if cache_dir else None
+        return parser.parse_resources(res_dir, 1, streaming,
+                                      parse_cache), None
+    except Exception as e:
+        return None, _describe_error(e)
+
+
+def _describe_error(error):
+    return '%s: %s' % (type(error).__name__, error)
+
+
+_services = threading.local()
+
+
+def _run_batch_task(create_service, task):
+    index, project, resources, error = task
+    start = time.time()
+    _output.lines = lines = []
+    try:
+        if error is None:
+            # httplib2 connections can't be shared between threads
+            if not hasattr(_services, 'service'):
+                _services.service = create_service()
+            _sync_project(_services.service, project, resources,
+                          create_service)
+    except Exception as e:
+        error = _describe_error(e)
+    finally:
+        del _output.lines
+    return index, BatchResult(project, error, time.time() - start, lines)
+
+
+def _sync_project(service, project, resources, create_service):
+    if project.direction == 'upload':
+        num_strings = resources['default'].count()
+        _print('Found %d languages and %d strings'
+               % (len(resources.languages()), num_strings))
+        _upload(service, project.spreadsheet_id, resources,
+                project.diff_only)
+    else:
+        _download(service, project.spreadsheet_id, project.res_dir,
+                  service_factory=create_service)
+
+
+def _print_batch_progress(result, index, count):
+    project = result.project
+    state = 'failed' if result.error else 'done'
+    _print(':: [%d/%d] %s (%s) %s in %.1f s'
+           % (index, count, project.name, project.direction, state,
+              result.seconds))
+    for line in result.output:
+        _print('    ' + line if line else '')
+    if result.error:
+        _print('    Error: ' + result.error)
+
+
+def _print_batch_report(results, seconds):
+    _print()
+    _print(':: Batch report')
+    for result in results:
+        project = result.project
+        if result.error:
+            _print(' > %s: %s failed (%.1f s): %s'
+                   % (project.name, project.direction, result.seconds,
+                      result.error))
+        else:
+            _print(' > %s: %s OK (%.1f s)'
+                   % (project.name, project.direction, result.seconds))
+
+    num_failed = sum(1 for result in results if result.error)
+    _print('Projects: %d succeeded, %d failed'
+           % (len(results) - num_failed, num_failed))
+    _print('Total time: %.1f s (sum of project times: %.1f s)'
+           % (seconds, sum(result.seconds for result in results)))
 
 
 def create_link(spreadsheet_id):
@@ -75,45 +416,53 @@ def create_link(spreadsheet_id):
 
 
 def _authenticate():
-    print(':: Authenticating...')
-    service = api.get_service()
+    _print(':: Authenticating...')
+    with timings.phase('authenticate'):
+        service = api.get_service()
     return service
 
 
-def _parse_resources(source_dir):
-    print(':: Parsing strings...')
-    resources = parser.parse_resources(source_dir)
+def _parse_resources(source_dir, jobs=1, streaming=False, cache_dir=None):
+    _print(':: Parsing strings...')
+    parse_cache = cache.ParseCache(cache_dir) if cache_dir else None
+    with timings.phase('parse'):
+        resources = parser.parse_resources(source_dir, jobs, streaming,
+                                           parse_cache)
 
     num_languages = len(resources.languages())
     num_strings = resources['default'].count()
-    print('Found %d languages and %d strings' % (num_languages, num_strings))
+    _print('Found %d languages and %d strings' % (num_languages, num_strings))
 
     return resources
 
 
 def _create_spreadsheet(service, project_name, multi_sheet, resources):
-    print(':: Creating spreadsheet...')
+    _print(':: Creating spreadsheet...')
     spreadsheet_name = project_name + ' (Translations)'
     spreadsheet_body = api.create_spreadsheet_body(
         spreadsheet_name,
         multi_sheet,
         resources.languages(),
         resources['default'].item_count() + 1)
-    response = api.create_spreadsheet(service, spreadsheet_body)
+    with timings.phase('create_spreadsheet'):
+        response = api.create_spreadsheet(service, spreadsheet_body)
 
     spreadsheet_id = response['spreadsheetId']
-    print('Created new spreadsheet with id:', spreadsheet_id)
+    _metadata.store(spreadsheet_id, response)
+    _print('Created new spreadsheet with id:', spreadsheet_id)
 
     return spreadsheet_id
 
 
-def _upload(service, spreadsheet_id, resources):
-    print(':: Uploading strings...')
+def _upload(service, spreadsheet_id, resources, diff_only=False,
+            connections=1, resume=False, stored_cells=None):
+    _print(':: Uploading strings...')
 
-    data = []
+    sheets = []
     requests = []
 
-    free_sheet_id, sheet_id_by_title = _get_sheets(service, spreadsheet_id)
+    free_sheet_id, sheet_id_by_title, first_title = _get_sheets(
+        service, spreadsheet_id)
     languages = resources.languages()
 
     num_valid = sum(1 for language in sheet_id_by_title.keys()
@@ -121,16 +470,16 @@ def _upload(service, spreadsheet_id, resources):
     has_template = 'Template' in sheet_id_by_title
 
     if num_valid == 0 and not has_template:
-        values = parser.create_spreadsheet_values(resources)
-        data.append({
-            'range': 'A:Z',
-            'values': values
-        })
+        with timings.phase('build_values'):
+            values = parser.create_spreadsheet_values(resources)
+        sheets.append((None, values))
     else:
         languages.insert(0, 'Template')
-        for language in languages:
-            values = parser.create_language_sheet_values(resources, language)
-            data.append(api.create_value_range(language, values))
+        with timings.phase('build_values'):
+            sheets_values = parser.create_language_sheets_values(resources,
+                                                                 languages)
+        for language, values in zip(languages, sheets_values):
+            sheets.append((language, values))
 
             if language not in sheet_id_by_title:
                 requests.append(api.create_add_sheet_request(
@@ -139,29 +488,204 @@ def _upload(service, spreadsheet_id, resources):
                 requests.append(api.create_frozen_properties_request(
                     free_sheet_id, 1, 0
                 ))
+                sheet_id_by_title[language] = free_sheet_id
                 free_sheet_id += 1
 
     if requests:
-        api.batch_update(service, spreadsheet_id, requests)
+        with timings.phase('add_sheets'):
+            api.batch_update(service, spreadsheet_id, requests)
+        _metadata.invalidate(spreadsheet_id)
+
+    if diff_only:
+        sheets = [(title or first_title, values) for title, values in sheets]
+        return _upload_changes(service, spreadsheet_id, sheets,
+                               sheet_id_by_title, connections, resume)
+
+    if stored_cells is not None and not requests:
+        # The rows of the spreadsheet match the mirror
+        sheets = [(title or first_title, values) for title, values in sheets]
+        with timings.phase('diff'):
+            data = _changed_value_ranges(sheets, stored_cells)
+        if not data:
+            _print('All cells are up to date')
+            return None
+        return _send_values(service, spreadsheet_id, data, connections,
+                            resume)
+
+    data = []
+    for title, values in sheets:
+        if title is None:
+            data.append({
+                'range': 'A:Z',
+                'values': values
+            })
+        else:
+            data.append(api.create_value_range(title, values))
+
+    return _send_values(service, spreadsheet_id, data, connections, resume)
+
+
+def _upload_changes(service, spreadsheet_id, sheets, sheet_id_by_title,
+                    connections=1, resume=False):
+    ranges = ["'%s'" % title for title, _ in sheets]
+    with timings.phase('fetch_values'):
+        response = api.batch_get_values(service, spreadsheet_id, ranges)
+
+    requests = []
+    data = []
+    inserted_rows = 0
+    deleted_rows = 0
+    with timings.phase('diff'):
+        for (title, values), value_range in zip(sheets,
+                                                response['valueRanges']):
+            sheet_diff = diff.diff_sheet_values(
+                sheet_id_by_title[title], title,
+                value_range.get('values', []), values)
+            requests.extend(sheet_diff.requests)
+            data.extend(sheet_diff.value_ranges)
+            inserted_rows += sheet_diff.inserted_rows
+            deleted_rows += sheet_diff.deleted_rows
+
+    _print('Changes:')
+    _print(' > Inserted rows: %d' % inserted_rows)
+    _print(' > Deleted rows: %d' % deleted_rows)
+
+    if requests:
+        with timings.phase('update_rows'):
+            api.batch_update(service, spreadsheet_id, requests)
+
+    if not data:
+        _print('All cells are up to date')
+        return None
+
+    return _send_values(service, spreadsheet_id, data, connections, resume)
 
-    body = {
-        'valueInputOption': 'RAW',
-        'data': data
-    }
 
-    response = api.batch_update_values(service, spreadsheet_id, body)
+def _has_same_rows(stored_cells, cells):
+    """Check if the cells have the same string ids and languages."""
+    return (set(key[0] for key in stored_cells) ==
+            set(key[0] for key in cells) and
+            set(key[1] for key in stored_cells) ==
+            set(key[1] for key in cells))
 
-    print('Strings uploaded:')
-    print(' > Updated rows: %d' % response['totalUpdatedRows'])
-    print(' > Updated columns: %d' % response['totalUpdatedColumns'])
-    print(' > Updated cells: %d' % response['totalUpdatedCells'])
-    print(' > Updated sheets: %d' % response['totalUpdatedSheets'])
 
+def _changed_value_ranges(sheets, stored_cells):
+    """Create value ranges of the cells which differ from ``stored_cells``.
+
+    Args:
+        sheets (list): ``(title, values)`` of each sheet. The rows must be
+            in the same order as in the spreadsheet.
+        stored_cells (dict): Cells of the last synchronization as returned by
+            ``mirror.cells_from_values``.
+
+    Returns:
+        list: A value range with a single cell for each changed cell.
+    """
+    data = []
+    for title, values in sheets:
+        header = values[0]
+        for row_index, row in enumerate(values[1:], 1):
+            string_id = row[0]
+            for column in range(1, len(header)):
+                if header[column] == 'comment':
+                    key = (string_id, 'default')
+                    stored = stored_cells.get(key, ('', ''))[1]
+                else:
+                    key = (string_id, header[column])
+                    stored = stored_cells.get(key, ('', ''))[0]
+                value = (row[column] if column < len(row) else None) or ''
+                if value != stored:
+                    data.append({
+                        'range': "'%s'!%s%d" % (title.replace("'", "''"),
+                                                a1.column_name(column),
+                                                row_index + 1),
+                        'values': [[value]]
+                    })
+    return data
+
+
+def _send_values(service, spreadsheet_id, data, connections=1, resume=False):
+    with timings.phase('plan_chunks'):
+        chunks = planner.plan_chunks(data)
+    if len(chunks) == 1:
+        with timings.phase('send_values'):
+            responses = planner.upload_chunks(service, spreadsheet_id,
+                                              chunks)
+        response = _combine_update_responses(responses)
+        _print_update_summary(response)
+        return response
+
+    state = planner.UploadState.for_spreadsheet(
+        spreadsheet_id, planner.plan_digest(chunks))
+    if resume and state.load():
+        _print('Resuming upload: %d/%d chunks were already uploaded'
+               % (len(state.completed), len(chunks)))
+
+    def report(chunk, response):
+        _print(' > Chunk %d/%d: %d cells (%d KB)'
+               % (chunk.index + 1, len(chunks),
+                  response['totalUpdatedCells'], chunk.num_bytes // 1024))
+
+    _print('Uploading values in %d chunks' % len(chunks))
+    try:
+        with timings.phase('send_values'):
+            responses = planner.upload_chunks(service, spreadsheet_id,
+                                              chunks, state, connections,
+                                              api.get_service, report)
+    except Exception:
+        _print('Upload failed after %d/%d chunks. Run the command again '
+               'with --resume to upload the remaining chunks.'
+               % (len(state.completed), len(chunks)))
+        raise
+    state.clear()
+
+    response = _combine_update_responses(responses)
+    _print_update_summary(response)
     return response
 
 
+def _combine_update_responses(responses):
+    combined = {
+        'totalUpdatedRows': 0,
+        'totalUpdatedColumns': 0,
+        'totalUpdatedCells': 0,
+        'totalUpdatedSheets': 0
+    }
+    sheets = set()
+    for response in responses:
+        combined['totalUpdatedRows'] += response.get('totalUpdatedRows', 0)
+        combined['totalUpdatedCells'] += response.get('totalUpdatedCells', 0)
+        # Chunks split by rows update the same columns
+        combined['totalUpdatedColumns'] = max(
+            combined['totalUpdatedColumns'],
+            response.get('totalUpdatedColumns', 0))
+        for value_response in response.get('responses', []):
+            title, _, _ = value_response['updatedRange'].rpartition('!')
+            sheets.add(title)
+    combined['totalUpdatedSheets'] = len(sheets)
+    return combined
+
+
+def _print_update_summary(response):
+    _print('Strings uploaded:')
+    _print(' > Updated rows: %d' % response['totalUpdatedRows'])
+    _print(' > Updated columns: %d' % response['totalUpdatedColumns'])
+    _print(' > Updated cells: %d' % response['totalUpdatedCells'])
+    _print(' > Updated sheets: %d' % response['totalUpdatedSheets'])
+
+
+def _print_request_stats():
+    scheduler = api.get_scheduler()
+    if not scheduler.retries and not scheduler.throttled_seconds:
+        return
+    _print('API requests: %d' % scheduler.requests)
+    _print(' > Retries: %d (%.1f s backoff)'
+           % (scheduler.retries, scheduler.backoff_seconds))
+    _print(' > Throttled: %.1f s' % scheduler.throttled_seconds)
+
+
 def _create_formatting_rules(service, spreadsheet_id, multi_sheet, resources):
-    print(':: Creating formatting rules...')
+    _print(':: Creating formatting rules...')
     languages = resources.languages()
     num_languages = len(languages)
     num_columns = num_languages + 3
@@ -177,62 +701,107 @@ def _create_formatting_rules(service, spreadsheet_id, multi_sheet, resources):
         requests.append(api.create_conditional_format_request(
             i, 1, num_rows, 3, num_columns))
 
-    api.batch_update(service, spreadsheet_id, requests)
+    with timings.phase('format'):
+        api.batch_update(service, spreadsheet_id, requests)
 
 
-def _download_strings(service, spreadsheet_id):
-    print(':: Downloading strings...')
+def _download(service, spreadsheet_id, target_dir, jobs=1, batch_size=None,
+              connections=fetcher.DEFAULT_CONNECTIONS, cells=None,
+              service_factory=api.get_service):
+    _print(':: Downloading strings...')
     ranges = _get_sheet_ranges(service, spreadsheet_id)
-    response = api.batch_get_values(service, spreadsheet_id, ranges)
-
-    resource_container = model.ResourceContainer()
-    for value_range in response['valueRanges']:
-        if 'values' not in value_range:
+    num_batches = len(fetcher.split_batches(ranges, batch_size, connections))
+    if num_batches > 1:
+        _print('Downloading %d sheets in %d batches'
+               % (len(ranges), num_batches))
+
+    results = []
+    batches = fetcher.iter_value_ranges(service, spreadsheet_id, ranges,
+                                        batch_size, connections,
+                                        service_factory)
+    while True:
+        # Waiting for the next batch, others may be parsed meanwhile
+        with timings.phase('fetch_values'):
+            value_ranges = next(batches, None)
+        if value_ranges is None:
+            break
+
+        resource_container = model.ResourceContainer()
+        with timings.phase('parse_values'):
+            for value_range in value_ranges:
+                if 'values' not in value_range:
+                    continue
+                values = value_range['values']
+                parser.parse_spreadsheet_values(resource_container, values)
+                if cells is not None:
+                    cells.update(mirror.cells_from_values(values))
+        if 'default' not in resource_container:
             continue
-        values = value_range['values']
-        parser.parse_spreadsheet_values(resource_container, values)
 
-    num_languages = len(resource_container) - 1
-    print('Downloaded translations in %d languages:' % num_languages)
+        # Languages of a batch are saved before the next batch is parsed
+        with timings.phase('write'):
+            batch_results = writer.write_strings_to_directory(
+                resource_container, target_dir, jobs)
+        total = resource_container['default'].item_count()
+        for result in batch_results:
+            translated = resource_container.translated_count(result.language)
+            progress = 100.0 * translated / total if total else 100.0
+            state = 'changed' if result.changed else 'unchanged'
+            _print(' > %s: %d/%d translated (%d%%) %s (%d ms)'
+                   % (result.language, translated, total, progress, state,
+                      result.seconds * 1000))
+        results.extend(batch_results)
 
-    total_strings = resource_container['default'].count()
+    num_changed = sum(1 for result in results if result.changed)
+    _print('Downloaded translations in %d languages' % len(results))
+    _print('Saved all strings to "%s"' % target_dir)
+    _print(' > Changed files: %d/%d' % (num_changed, len(results)))
 
-    for language in resource_container.languages():
-        language_strings = resource_container[language]
-        num_strings = language_strings.count()
-        progress = (num_strings / total_strings) * 100
-        print(' > %s: %d/%d (%d%%)'
-              % (language, num_strings, total_strings, progress))
 
-    return resource_container
+def _local_cells(resources):
+    return mirror.cells_from_values(
+        parser.create_spreadsheet_values(resources))
 
 
-def _write_strings(strings_by_language, target_dir):
-    print(':: Saving string files...')
-    writer.write_strings_to_directory(strings_by_language, target_dir)
+def _print_mirror_changes(changes, list_cells=False):
+    if not any(changes):
+        _print('No changes since the last sync')
+        return
 
-    print('Saved all strings to "%s"' % target_dir)
+    _print('Changes since the last sync:')
+    for label, keys in (('Added', changes.added),
+                        ('Modified', changes.modified),
+                        ('Removed', changes.removed)):
+        _print(' > %s cells: %d' % (label, len(keys)))
+        if list_cells:
+            for string_id, language in keys:
+                _print('   %s (%s)' % (string_id, language))
+
+
+def _get_sheet_properties(service, spreadsheet_id):
+    with timings.phase('metadata'):
+        return _metadata.get_sheets(service, spreadsheet_id)
 
 
 def _get_sheets(service, spreadsheet_id):
-    response = api.get_spreadsheet(service, spreadsheet_id)
     sheet_id_by_title = {}
+    first_title = None
     free_sheet_id = 1
-    for sheet in response['sheets']:
-        properties = sheet['properties']
+    for properties in _get_sheet_properties(service, spreadsheet_id):
         sheet_id = properties['sheetId']
         title = properties['title']
         sheet_id_by_title[title] = sheet_id
+        if first_title is None:
+            first_title = title
         free_sheet_id = max(free_sheet_id, sheet_id + 1)
-    return free_sheet_id, sheet_id_by_title
+    return free_sheet_id, sheet_id_by_title, first_title
 
 
 def _get_sheet_ranges(service, spreadsheet_id):
-    spreadsheet = api.get_spreadsheet(service, spreadsheet_id)
     ranges = []
 
-    for sheet in spreadsheet['sheets']:
-        title = sheet['properties']['title']
+    for properties in _get_sheet_properties(service, spreadsheet_id):
+        title = properties['title']
         if parser.is_language_valid(title):
             ranges.append("'%s'" % title)
 
@@ -0,0 +1,58 @@
+"""Memoized sheet properties of spreadsheets.
+
+Commands only need titles, ids and grid sizes of sheets. Requesting just
+these fields avoids downloading formatting, protected ranges and conditional
+formats of the whole spreadsheet.
+"""
+import threading
+
+from . import api
+
+SHEET_FIELDS = 'sheets.properties(sheetId,title,gridProperties)'
+"""Field mask of ``spreadsheets.get`` requesting only sheet properties."""
+
+
+class MetadataCache(object):
+    """Sheet properties fetched at most once per spreadsheet.
+
+    The cache is thread-safe. Entries must be invalidated after requests
+    which add or remove sheets.
+    """
+
+    def __init__(self):
+        self._sheets = {}
+        self._lock = threading.Lock()
+
+    def get_sheets(self, service, spreadsheet_id):
+        """Return properties of all sheets in the spreadsheet.
+
+        Returns:
+            list: Dicts with ``sheetId``, ``title`` and ``gridProperties`` of
+                each sheet in the order of the spreadsheet.
+        """
+        with self._lock:
+            sheets = self._sheets.get(spreadsheet_id)
+        if sheets is None:
+            response = api.get_spreadsheet(service, spreadsheet_id,
+                                           SHEET_FIELDS)
+            sheets = self.store(spreadsheet_id, response)
+        return sheets
+
+    def store(self, spreadsheet_id, response):
+        """Remember sheets of a spreadsheet resource returned by the API.
+
+        Can be used with responses of ``spreadsheets.create`` to avoid
+        fetching metadata of a new spreadsheet.
+        """
+        sheets = [sheet['properties'] for sheet in response.get('sheets', [])]
+        with self._lock:
+            self._sheets[spreadsheet_id] = sheets
+        return sheets
+
+    def invalidate(self, spreadsheet_id):
+        with self._lock:
+            self._sheets.pop(spreadsheet_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._sheets.clear()
@@ -0,0 +1,199 @@
+"""Local SQLite mirror of the last synchronized state of a spreadsheet.
+
+The mirror stores every non-empty cell of the spreadsheet as a row of the
+``cells`` table indexed by string id and language. Comparing it with local
+strings tells what changed since the last upload or download without any
+API calls.
+"""
+import collections
+import errno
+import os
+import sqlite3
+import time
+
+SCHEMA_VERSION = 1
+"""Version of the database schema stored in ``PRAGMA user_version``."""
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cells (
+    string_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    text TEXT NOT NULL,
+    comment TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    PRIMARY KEY (string_id, language)
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    revision INTEGER PRIMARY KEY AUTOINCREMENT,
+    direction TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+'''
+
+Changes = collections.namedtuple('Changes', ['added', 'modified', 'removed'])
+"""Cells that differ from the mirror.
+
+Each attribute is a sorted list of ``(string_id, language)`` keys.
+"""
+
+Sync = collections.namedtuple('Sync', ['revision', 'direction', 'timestamp'])
+"""A recorded upload or download."""
+
+
+def get_default_directory():
+    """Return the default location of the mirrors."""
+    return os.path.join(os.path.expanduser('~'), '.cache', 'stringsheet',
+                        'mirrors')
+
+
+def cells_from_values(values):
+    """Return cells of spreadsheet values keyed by string id and language.
+
+    ``values`` have the layout of the spreadsheet: a header row with
+    ``id``, ``comment``, ``default`` and languages, followed by a row for
+    each string. Empty translations are skipped. Reading stops at the first
+    row without an id or default text, like the spreadsheet parser.
+
+    Returns:
+        dict: ``(string_id, language)`` -> ``(text, comment)``.
+    """
+    cells = {}
+    if not values:
+        return cells
+
+    languages = values[0][2:]
+    for row in values[1:]:
+        if len(row) < 3 or not row[0] or not row[2]:
+            break
+        string_id = row[0]
+        comment = row[1]
+        for language, text in zip(languages, row[2:]):
+            if text:
+                cells[(string_id, language)] = (text, comment)
+    return cells
+
+
+def compare_cells(stored, cells):
+    """Compare ``cells`` with the ``stored`` cells.
+
+    Returns:
+        Changes: Keys of added, modified and removed cells.
+    """
+    added = []
+    modified = []
+    for key, cell in cells.items():
+        stored_cell = stored.get(key)
+        if stored_cell is None:
+            added.append(key)
+        elif stored_cell != cell:
+            modified.append(key)
+    removed = [key for key in stored if key not in cells]
+    return Changes(sorted(added), sorted(modified), sorted(removed))
+
+
+class Mirror(object):
+    """SQLite database with the last synchronized cells of a spreadsheet.
+
+    Args:
+        path (str): The path of the database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+
+    @classmethod
+    def for_spreadsheet(cls, spreadsheet_id, directory=None):
+        directory = directory or get_default_directory()
+        return cls(os.path.join(directory, spreadsheet_id + '.db'))
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _connect(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            try:
+                os.makedirs(directory)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            connection = sqlite3.connect(self.path)
+            version, = connection.execute('PRAGMA user_version').fetchone()
+            if version != SCHEMA_VERSION:
+                # Mirrors of other versions are rebuilt on the next sync
+                connection.executescript(
+                    'DROP TABLE IF EXISTS cells; DROP TABLE IF EXISTS syncs;')
+            connection.executescript(_SCHEMA)
+            connection.execute('PRAGMA user_version = %d' % SCHEMA_VERSION)
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def last_sync(self):
+        """Return the most recent ``Sync`` or ``None`` if there was none."""
+        if not self.exists():
+            return None
+        row = self._connect().execute(
+            'SELECT revision, direction, timestamp FROM syncs '
+            'ORDER BY revision DESC LIMIT 1').fetchone()
+        return Sync(*row) if row else None
+
+    def load_cells(self):
+        """Return all stored cells keyed by string id and language."""
+        if not self.exists():
+            return {}
+        rows = self._connect().execute(
+            'SELECT string_id, language, text, comment FROM cells')
+        return {(string_id, language): (text, comment)
+                for string_id, language, text, comment in rows}
+
+    def changes(self, cells):
+        """Compare ``cells`` with the mirror.
+
+        Returns:
+            Changes: Cells which changed since the last synchronization.
+        """
+        return compare_cells(self.load_cells(), cells)
+
+    def record(self, cells, direction):
+        """Store ``cells`` as the synchronized state of the spreadsheet.
+
+        Only the changed cells are written. They are marked with the revision
+        of the new synchronization.
+
+        Args:
+            cells (dict): Cells as returned by ``cells_from_values``.
+            direction (str): ``upload`` or ``download``.
+
+        Returns:
+            Changes: Cells which changed since the previous synchronization.
+        """
+        connection = self._connect()
+        changes = compare_cells(self.load_cells(), cells)
+        with connection:
+            cursor = connection.execute(
+                'INSERT INTO syncs (direction, timestamp) VALUES (?, ?)',
+                (direction, time.time()))
+            revision = cursor.lastrowid
+            connection.executemany(
+                'INSERT OR REPLACE INTO cells '
+                '(string_id, language, text, comment, revision) '
+                'VALUES (?, ?, ?, ?, ?)',
+                ((string_id, language) + cells[(string_id, language)] +
+                 (revision,)
+                 for string_id, language in changes.added + changes.modified))
+            connection.executemany(
+                'DELETE FROM cells WHERE string_id = ? AND language = ?',
+                changes.removed)
+        return changes
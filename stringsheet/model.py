@@ -1,6 +1,28 @@
+import bisect
 from operator import attrgetter
 
 from stringsheet import comparator
+from stringsheet import constants
+
+try:
+    from sys import intern as _intern_string
+except ImportError:  # Python 2
+    _intern_string = intern  # noqa: F821
+
+_INTERNED_ATTRIBUTES = ('name', 'quantity')
+
+
+def _intern(name):
+    """Return a shared instance of the ``name`` string.
+
+    Names of strings are repeated in every language so interning them lets
+    all models share a single copy.
+    """
+    try:
+        return _intern_string(name)
+    except TypeError:
+        # Python 2 can only intern byte strings
+        return name
 
 
 def _is_translatable(element):
@@ -11,12 +33,34 @@ def _is_reference(element):
     return element.text.startswith(('@', '?'))
 
 
-class String:
+class _CompactModel(object):
+    """Base class for models stored in large numbers.
+
+    Subclasses use ``__slots__`` to avoid a per-instance dictionary. Names are
+    interned again when a model is unpickled (e.g. when it is received from
+    a worker process or loaded from the parse cache).
+    """
+
+    __slots__ = ()
+
+    def __getstate__(self):
+        return [getattr(self, attribute) for attribute in self.__slots__]
+
+    def __setstate__(self, state):
+        for attribute, value in zip(self.__slots__, state):
+            if attribute in _INTERNED_ATTRIBUTES:
+                value = _intern(value)
+            setattr(self, attribute, value)
+
+
+class String(_CompactModel):
     """Model representing <string> tag in Android string resources."""
 
+    __slots__ = ('name', 'text', 'comment')
+
     def __init__(self, name, text, comment):
         self.text = text
-        self.name = name
+        self.name = _intern(name)
         self.comment = comment
 
     @staticmethod
@@ -27,9 +71,11 @@ class String:
                 not _is_reference(element))
 
 
-class StringArrayItem:
+class StringArrayItem(_CompactModel):
     """Model representing <item> tag for arrays in Android string resources."""
 
+    __slots__ = ('text', 'comment')
+
     def __init__(self, text, comment):
         self.text = text
         self.comment = comment
@@ -39,11 +85,13 @@ class StringArrayItem:
         return element.tag == 'item' and not _is_reference(element)
 
 
-class StringArray:
+class StringArray(_CompactModel):
     """Model representing <string-array> tag in Android string resources."""
 
+    __slots__ = ('name', 'comment', '_items')
+
     def __init__(self, name, comment):
-        self.name = name
+        self.name = _intern(name)
         self.comment = comment
         self._items = []
 
@@ -60,6 +108,10 @@ class StringArray:
         item = StringArrayItem(text, comment)
         self._items.append(item)
 
+    def translated_count(self):
+        """Return the number of items with a non-empty text."""
+        return sum(1 for item in self._items if item.text)
+
     @staticmethod
     def is_valid(element):
         return (element.tag == 'string-array' and
@@ -67,11 +119,13 @@ class StringArray:
                 _is_translatable(element))
 
 
-class PluralItem:
+class PluralItem(_CompactModel):
     """Model representing <plurals> tag in Android string resources."""
 
+    __slots__ = ('quantity', 'text', 'comment')
+
     def __init__(self, quantity, text, comment):
-        self.quantity = quantity
+        self.quantity = _intern(quantity)
         self.text = text
         self.comment = comment
 
@@ -82,30 +136,115 @@ class PluralItem:
                 not _is_reference(element))
 
 
-class PluralString:
+class PluralString(_CompactModel):
     """Model representing <item> tag for plurals in Android string resources."""
 
+    __slots__ = ('name', 'comment', '_items', '_fallback_comment',
+                 '_sorted_items')
+
     def __init__(self, name, comment):
-        self.name = name
+        self.name = _intern(name)
         self.comment = comment
         self._items = {}
+        self._fallback_comment = None
+        self._sorted_items = None
+
+    def __getstate__(self):
+        state = _CompactModel.__getstate__(self)
+        # Sorted items are created again when they are first accessed
+        state[-1] = None
+        return state
 
     def __getitem__(self, quantity):
-        return self._items[quantity]
+        item = self._items.get(quantity)
+        if item is None:
+            if quantity not in self:
+                raise KeyError(quantity)
+            other = self._items['other']
+            item = PluralItem(quantity, other.text, self._fallback_comment)
+        return item
 
     def __setitem__(self, quantity, plural_item):
         self._items[quantity] = plural_item
+        self._sorted_items = None
+
+    def set_item(self, plural_item):
+        """Add or replace the item with the quantity of ``plural_item``.
+
+        Returns:
+            tuple: The change of the number of items and of the number of
+                items with a non-empty text.
+        """
+        quantity = plural_item.quantity
+        if self._fallback_comment is not None:
+            # Missing items share the text of the 'other' item
+            items = len(self)
+            translated = self.translated_count()
+            self[quantity] = plural_item
+            return len(self) - items, self.translated_count() - translated
+
+        previous = self._items.get(quantity)
+        self[quantity] = plural_item
+        if previous is None:
+            return 1, 1 if plural_item.text else 0
+        return 0, bool(plural_item.text) - bool(previous.text)
 
     def __len__(self):
-        return len(self._items)
+        if self._fallback_comment is None:
+            return len(self._items)
+        num_missing = sum(1 for quantity in constants.QUANTITIES
+                          if quantity not in self._items)
+        return len(self._items) + num_missing
 
     def __contains__(self, quantity):
-        return quantity in self._items
+        return (quantity in self._items or
+                (self._fallback_comment is not None and
+                 quantity in constants.QUANTITIES))
+
+    def fill_missing(self, comment):
+        """Use the 'other' quantity for all quantities without an item.
+
+        The missing items are not stored. They are created on access from
+        the current text of the 'other' item and the specified ``comment``.
+        Nothing changes if no quantity is missing.
+
+        Args:
+            comment (str): The comment of the missing items.
+
+        Raises:
+            KeyError: If this plural doesn't have the 'other' quantity.
+        """
+        if 'other' not in self._items:
+            raise KeyError('other')
+        if all(quantity in self._items for quantity in constants.QUANTITIES):
+            return
+        self._fallback_comment = comment
+        self._sorted_items = None
 
     @property
     def sorted_items(self):
-        return sorted(self._items.values(),
-                      key=lambda item: comparator.quantity_order(item.quantity))
+        """Return items of this plural in the order of quantities.
+
+        The list is cached until an item is added and must not be modified.
+        If items are filled from 'other', only the stored items are cached
+        and a new list with the missing items is created on each access, so
+        that they follow changes of its text.
+        """
+        if self._sorted_items is None:
+            self._sorted_items = [self._items.get(quantity)
+                                  for quantity in constants.QUANTITIES
+                                  if quantity in self]
+        if self._fallback_comment is None:
+            return self._sorted_items
+        other = self._items['other']
+        return [item if item is not None else
+                PluralItem(quantity, other.text, self._fallback_comment)
+                for quantity, item in zip(constants.QUANTITIES,
+                                          self._sorted_items)]
+
+    def translated_count(self):
+        """Return the number of items with a non-empty text."""
+        return sum(1 for item in self.sorted_items if item.text)
 
     @staticmethod
     def is_valid(element):
@@ -114,13 +253,81 @@ class PluralString:
                 _is_translatable(element))
 
 
+class _SortedView(object):
+    """Values of a dictionary of named models sorted by their names.
+
+    Once sorted, the names are kept up to date as entries are added, so the
+    view is rebuilt in linear time without sorting again.
+    """
+
+    __slots__ = ('_entries', '_names', '_values')
+
+    def __init__(self, entries):
+        self._entries = entries
+        self._names = None
+        self._values = None
+
+    def added(self, name, is_new):
+        """Update the view after ``name`` was set in the dictionary."""
+        if self._values is not None:
+            if self._names is None:
+                self._names = [value.name for value in self._values]
+            self._values = None
+        if is_new and self._names is not None:
+            bisect.insort(self._names, name)
+
+    def reset(self):
+        """Sort the entries again on the next access."""
+        self._names = None
+        self._values = None
+
+    def values(self):
+        if self._values is None:
+            if self._names is None:
+                self._values = sorted(self._entries.values(),
+                                      key=attrgetter('name'))
+            else:
+                self._values = list(map(self._entries.__getitem__,
+                                        self._names))
+        return self._values
+
+
 class Resources:
-    """Model representing <resources> tag in Android string resources."""
+    """Model representing <resources> tag in Android string resources.
+
+    The numbers of items and translated items are kept up to date by the
+    ``add_*`` methods. Arrays and plurals must not be modified directly once
+    they are part of the model.
+    """
 
     def __init__(self):
         self._strings = {}
         self._arrays = {}
         self._plurals = {}
+        self._item_count = 0
+        self._translated_count = 0
+        self._counted = True
+        self._create_views()
+
+    def _create_views(self):
+        self._sorted_strings = _SortedView(self._strings)
+        self._sorted_arrays = _SortedView(self._arrays)
+        self._sorted_plurals = _SortedView(self._plurals)
+
+    def __getstate__(self):
+        # Sorted views are created again after unpickling
+        return {'_strings': self._strings,
+                '_arrays': self._arrays,
+                '_plurals': self._plurals,
+                '_item_count': self._item_count,
+                '_translated_count': self._translated_count,
+                '_counted': self._counted}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if '_counted' not in state:
+            self._counted = False
+        self._create_views()
 
     def __contains__(self, item):
         return (item in self._strings
@@ -135,29 +342,35 @@ class Resources:
     def sorted_strings(self):
         """Return a sorted list of strings stored in this model.
 
+        The list is cached until strings are added and must not be modified.
+
         Returns:
             list: List of strings sorted alphabetically based on their name.
         """
-        return sorted(self._strings.values(), key=attrgetter('name'))
+        return self._sorted_strings.values()
 
     @property
     def sorted_arrays(self):
         """Return a sorted list of arrays stored in this model.
 
+        The list is cached until arrays are added and must not be modified.
+
         Returns:
             list: List of string arrays sorted alphabetically based on their
                 name.
         """
-        return sorted(self._arrays.values(), key=attrgetter('name'))
+        return self._sorted_arrays.values()
 
     @property
     def sorted_plurals(self):
         """Return a sorted list of plurals stored in this model
 
+        The list is cached until plurals are added and must not be modified.
+
         Returns:
             list: List of plurals stored alphabetically based on their name.
         """
-        return sorted(self._plurals.values(), key=attrgetter('name'))
+        return self._sorted_plurals.values()
 
     def count(self):
         """Return a number of all models stored in this model.
@@ -181,18 +394,49 @@ class Resources:
         Returns:
             int: Number of all translatable items.
         """
-        array_item_count = sum([len(it) for it in self._arrays.values()])
-        plural_item_count = sum([len(it) for it in self._plurals.values()])
-        return len(self._strings) + array_item_count + plural_item_count
+        self._ensure_counted()
+        return self._item_count
+
+    def translated_count(self):
+        """Return a number of translatable items with a non-empty text.
+
+        Returns:
+            int: Number of strings, array items and plural items with text.
+        """
+        self._ensure_counted()
+        return self._translated_count
+
+    def _ensure_counted(self):
+        if self._counted:
+            return
+        entries = (list(self._arrays.values()) +
+                   list(self._plurals.values()))
+        self._item_count = (len(self._strings) +
+                            sum(len(entry) for entry in entries))
+        self._translated_count = (
+            sum(1 for string in self._strings.values() if string.text) +
+            sum(entry.translated_count() for entry in entries))
+        self._counted = True
+
+    def _count(self, items, translated):
+        if self._counted:
+            self._item_count += items
+            self._translated_count += translated
+
+    def _count_entry(self, entry, sign):
+        if self._counted and len(entry):
+            self._item_count += sign * len(entry)
+            self._translated_count += sign * entry.translated_count()
 
     def get_string_text(self, name):
         """Return text of a string with the specified name."""
         return self._strings[name].text if name in self._strings else ''
 
     def get_array_text(self, name, index):
-        if name not in self._arrays:
+        array = self._arrays.get(name)
+        if array is None or index >= len(array):
             return ''
-        return self._arrays[name].sorted_items[index].text
+        return array[index].text
 
     def get_plural_text(self, name, quantity):
         if name not in self._plurals:
@@ -200,24 +444,128 @@ class Resources:
         plural = self._plurals[name]
         return plural[quantity].text if quantity in plural else ''
 
+    def get_texts(self, keys):
+        """Return texts of all items identified by the specified ``keys``.
+
+        This resolves a whole spreadsheet column in a single pass.
+
+        Args:
+            keys (list): List of ``(kind, name, qualifier)`` tuples in the
+                format returned by :func:`comparator.parse_string_id`.
+
+        Returns:
+            list: Texts of the items in the same order as ``keys``. Missing
+                items are represented by empty strings.
+        """
+        strings = self._strings
+        arrays = self._arrays
+        plurals = self._plurals
+
+        texts = []
+        append = texts.append
+        for kind, name, qualifier in keys:
+            if kind == comparator.STRING:
+                string = strings.get(name)
+                append(string.text if string is not None else '')
+            elif kind == comparator.ARRAY:
+                array = arrays.get(name)
+                if array is not None and qualifier < len(array):
+                    append(array[qualifier].text)
+                else:
+                    append('')
+            else:
+                plural = plurals.get(name)
+                if plural is not None and qualifier in plural:
+                    append(plural[qualifier].text)
+                else:
+                    append('')
+        return texts
+
     def add_string(self, string):
-        self._strings[string.name] = string
+        name = string.name
+        previous = self._strings.get(name)
+        self._strings[name] = string
+        self._sorted_strings.added(name, previous is None)
+        if self._counted:
+            if previous is None:
+                self._item_count += 1
+                if string.text:
+                    self._translated_count += 1
+            else:
+                self._translated_count += (bool(string.text) -
+                                           bool(previous.text))
 
     def add_array(self, string_array):
-        self._arrays[string_array.name] = string_array
+        name = string_array.name
+        previous = self._arrays.get(name)
+        self._arrays[name] = string_array
+        self._sorted_arrays.added(name, previous is None)
+        if previous is not None:
+            self._count_entry(previous, -1)
+        self._count_entry(string_array, 1)
 
     def add_plural(self, plural):
-        self._plurals[plural.name] = plural
+        name = plural.name
+        previous = self._plurals.get(name)
+        self._plurals[name] = plural
+        self._sorted_plurals.added(name, previous is None)
+        if previous is not None:
+            self._count_entry(previous, -1)
+        self._count_entry(plural, 1)
 
     def add_array_item(self, name, text, comment, index):
         if name not in self._arrays:
-            self._arrays[name] = StringArray(name, '')
+            self.add_array(StringArray(name, ''))
         self._arrays[name].insert(index, StringArrayItem(text, comment))
+        if self._counted:
+            self._item_count += 1
+            if text:
+                self._translated_count += 1
 
     def add_plural_item(self, name, text, comment, quantity):
         if name not in self._plurals:
-            self._plurals[name] = PluralString(name, '')
-        self._plurals[name][quantity] = PluralItem(quantity, text, comment)
+            self.add_plural(PluralString(name, ''))
+        items, translated = self._plurals[name].set_item(
+            PluralItem(quantity, text, comment))
+        self._count(items, translated)
+
+    def merge(self, other, overwrite=True):
+        """Add all strings, arrays and plurals of ``other`` to this model.
+
+        Entries are merged by kind and name. Conflicting arrays and plurals
+        are replaced as a whole, their items are not merged.
+
+        Args:
+            other (Resources): The model whose entries should be added.
+            overwrite (bool): Replace existing entries with the same name by
+                the ones from ``other``. If ``False`` existing entries are
+                kept.
+
+        Returns:
+            int: Number of entries of ``other`` whose name was already used.
+        """
+        self._count(other.item_count(), other.translated_count())
+        conflicts = 0
+        for entries, other_entries, view in (
+                (self._strings, other._strings, self._sorted_strings),
+                (self._arrays, other._arrays, self._sorted_arrays),
+                (self._plurals, other._plurals, self._sorted_plurals)):
+            if other_entries:
+                view.reset()
+            if overwrite:
+                count = len(entries) + len(other_entries)
+                entries.update(other_entries)
+                conflicts += count - len(entries)
+            else:
+                for name, entry in other_entries.items():
+                    if name in entries:
+                        conflicts += 1
+                    else:
+                        entries[name] = entry
+        if conflicts:
+            # Replaced or skipped entries are counted again when needed
+            self._counted = False
+        return conflicts
 
 
 class ResourceContainer:
@@ -243,16 +591,30 @@ class ResourceContainer:
         return len(self._resources_by_language)
 
     def update(self, language, resources):
+        """Add ``resources`` to the resources of ``language``.
+
+        Entries of ``resources`` replace existing entries with the same name.
+
+        Returns:
+            int: Number of replaced entries.
+        """
         if language not in self._resources_by_language:
             self._resources_by_language[language] = resources
-        else:
-            existing = self._resources_by_language[language]
-            for string in resources.sorted_strings:
-                existing.add_string(string)
-            for array in resources.sorted_arrays:
-                existing.add_array(array)
-            for plural in resources.sorted_plurals:
-                existing.add_plural(plural)
+            return 0
+        return self._resources_by_language[language].merge(resources)
+
+    def translated_count(self, language):
+        """Return the number of translated items of ``language``."""
+        return self._resources_by_language[language].translated_count()
+
+    def untranslated_count(self, language):
+        """Return the number of default items without translation.
+
+        All translated items of ``language`` are assumed to exist in the
+        default language.
+        """
+        total = self._resources_by_language['default'].item_count()
+        return max(0, total - self.translated_count(language))
 
     def languages(self):
         """Return a sorted list of languages stored in this model.
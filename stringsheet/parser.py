@@ -1,15 +1,16 @@
+import functools
 import os
 
 from lxml import etree
 
 from . import comparator
-from . import constants
+from . import concurrency
 from . import model
 
 _COLUMN_LANGUAGE_ID_TEMPLATE = 'language-id'
 
 
-def parse_file(source, resources):
+def parse_file(source, resources, streaming=False):
     """Parse the ``source`` file and extract all found strings to ``resources``.
 
     Args:
@@ -21,7 +22,14 @@ def parse_file(source, resources):
             - a URL using the HTTP or FTP protocol
 
         resources: The resources model for storing the parsed strings.
+        streaming (bool): Parse the file incrementally and discard each
+            element once it has been converted to a model. This keeps memory
+            usage flat for very large files.
     """
+    if streaming:
+        _iterparse_file(source, resources)
+        return
+
     tree = etree.parse(source)
     root = tree.getroot()
 
@@ -30,26 +38,64 @@ def parse_file(source, resources):
 
     latest_comment = ''
     for element in root:
-        if element.tag is etree.Comment:
-            if element.tail.count('\n') <= 1:
-                latest_comment = element.text.strip()
-            continue
+        latest_comment = _parse_element(element, resources, latest_comment)
 
-        name = element.get('name', None)
-        if not name:
+
+def _iterparse_file(source, resources):
+    root = None
+    for event, element in etree.iterparse(source, events=('start', 'end')):
+        if root is None:
+            root = element
+            if not model.Resources.is_valid(root):
+                return
             latest_comment = ''
             continue
 
-        if model.String.is_valid(element):
-            resources.add_string(_parse_string(element, name, latest_comment))
+        if event != 'end' or element.getparent() is not root:
+            continue
+
+        # Comments preceding this element are complete now that their tail
+        # text has been read, so they are handled in document order here.
+        comments = []
+        previous = element.getprevious()
+        while previous is not None and previous.tag is etree.Comment:
+            comments.append(previous)
+            previous = previous.getprevious()
+        for comment in reversed(comments):
+            latest_comment = _parse_element(comment, resources, latest_comment)
+
+        latest_comment = _parse_element(element, resources, latest_comment)
+
+        element.clear()
+        while element.getprevious() is not None:
+            del root[0]
+
 
-        elif model.StringArray.is_valid(element):
-            resources.add_array(_parse_array(element, name, latest_comment))
+def _parse_element(element, resources, latest_comment):
+    """Parse a direct child of the <resources> tag.
 
-        elif model.PluralString.is_valid(element):
-            resources.add_plural(_parse_plural(element, name, latest_comment))
+    Returns:
+        str: The comment which should be attached to the next element.
+    """
+    if element.tag is etree.Comment:
+        if element.tail.count('\n') <= 1:
+            return element.text.strip()
+        return latest_comment
+
+    name = element.get('name', None)
+    if not name:
+        return ''
+
+    if model.String.is_valid(element):
+        resources.add_string(_parse_string(element, name, latest_comment))
+
+    elif model.StringArray.is_valid(element):
+        resources.add_array(_parse_array(element, name, latest_comment))
 
-        latest_comment = ''
+    elif model.PluralString.is_valid(element):
+        resources.add_plural(_parse_plural(element, name, latest_comment))
+
+    return ''
 
 
 def _parse_string(element, name, comment):
@@ -86,13 +132,8 @@ def _parse_plural(element, name, comment):
 
         latest_item_comment = comment
 
-    for quantity in constants.QUANTITIES:
-        if quantity not in plural:
-            # TODO: What to do if plural has no 'other' quantity?
-            other = plural['other']
-            plural[quantity] = model.PluralItem(
-                quantity, other.text, comment)
-
+    # TODO: What to do if plural has no 'other' quantity?
+    plural.fill_missing(comment)
     return plural
 
 
@@ -104,7 +145,7 @@ def _is_file_valid(file_name):
     return file_name.endswith('.xml') and file_name != 'donottranslate.xml'
 
 
-def parse_directory(directory):
+def parse_directory(directory, streaming=False, cache=None):
     """Parse XML files located under the specified directory as strings dict.
 
     The directory argument usually should point to one of the 'values-lang'
@@ -112,6 +153,9 @@ def parse_directory(directory):
 
     Args:
         directory (str): The path to directory with XML files to parse.
+        streaming (bool): Parse files incrementally to limit memory usage.
+        cache (cache.ParseCache): The cache used to skip parsing of files
+            which didn't change since they were last parsed.
 
     Returns:
         model.Resources: A model with parsed resources.
@@ -122,7 +166,10 @@ def parse_directory(directory):
     resources = model.Resources()
     for file_name in xml_files:
         file_path = os.path.join(directory, file_name)
-        parse_file(file_path, resources)
+        if cache:
+            resources.merge(cache.parse_file(file_path, streaming))
+        else:
+            parse_file(file_path, resources, streaming)
     return resources
 
 
@@ -143,7 +190,7 @@ def is_language_valid(language):
     return len(language) == 2
 
 
-def parse_resources(directory):
+def parse_resources(directory, jobs=1, streaming=False, cache=None):
     """Parse all string resources located under the specified `directory``.
 
     This function assumes that the passed ``directory`` corresponds to the "res"
@@ -153,12 +200,18 @@ def parse_resources(directory):
     Args:
         directory (str): The path to res directory of an Android project
             containing values directories with strings for each language.
+        jobs (int): The number of worker processes to use. When greater than
+            1 each language directory is parsed in a separate process.
+        streaming (bool): Parse files incrementally to limit memory usage.
+        cache (cache.ParseCache): The cache used to skip parsing of files
+            which didn't change since they were last parsed.
 
     Returns:
         model.ResourceContainer: A dictionary of strings mapped by language and
             then by string id.
     """
-    resources = model.ResourceContainer()
+    languages = []
+    language_dirs = []
     for child_name in os.listdir(directory):
         if not child_name.startswith('values'):
             continue
@@ -169,19 +222,90 @@ def parse_resources(directory):
             _, _, language = child_name.partition('-')
 
         if is_language_valid(language):
-            child_path = os.path.join(directory, child_name)
-            resources[language] = parse_directory(child_path)
+            languages.append(language)
+            language_dirs.append(os.path.join(directory, child_name))
+
+    parse = functools.partial(parse_directory, streaming=streaming,
+                              cache=cache)
+    parsed = concurrency.process_map(parse, language_dirs, jobs)
+
+    resources = model.ResourceContainer()
+    for language, language_resources in zip(languages, parsed):
+        resources[language] = language_resources
     return resources
 
 
 def create_language_sheet_values(resources, language):
-    title = language if language != 'Template' else _COLUMN_LANGUAGE_ID_TEMPLATE
-    return create_spreadsheet_values(resources, [title])
+    return create_language_sheets_values(resources, [language])[0]
+
+
+def create_language_sheets_values(resources, languages):
+    """Create values of separate sheets for each of the specified languages.
+
+    The columns with ids, comments and default texts are created only once
+    and shared by all sheets.
+
+    Args:
+        resources (model.ResourceContainer): A model with strings parsed
+            from Android XML strings files.
+        languages (list): List of languages for which to create sheets. The
+            special 'Template' language creates a sheet with an empty
+            translation column.
+
+    Returns:
+        list: List of spreadsheet rows and columns for each language.
+    """
+    keys, default_rows = _create_default_rows(resources['default'])
+    sheets = []
+    for language in languages:
+        if language == 'Template':
+            title = _COLUMN_LANGUAGE_ID_TEMPLATE
+            column = [''] * len(keys)
+        else:
+            title = language
+            column = resources[language].get_texts(keys)
+
+        rows = [['id', 'comment', 'default', title]]
+        rows.extend(row + [text] for row, text in zip(default_rows, column))
+        sheets.append(rows)
+    return sheets
+
+
+def _create_default_rows(default_strings):
+    """Create keys and the first columns of rows for all default strings.
+
+    Returns:
+        tuple: List of ``(kind, name, qualifier)`` keys identifying each row
+            and list of rows with id, comment and default text.
+    """
+    keys = []
+    rows = []
+
+    for string in default_strings.sorted_strings:
+        keys.append((comparator.STRING, string.name, None))
+        rows.append([string.name, string.comment, string.text])
+
+    for array in default_strings.sorted_arrays:
+        for index, item in enumerate(array):
+            item_name = '{0}[{1}]'.format(array.name, index)
+            keys.append((comparator.ARRAY, array.name, index))
+            rows.append([item_name, item.comment, item.text])
+
+    for plural in default_strings.sorted_plurals:
+        for item in plural.sorted_items:
+            item_name = '{0}{{{1}}}'.format(plural.name, item.quantity)
+            keys.append((comparator.PLURAL, plural.name, item.quantity))
+            rows.append([item_name, item.comment, item.text])
+
+    return keys, rows
 
 
 def create_spreadsheet_values(resources, languages=None):
     """Create rows and columns list that can be used to execute API calls.
 
+    The values are built column by column. Each language column is resolved
+    in a single pass over the default strings and then joined into rows.
+
     Args:
         resources (model.ResourceContainer): A model with strings parsed
             from Android XML strings files.
@@ -193,97 +317,75 @@ def create_spreadsheet_values(resources, languages=None):
     """
     if not languages:
         languages = resources.languages()
-    rows = [['id', 'comment', 'default'] + languages]
 
     is_template = (len(languages) == 1
                    and languages[0] == _COLUMN_LANGUAGE_ID_TEMPLATE)
 
-    default_strings = resources['default']
-    for string in default_strings.sorted_strings:
-        row = [string.name, string.comment, string.text]
-        if is_template:
-            row.append('')
-        else:
-            for language in languages:
-                row.append(resources[language].get_string_text(string.name))
-        rows.append(row)
-
-    for array in default_strings.sorted_arrays:
-        for index, item in enumerate(array):
-            item_name = '{0}[{1}]'.format(array.name, index)
-            row = [item_name, item.comment, item.text]
-            if is_template:
-                row.append('')
-            else:
-                for language in languages:
-                    row.append(resources[language].get_array_text(
-                        array.name, index))
-            rows.append(row)
+    keys, rows = _create_default_rows(resources['default'])
+    if is_template:
+        columns = [[''] * len(keys)]
+    else:
+        columns = [resources[language].get_texts(keys)
+                   for language in languages]
 
-    for plural in default_strings.sorted_plurals:
-        for item in plural.sorted_items:
-            item_name = '{0}{{{1}}}'.format(plural.name, item.quantity)
-            row = [item_name, item.comment, item.text]
-            if is_template:
-                row.append('')
-            else:
-                for language in languages:
-                    row.append(resources[language].get_plural_text(
-                        plural.name, item.quantity))
-            rows.append(row)
+    if columns:
+        for row, texts in zip(rows, zip(*columns)):
+            row.extend(texts)
 
-    return rows
+    return [['id', 'comment', 'default'] + languages] + rows
 
 
 def parse_spreadsheet_values(resource_container, values):
     """Parse the result returned by Google Spreadsheets API call.
 
+    Each row is validated and its string id is parsed only once. The rows are
+    then used to fill the resources of every language column.
+
     Args:
         resource_container (model.ResourceContainer): A model which will hold
             the parsed resources.
         values (dict): The json values data returned by Google Spreadsheets API.
     """
     title_row = values[0]
+    rows = _valid_rows(values)
+    keys = [comparator.parse_string_id(row[0]) for row in rows]
 
     for lang_index in range(2, len(title_row)):
         language = title_row[lang_index]
 
         resources = model.Resources()
-        for row in values[1:]:
-            column_count = len(row)
-            if column_count < 3:
-                # Actual strings shouldn't be separated by an empty row.
-                break
-
-            translation = row[lang_index] if column_count > lang_index else ''
-            string_id = row[0]
-            comment = row[1]
-            default_text = row[2]
-
-            if not string_id or not default_text:
-                # All strings must have id and a default text.
-                break
-
-            if ' ' in string_id:
-                # String ids can't contain whitespace characters.
-                # TODO: Check for more invalid characters
-                break
-
-            array_match = comparator.ARRAY_ID_PATTERN.match(string_id)
-            if array_match:
-                name = array_match.group(1)
-                index = int(array_match.group(2))
-                resources.add_array_item(name, translation, comment, index)
-                continue
-
-            plural_match = comparator.PLURAL_ID_PATTERN.match(string_id)
-            if plural_match:
-                name = plural_match.group(1)
-                quantity = plural_match.group(2)
-                resources.add_plural_item(name, translation, comment, quantity)
-                continue
-
-            resources.add_string(model.String(string_id, translation, comment))
+        add_string = resources.add_string
+        add_array_item = resources.add_array_item
+        add_plural_item = resources.add_plural_item
+        for row, (kind, name, qualifier) in zip(rows, keys):
+            translation = row[lang_index] if len(row) > lang_index else ''
+            if kind == comparator.STRING:
+                add_string(model.String(name, translation, row[1]))
+            elif kind == comparator.ARRAY:
+                add_array_item(name, translation, row[1], qualifier)
+            else:
+                add_plural_item(name, translation, row[1], qualifier)
 
         resource_container.update(language, resources)
 
+
+def _valid_rows(values):
+    """Return rows with strings up to the first invalid row."""
+    rows = []
+    for row in values[1:]:
+        if len(row) < 3:
+            # Actual strings shouldn't be separated by an empty row.
+            break
+
+        string_id = row[0]
+        if not string_id or not row[2]:
+            # All strings must have id and a default text.
+            break
+
+        if ' ' in string_id:
+            # String ids can't contain whitespace characters.
+            # TODO: Check for more invalid characters
+            break
+
+        rows.append(row)
+    return rows
@@ -0,0 +1,267 @@
+"""Splitting of large ``values.batchUpdate`` bodies into bounded chunks.
+
+A single request with all values of a big spreadsheet can exceed the payload
+and cell limits of the API. The planner divides value ranges into chunks
+which fit in the configured byte and cell budgets. Ranges which are too big
+are split by rows. Uploaded chunks are recorded in a state file so that a
+failed upload can be resumed.
+"""
+import collections
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+
+from multiprocessing.pool import ThreadPool
+
+from . import api
+from .a1 import column_index
+from .a1 import column_name
+
+MAX_CHUNK_BYTES = 2 * 1024 * 1024
+"""Maximum size of values in a single request. Recommended by Google."""
+
+MAX_CHUNK_CELLS = 50000
+"""Maximum number of cells written by a single request."""
+
+_RANGE_OVERHEAD = 48
+"""Approximate size of the JSON structure around the values of a range."""
+
+_CELLS_PATTERN = re.compile(r'^([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?$')
+
+_replace = getattr(os, 'replace', os.rename)
+
+Chunk = collections.namedtuple('Chunk', ['index', 'value_ranges',
+                                         'num_cells', 'num_bytes'])
+"""Value ranges sent in a single ``values.batchUpdate`` request."""
+
+
+def get_default_state_directory():
+    return os.path.join(os.path.expanduser('~'), '.cache', 'stringsheet',
+                        'uploads')
+
+
+def _parse_range(a1_range):
+    """Split ``a1_range`` into the sheet prefix and its first cell.
+
+    Returns:
+        tuple: The sheet prefix including the ``!`` separator (may be empty),
+            the index of the first column and the index of the first row.
+    """
+    title, sep, cells = a1_range.rpartition('!')
+    match = _CELLS_PATTERN.match(cells)
+    if not match:
+        raise ValueError('Unsupported range: %s' % a1_range)
+    start_column, start_row = match.group(1), match.group(2)
+    return (title + sep, column_index(start_column),
+            int(start_row) - 1 if start_row else 0)
+
+
+def _make_range(prefix, start_column, start_row, values):
+    width = max([len(row) for row in values] + [1])
+    return '%s%s%d:%s%d' % (prefix, column_name(start_column), start_row + 1,
+                            column_name(start_column + width - 1),
+                            start_row + len(values))
+
+
+def _row_size(row):
+    # Rows are separated by ', ' in the serialized body
+    return len(json.dumps(row)) + 2
+
+
+def _split_value_range(value_range, max_bytes, max_cells):
+    """Split a value range into ranges of rows which fit in the budgets."""
+    values = value_range['values']
+    prefix, start_column, start_row = _parse_range(value_range['range'])
+    overhead = len(prefix) + _RANGE_OVERHEAD
+
+    pieces = []
+    first = 0
+    num_bytes = overhead
+    num_cells = 0
+    for index, row in enumerate(values):
+        row_bytes = _row_size(row)
+        row_cells = len(row)
+        if index > first and (num_bytes + row_bytes > max_bytes or
+                              num_cells + row_cells > max_cells):
+            pieces.append((values[first:index], first, num_cells, num_bytes))
+            first = index
+            num_bytes = overhead
+            num_cells = 0
+        num_bytes += row_bytes
+        num_cells += row_cells
+    if first < len(values):
+        pieces.append((values[first:], first, num_cells, num_bytes))
+
+    return [({'range': _make_range(prefix, start_column, start_row + offset,
+                                   rows),
+              'values': rows}, num_cells, num_bytes)
+            for rows, offset, num_cells, num_bytes in pieces]
+
+
+def plan_chunks(value_ranges, max_bytes=MAX_CHUNK_BYTES,
+                max_cells=MAX_CHUNK_CELLS):
+    """Divide ``value_ranges`` into chunks within the byte and cell budgets.
+
+    The order of values is preserved. A single row which exceeds the budgets
+    is sent in a chunk of its own.
+
+    Args:
+        value_ranges (list): Value ranges of a ``values.batchUpdate`` body.
+        max_bytes (int): Maximum approximate JSON size of a chunk.
+        max_cells (int): Maximum number of cells in a chunk.
+
+    Returns:
+        list: List of ``Chunk`` objects.
+    """
+    chunks = []
+    current = []
+    num_bytes = 0
+    num_cells = 0
+    for value_range in value_ranges:
+        for piece, piece_cells, piece_bytes in _split_value_range(
+                value_range, max_bytes, max_cells):
+            if current and (num_bytes + piece_bytes > max_bytes or
+                            num_cells + piece_cells > max_cells):
+                chunks.append(Chunk(len(chunks), current, num_cells,
+                                    num_bytes))
+                current = []
+                num_bytes = 0
+                num_cells = 0
+            current.append(piece)
+            num_bytes += piece_bytes
+            num_cells += piece_cells
+    if current:
+        chunks.append(Chunk(len(chunks), current, num_cells, num_bytes))
+    return chunks
+
+
+def plan_digest(chunks):
+    """Return a digest identifying the contents of the planned chunks."""
+    data = json.dumps([chunk.value_ranges for chunk in chunks],
+                      sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class UploadState(object):
+    """Record of chunks of a plan that were already uploaded.
+
+    Args:
+        path (str): The path of the JSON file storing the state.
+        digest (str): The digest of the plan that is being uploaded.
+    """
+
+    def __init__(self, path, digest):
+        self.path = path
+        self.digest = digest
+        self.completed = set()
+
+    @classmethod
+    def for_spreadsheet(cls, spreadsheet_id, digest, directory=None):
+        directory = directory or get_default_state_directory()
+        return cls(os.path.join(directory, spreadsheet_id + '.json'), digest)
+
+    def load(self):
+        """Load completed chunks if the stored state is of the same plan.
+
+        Returns:
+            bool: ``True`` if a matching state was found.
+        """
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return False
+        if data.get('digest') != self.digest:
+            return False
+        self.completed = set(data.get('completed', []))
+        return True
+
+    def mark_completed(self, index):
+        self.completed.add(index)
+        self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'digest': self.digest,
+                           'completed': sorted(self.completed)}, f)
+            _replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def upload_chunks(service, spreadsheet_id, chunks, state=None, connections=1,
+                  service_factory=None, callback=None):
+    """Send the planned chunks as ``values.batchUpdate`` requests.
+
+    Chunks write disjoint cells, so with more than one connection they are
+    sent concurrently. ``httplib2`` connections can't be shared between
+    threads, so each thread creates its own service with ``service_factory``.
+
+    Args:
+        service: The service used to send requests in the calling thread.
+        spreadsheet_id (str): The id of the spreadsheet to update.
+        chunks (list): The chunks created by ``plan_chunks``.
+        state (UploadState): The state recording uploaded chunks. Chunks
+            already marked as completed are skipped.
+        connections (int): The number of chunks sent at the same time.
+        service_factory: Function creating a new service for each thread.
+            Required when ``connections`` is greater than 1.
+        callback: Function called with each uploaded chunk and its response.
+
+    Returns:
+        list: Responses of the sent requests in the order of completion.
+    """
+    pending = [chunk for chunk in chunks
+               if state is None or chunk.index not in state.completed]
+
+    def send(chunk, chunk_service=service):
+        body = {
+            'valueInputOption': 'RAW',
+            'data': chunk.value_ranges
+        }
+        return chunk, api.batch_update_values(chunk_service, spreadsheet_id,
+                                              body)
+
+    responses = []
+
+    def done(chunk, response):
+        if state is not None:
+            state.mark_completed(chunk.index)
+        if callback:
+            callback(chunk, response)
+        responses.append(response)
+
+    if connections <= 1 or len(pending) <= 1:
+        for chunk in pending:
+            done(*send(chunk))
+        return responses
+
+    local = threading.local()
+
+    def send_concurrently(chunk):
+        if not hasattr(local, 'service'):
+            local.service = service_factory()
+        return send(chunk, local.service)
+
+    pool = ThreadPool(min(connections, len(pending)))
+    try:
+        for chunk, response in pool.imap_unordered(send_concurrently,
+                                                   pending):
+            done(chunk, response)
+    finally:
+        pool.close()
+        pool.join()
+    return responses
@@ -0,0 +1,217 @@
+"""Scheduling of Google Sheets API requests within the usage limits.
+
+Sheets API limits the number of requests per minute for each user and for
+the whole project. Requests exceeding the limits fail with ``429`` errors,
+while ``5xx`` errors are returned when the servers are temporarily
+unavailable. The :class:`RequestScheduler` spaces requests so that they stay
+within the quotas and retries failed requests with exponential backoff.
+
+Requests which change the spreadsheet, like inserting rows, aren't safe to
+send twice. A server error or a timeout doesn't tell whether the server has
+applied them, so they are only retried after errors which guarantee that
+they weren't.
+"""
+import errno
+import random
+import socket
+import threading
+import time
+
+import httplib2
+from googleapiclient import errors
+
+USER_REQUESTS_PER_MINUTE = 60
+"""Requests allowed per minute for each user of a project."""
+
+PROJECT_REQUESTS_PER_MINUTE = 300
+"""Requests allowed per minute for the whole project."""
+
+RETRYABLE_STATUSES = frozenset([429, 500, 502, 503, 504])
+REJECTED_STATUSES = frozenset([429])
+"""Statuses of requests which were certainly not applied by the server."""
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD'])
+_RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class TokenBucket(object):
+    """Rate limiter allowing bursts of up to ``capacity`` requests.
+
+    Tokens are refilled with a constant ``rate``. Reserving a token never
+    blocks, instead the time the caller has to wait for it is returned. This
+    way concurrent callers are given consecutive time slots.
+
+    Args:
+        rate (float): The number of tokens added per second.
+        capacity (int): The maximum number of stored tokens.
+        clock: Function returning the current time in seconds.
+    """
+
+    def __init__(self, rate, capacity, clock=_clock):
+        self.rate = float(rate)
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+
+    @classmethod
+    def per_minute(cls, requests, clock=_clock):
+        return cls(requests / 60.0, requests, clock)
+
+    def reserve(self):
+        """Take one token and return the seconds to wait until it's valid."""
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+
+def _is_rate_limit_error(error):
+    content = error.content
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', 'replace')
+    return any(reason in content for reason in _RATE_LIMIT_REASONS)
+
+
+def _is_unsent(error):
+    """Check whether ``error`` happened before the request could be sent."""
+    if isinstance(error, httplib2.ServerNotFoundError):
+        return True
+    return (isinstance(error, socket.error) and
+            getattr(error, 'errno', None) == errno.ECONNREFUSED)
+
+
+def is_retryable(error, idempotent=True):
+    """Check whether the request which raised ``error`` may succeed later.
+
+    Args:
+        error (Exception): The error raised by the request.
+        idempotent (bool): Whether the request may be safely sent again even
+            if the server has already applied it. Other requests are only
+            retried when they were rejected or couldn't be sent.
+    """
+    if isinstance(error, errors.HttpError):
+        status = error.resp.status
+        if status in REJECTED_STATUSES:
+            return True
+        if status == 403:
+            return _is_rate_limit_error(error)
+        return idempotent and status in RETRYABLE_STATUSES
+    if _is_unsent(error):
+        return True
+    return idempotent and isinstance(error,
+                                     (socket.error, httplib2.HttpLib2Error))
+
+
+def is_idempotent(request):
+    """Check whether ``request`` may be sent again after an unknown result."""
+    return request.method in IDEMPOTENT_METHODS
+
+
+def _retry_after(error):
+    """Return the delay requested by the server in seconds or ``None``."""
+    resp = getattr(error, 'resp', None)
+    value = resp.get('retry-after') if resp is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RequestScheduler(object):
+    """Executes API requests within the quotas and retries transient errors.
+
+    The scheduler is thread-safe and should be shared by all threads sending
+    requests on behalf of the same user.
+
+    Args:
+        buckets (list): Token buckets that each request has to pass.
+            Defaults to the per-user and per-project Sheets API quotas.
+        max_retries (int): The number of times a request is retried before
+            its error is raised.
+        base_delay (float): The delay before the first retry in seconds.
+        max_delay (float): The maximum delay between retries in seconds.
+        sleep: Function used to wait for the specified number of seconds.
+        clock: Function returning the current time in seconds.
+        random: Function returning a random float in ``[0, 1)``.
+
+    Attributes:
+        requests (int): Number of executed requests including retries.
+        retries (int): Number of retried requests.
+        throttled_seconds (float): Time spent waiting for the quota.
+        backoff_seconds (float): Time spent waiting before retries.
+    """
+
+    def __init__(self, buckets=None, max_retries=8, base_delay=1.0,
+                 max_delay=64.0, sleep=time.sleep, clock=_clock,
+                 random=random.random):
+        if buckets is None:
+            buckets = [TokenBucket.per_minute(USER_REQUESTS_PER_MINUTE, clock),
+                       TokenBucket.per_minute(PROJECT_REQUESTS_PER_MINUTE,
+                                              clock)]
+        self.buckets = buckets
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._random = random
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self.backoff_seconds = 0.0
+
+    def backoff_delay(self, attempt):
+        """Return the delay before retry number ``attempt`` (from 0)."""
+        delay = self.base_delay * (2 ** attempt)
+        return min(self.max_delay, delay + self._random() * self.base_delay)
+
+    def _throttle(self):
+        with self._lock:
+            delay = max([bucket.reserve() for bucket in self.buckets] + [0.0])
+            self.requests += 1
+            self.throttled_seconds += delay
+        if delay > 0:
+            self._sleep(delay)
+
+    def execute(self, request, idempotent=None):
+        """Execute ``request`` and return its result.
+
+        Args:
+            request: An object with an ``execute()`` method and the HTTP
+                ``method`` attribute, usually
+                ``googleapiclient.http.HttpRequest``.
+            idempotent (bool): Whether the request may be sent again after a
+                server error or a timeout. By default only ``GET`` requests
+                are.
+
+        Raises:
+            googleapiclient.errors.HttpError: If the request failed with a
+                non-retryable error or all retries failed.
+        """
+        if idempotent is None:
+            idempotent = is_idempotent(request)
+        attempt = 0
+        while True:
+            self._throttle()
+            try:
+                return request.execute()
+            except Exception as e:
+                if (attempt >= self.max_retries or
+                        not is_retryable(e, idempotent)):
+                    raise
+                delay = self.backoff_delay(attempt)
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                with self._lock:
+                    self.retries += 1
+                    self.backoff_seconds += delay
+                self._sleep(delay)
+                attempt += 1
@@ -0,0 +1,110 @@
+"""Wall time, CPU time, HTTP traffic and API requests of command phases.
+
+Commands mark their phases with :func:`phase`. Phases are only measured
+while a :class:`Recorder` is active, otherwise :func:`phase` does nothing.
+
+Traffic and requests are totals of the whole process, so a phase also
+includes requests sent by other threads while it was running. CPU time is
+the time of all threads of the process.
+"""
+import contextlib
+import threading
+import time
+
+from . import api
+
+_process_time = getattr(time, 'process_time', None) or time.clock
+
+_FIELDS = ('wall_seconds', 'cpu_seconds', 'http_requests', 'bytes_sent',
+           'bytes_received', 'api_requests', 'retries')
+
+
+class Recorder(object):
+    """Measurements of phases of a command.
+
+    Phases with the same name are summed up. They may be nested, in which
+    case the outer phase includes the inner one.
+
+    Args:
+        command (str): The name of the measured command.
+        clock: Function returning the wall time in seconds.
+        cpu_clock: Function returning the CPU time of the process in seconds.
+    """
+
+    def __init__(self, command, clock=time.time, cpu_clock=_process_time):
+        self.command = command
+        self._clock = clock
+        self._cpu_clock = cpu_clock
+        self._phases = {}
+        self._order = []
+        self._lock = threading.Lock()
+        self._start = self._snapshot()
+
+    def _snapshot(self):
+        traffic = api.get_traffic()
+        scheduler = api.get_scheduler()
+        return (self._clock(), self._cpu_clock(), traffic.requests,
+                traffic.bytes_sent, traffic.bytes_received,
+                scheduler.requests, scheduler.retries)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Measure the enclosed block as a part of the phase ``name``."""
+        start = self._snapshot()
+        try:
+            yield
+        finally:
+            deltas = [end - begin
+                      for begin, end in zip(start, self._snapshot())]
+            with self._lock:
+                stats = self._phases.get(name)
+                if stats is None:
+                    stats = self._phases[name] = dict.fromkeys(_FIELDS, 0)
+                    stats['calls'] = 0
+                    self._order.append(name)
+                stats['calls'] += 1
+                for field, delta in zip(_FIELDS, deltas):
+                    stats[field] += delta
+
+    def report(self):
+        """Return the totals and phases in a JSON serializable dict."""
+        deltas = [end - begin
+                  for begin, end in zip(self._start, self._snapshot())]
+        report = {'command': self.command}
+        report.update(zip(_FIELDS, deltas))
+        with self._lock:
+            report['phases'] = [dict(self._phases[name], name=name)
+                                for name in self._order]
+        return report
+
+
+_recorder = None
+
+
+def start(command):
+    """Start measuring phases of ``command``.
+
+    Returns:
+        Recorder: The active recorder.
+    """
+    global _recorder
+    _recorder = Recorder(command)
+    return _recorder
+
+
+def stop():
+    """Stop measuring and return the report of the active recorder."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder.report() if recorder else None
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Measure the enclosed block as a part of the phase ``name``."""
+    recorder = _recorder
+    if recorder is None:
+        yield
+        return
+    with recorder.phase(name):
+        yield
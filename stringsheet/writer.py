@@ -1,84 +1,165 @@
+import collections
 import errno
+import io
 import os
+import tempfile
+import timeit
 
 from lxml import etree
 
+from . import concurrency
 
-def _indent(element, indent_char='\t', level=0):
-    indent_text = '\n' + level * indent_char
-    if len(element):
-        if not element.text or not element.text.strip():
-            element.text = indent_text + indent_char
-        if not element.tail or not element.tail.strip():
-            element.tail = indent_text
-        for element in element:
-            _indent(element, indent_char, level + 1)
-        if not element.tail or not element.tail.strip():
-            element.tail = indent_text
-    elif level and (not element.tail or not element.tail.strip()):
-        element.tail = indent_text
+_replace = getattr(os, 'replace', os.rename)
 
 
-def builds_strings_tree(resources):
-    root = etree.Element('resources')
+def _get_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
 
+
+# The umask can only be read by changing it, so it is read once on import
+# instead of while other threads may be creating files.
+_DEFAULT_FILE_MODE = 0o666 & ~_get_umask()
+
+WriteResult = collections.namedtuple('WriteResult',
+                                     ['language', 'changed', 'seconds'])
+"""Result of saving strings of a single language.
+
+Attributes:
+    language (str): The language id.
+    changed (bool): Whether the strings file was written.
+    seconds (float): Time spent on serializing and writing the file.
+"""
+
+
+def _write_leaf(xf, tag, text, **attributes):
+    if text is None:
+        # Matches the self-closing tag of elements without text
+        xf.write(etree.Element(tag, **attributes))
+        return
+
+    with xf.element(tag, **attributes):
+        xf.write(text)
+
+
+def _is_empty(resources):
+    return not (any(string.text for string in resources.sorted_strings) or
+                any(item.text for array in resources.sorted_arrays
+                    for item in array) or
+                any(item.text for plural in resources.sorted_plurals
+                    for item in plural.sorted_items))
+
+
+def write_strings(output, resources):
+    """Write strings of ``resources`` to ``output`` as Android strings XML.
+
+    Elements are serialized one by one straight from the model, so the
+    complete XML tree is never held in memory.
+
+    Args:
+        output: A file-like object opened for writing bytes.
+        resources (model.Resources): The strings to write.
+    """
+    with etree.xmlfile(output, encoding='utf-8') as xf:
+        xf.write_declaration()
+        if _is_empty(resources):
+            xf.write(etree.Element('resources'))
+        else:
+            with xf.element('resources'):
+                _write_elements(xf, resources)
+                xf.write('\n')
+    output.write(b'\n')
+
+
+def _write_elements(xf, resources):
     for string in resources.sorted_strings:
         if not string.text:
             continue
 
-        xml_string = etree.SubElement(root, 'string', name=string.name)
-        xml_string.text = string.text
+        xf.write('\n\t')
+        _write_leaf(xf, 'string', string.text, name=string.name)
 
     for array in resources.sorted_arrays:
-        has_text = False
-        for item in array:
-            if item.text:
-                has_text = True
-                break
-
-        if not has_text:
+        if not any(item.text for item in array):
             continue
 
-        string_array = etree.SubElement(root, 'string-array', name=array.name)
-        for item in array:
-            etree.SubElement(string_array, 'item').text = item.text
+        xf.write('\n\t')
+        with xf.element('string-array', name=array.name):
+            for item in array:
+                xf.write('\n\t\t')
+                _write_leaf(xf, 'item', item.text)
+            xf.write('\n\t')
 
     for plural in resources.sorted_plurals:
-        has_text = False
-        for item in plural.sorted_items:
-            if item.text:
-                has_text = True
-                break
-
-        if not has_text:
+        items = plural.sorted_items
+        if not any(item.text for item in items):
             continue
 
-        plurals = etree.SubElement(root, 'plurals', name=plural.name)
-        for item in plural.sorted_items:
-            xml_item = etree.SubElement(plurals, 'item', quantity=item.quantity)
-            xml_item.text = item.text
-
-    _indent(root)
-    return etree.ElementTree(root)
+        xf.write('\n\t')
+        with xf.element('plurals', name=plural.name):
+            for item in items:
+                xf.write('\n\t\t')
+                _write_leaf(xf, 'item', item.text, quantity=item.quantity)
+            xf.write('\n\t')
 
 
 def get_strings_text(resources):
-    tree = builds_strings_tree(resources)
-    return etree.tostring(tree,
-                          pretty_print=True,
-                          xml_declaration=True,
-                          encoding='utf-8',
-                          with_tail=False)
+    output = io.BytesIO()
+    write_strings(output, resources)
+    return output.getvalue()
 
 
 def write_strings_file(directory, resources):
-    tree = builds_strings_tree(resources)
+    """Save strings of the specified resources to strings.xml file.
+
+    The file is only written when its content has changed. The new content
+    is first saved to a temporary file which then replaces the old file, so
+    the file is never left partially written.
+
+    Args:
+        directory (str): The path to the values directory of a language.
+        resources (model.Resources): The strings to save.
+
+    Returns:
+        bool: True if the file was written, False if it was up to date.
+    """
+    text = get_strings_text(resources)
     file_path = os.path.join(directory, 'strings.xml')
-    tree.write(file_path,
-               pretty_print=True,
-               xml_declaration=True,
-               encoding='utf-8',
-               with_tail=False)
+    if _has_content(file_path, text):
+        return False
+
+    _write_atomically(file_path, text)
+    return True
+
+
+def _has_content(file_path, content):
+    try:
+        if os.path.getsize(file_path) != len(content):
+            return False
+        with open(file_path, 'rb') as f:
+            return f.read() == content
+    except (IOError, OSError):
+        return False
+
+
+def _write_atomically(file_path, content):
+    try:
+        mode = os.stat(file_path).st_mode & 0o777
+    except OSError:
+        mode = _DEFAULT_FILE_MODE
+
+    directory, file_name = os.path.split(file_path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + file_name,
+                                     suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(temp_path, mode)
+        _replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
 
 
 def _make_dir(path):
@@ -89,10 +170,29 @@ def _make_dir(path):
             raise
 
 
-def write_strings_to_directory(strings_by_language, target_dir):
-    _make_dir(target_dir)
-    for language in strings_by_language.languages():
-        values_dir = os.path.join(target_dir, 'values-' + language)
-        _make_dir(values_dir)
+def _write_language(task):
+    language, values_dir, resources = task
+    start = timeit.default_timer()
+    _make_dir(values_dir)
+    changed = write_strings_file(values_dir, resources)
+    return WriteResult(language, changed, timeit.default_timer() - start)
 
-        write_strings_file(values_dir, strings_by_language[language])
+
+def write_strings_to_directory(strings_by_language, target_dir, jobs=1):
+    """Save strings of all languages as values directories in ``target_dir``.
+
+    Args:
+        strings_by_language (model.ResourceContainer): The strings to save.
+        target_dir (str): The path to the res directory.
+        jobs (int): The number of worker processes to use. When greater than
+            1 languages are serialized and written in parallel.
+
+    Returns:
+        list: A ``WriteResult`` for each language.
+    """
+    _make_dir(target_dir)
+    tasks = [(language,
+              os.path.join(target_dir, 'values-' + language),
+              strings_by_language[language])
+             for language in strings_by_language.languages()]
+    return concurrency.process_map(_write_language, tasks, jobs)
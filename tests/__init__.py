@@ -0,0 +1,5 @@
+from stringsheet import api
+from stringsheet.scheduler import RequestScheduler
+
+# Requests sent to the local fake server don't count against Sheets API quotas
+api.set_scheduler(RequestScheduler([]))
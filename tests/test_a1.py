@@ -0,0 +1,20 @@
+import unittest
+
+from stringsheet.a1 import column_index
+from stringsheet.a1 import column_name
+
+
+class ColumnNameTestCase(unittest.TestCase):
+    def test_creates_valid_names(self):
+        self.assertEqual('A', column_name(0))
+        self.assertEqual('Z', column_name(25))
+        self.assertEqual('AA', column_name(26))
+        self.assertEqual('AB', column_name(27))
+
+    def test_parses_names(self):
+        for index in (0, 25, 26, 27, 701, 702):
+            self.assertEqual(index, column_index(column_name(index)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from stringsheet import api
+from stringsheet import main
+from stringsheet.fakesheets import FakeSheetsServer
+from stringsheet.parser import parse_resources
+
+
+class LoadManifestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data):
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+
+    def test_reads_projects(self):
+        self.write({'projects': [
+            {'res': 'app/res', 'spreadsheet': 'a', 'direction': 'upload',
+             'diff': True},
+            {'name': 'lib', 'res': 'lib/res', 'spreadsheet': 'b',
+             'direction': 'download'}
+        ]})
+        app, lib = main.load_manifest(self.path)
+        self.assertEqual('app/res', app.name)
+        self.assertEqual(os.path.join(self.directory, 'app/res'), app.res_dir)
+        self.assertEqual('a', app.spreadsheet_id)
+        self.assertEqual('upload', app.direction)
+        self.assertTrue(app.diff_only)
+        self.assertEqual('lib', lib.name)
+        self.assertEqual('download', lib.direction)
+        self.assertFalse(lib.diff_only)
+
+    def test_accepts_list_of_projects(self):
+        self.write([{'res': '/abs/res', 'spreadsheet': 'a'}])
+        project, = main.load_manifest(self.path)
+        self.assertEqual('/abs/res', project.res_dir)
+        self.assertEqual('upload', project.direction)
+
+    def test_rejects_invalid_direction(self):
+        self.write([{'res': 'res', 'spreadsheet': 'a', 'direction': 'sync'}])
+        with self.assertRaises(ValueError):
+            main.load_manifest(self.path)
+
+    def test_rejects_missing_spreadsheet(self):
+        self.write([{'res': 'res'}])
+        with self.assertRaises(ValueError):
+            main.load_manifest(self.path)
+
+
+class BatchTestCase(unittest.TestCase):
+    """Test the batch command against the fake Sheets API server."""
+
+    def setUp(self):
+        self.server = FakeSheetsServer().start()
+        self.directory = tempfile.mkdtemp()
+        self.endpoint = os.environ.get(api.ENDPOINT_ENV_VAR)
+        os.environ[api.ENDPOINT_ENV_VAR] = self.server.url
+        self.service = api.get_service()
+
+    def tearDown(self):
+        if self.endpoint is None:
+            del os.environ[api.ENDPOINT_ENV_VAR]
+        else:
+            os.environ[api.ENDPOINT_ENV_VAR] = self.endpoint
+        shutil.rmtree(self.directory)
+        self.server.stop()
+
+    def create_spreadsheet(self):
+        body = api.create_spreadsheet_body('Test', False, [], 10)
+        return api.create_spreadsheet(self.service, body)['spreadsheetId']
+
+    def run_batch(self, projects, **kwargs):
+        path = os.path.join(self.directory, 'manifest.json')
+        with open(path, 'w') as f:
+            json.dump({'projects': projects}, f)
+        main._output.lines = []
+        try:
+            return main.batch(path, **kwargs)
+        finally:
+            del main._output.lines
+
+    def test_uploads_and_downloads_projects(self):
+        res_dir = os.path.abspath('test-resources/res')
+        first = self.create_spreadsheet()
+        second = self.create_spreadsheet()
+        results = self.run_batch([
+            {'name': 'first', 'res': res_dir, 'spreadsheet': first},
+            {'name': 'second', 'res': res_dir, 'spreadsheet': second,
+             'diff': True}
+        ], jobs=2, connections=2)
+        self.assertEqual(['first', 'second'],
+                         [result.project.name for result in results])
+        self.assertEqual([None, None], [result.error for result in results])
+
+        results = self.run_batch([
+            {'res': 'first', 'spreadsheet': first, 'direction': 'download'},
+            {'res': 'second', 'spreadsheet': second, 'direction': 'download'}
+        ])
+        self.assertEqual([None, None], [result.error for result in results])
+
+        expected = parse_resources(res_dir)
+        for name in ('first', 'second'):
+            downloaded = parse_resources(os.path.join(self.directory, name))
+            self.assertEqual(sorted(expected.languages()),
+                             sorted(downloaded.languages()))
+            self.assertEqual(expected['de'].count(),
+                             downloaded['de'].count())
+
+    def test_failure_doesnt_stop_other_projects(self):
+        spreadsheet_id = self.create_spreadsheet()
+        results = self.run_batch([
+            {'res': 'missing', 'spreadsheet': spreadsheet_id},
+            {'res': 'unknown', 'spreadsheet': 'unknown',
+             'direction': 'download'},
+            {'res': os.path.abspath('test-resources/res'),
+             'spreadsheet': spreadsheet_id}
+        ], connections=3)
+        self.assertIsNotNone(results[0].error)
+        self.assertIn('HttpError', results[1].error)
+        self.assertIsNone(results[2].error)
+        self.assertTrue(results[2].output)
+
+    def test_workers_share_authentication(self):
+        def create_http(endpoint=None):
+            raise AssertionError('credentials read again')
+
+        spreadsheet_id = self.create_spreadsheet()
+        res_dir = os.path.abspath('test-resources/res')
+        create_http_function = api.create_http
+        api.create_http = create_http
+        try:
+            results = self.run_batch([
+                {'name': 'first', 'res': res_dir,
+                 'spreadsheet': spreadsheet_id},
+                {'name': 'second', 'res': 'second',
+                 'spreadsheet': spreadsheet_id, 'direction': 'download'}
+            ], connections=2)
+        finally:
+            api.create_http = create_http_function
+        self.assertEqual([None, None], [result.error for result in results])
+
+    def test_reports_project_listed_twice(self):
+        spreadsheet_id = self.create_spreadsheet()
+        project = {'res': os.path.abspath('test-resources/res'),
+                   'spreadsheet': spreadsheet_id}
+        results = self.run_batch([
+            project,
+            {'res': 'unknown', 'spreadsheet': 'unknown',
+             'direction': 'download'},
+            project
+        ], connections=3)
+        self.assertEqual([False, True, False],
+                         [result.error is not None for result in results])
+        self.assertEqual(results[0].project, results[2].project)
+
+
+if __name__ == '__main__':
+    unittest.main()
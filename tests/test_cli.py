@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import unittest
+
+_HEAVY_MODULES = ('lxml', 'googleapiclient', 'apiclient', 'httplib2',
+                  'oauth2client')
+
+
+class CliStartupTestCase(unittest.TestCase):
+    """Test that the command line interface starts without heavy imports."""
+
+    def imported_modules(self, code):
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            code + '; import sys; print("\\n".join(sys.modules))'])
+        return set(output.decode('utf-8').split())
+
+    def test_doesnt_import_heavy_modules(self):
+        modules = self.imported_modules('import stringsheet.cli')
+        for module in _HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_parses_arguments_without_heavy_modules(self):
+        modules = self.imported_modules(
+            'import sys; sys.argv = ["stringsheet", "download", "id", "."]; '
+            'import stringsheet.cli; stringsheet.cli.parse_args()')
+        for module in _HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_status_doesnt_import_heavy_modules(self):
+        modules = self.imported_modules(
+            'import sys; sys.argv = ["stringsheet", "status", "id", "."]; '
+            'import stringsheet.cli; stringsheet.cli.parse_args()')
+        for module in _HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_prints_version(self):
+        output = subprocess.check_output(
+            [sys.executable, '-m', 'stringsheet.cli', '--version'])
+        self.assertTrue(output.decode('utf-8').startswith('stringsheet '))
+
+
+if __name__ == '__main__':
+    unittest.main()
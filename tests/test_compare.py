@@ -1,6 +1,11 @@
+import functools
 import unittest
 
+from stringsheet.comparator import ARRAY
+from stringsheet.comparator import PLURAL
+from stringsheet.comparator import STRING
 from stringsheet.comparator import compare_strings
+from stringsheet.comparator import parse_string_id
 from stringsheet.comparator import string_order
 
 
@@ -53,6 +58,31 @@ class CompareTestCase(unittest.TestCase):
         ]
         self.assertEqual(sorted(actual, key=string_order), expected)
 
+    def test_key_order_matches_comparison(self):
+        ids = [
+            'b_plural{one}', 'b_string', 'a_plural{other}', 'b_plural{zero}',
+            'a_plural{many}', 'b_array[10]', 'a_array[1]', 'b_array[0]',
+            'a_string', 'a_array[0]', 'b_array[2]', 'string[0]', 'string',
+            'string{few}', 'invalid{unknown}', 'invalid[x]', 'a b'
+        ]
+        self.assertEqual(sorted(ids, key=functools.cmp_to_key(compare_strings)),
+                         sorted(ids, key=string_order))
+
+
+class ParseStringIdTestCase(unittest.TestCase):
+    def test_parses_string(self):
+        self.assertEqual((STRING, 'name', None), parse_string_id('name'))
+
+    def test_parses_array(self):
+        self.assertEqual((ARRAY, 'name', 12), parse_string_id('name[12]'))
+
+    def test_parses_plural(self):
+        self.assertEqual((PLURAL, 'name', 'few'), parse_string_id('name{few}'))
+
+    def test_invalid_qualifiers_are_strings(self):
+        self.assertEqual(STRING, parse_string_id('name[x]')[0])
+        self.assertEqual(STRING, parse_string_id('name{unknown}')[0])
+
 
 if __name__ == '__main__':
     unittest.main()
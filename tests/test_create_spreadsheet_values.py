@@ -2,6 +2,7 @@ import unittest
 
 from stringsheet.parser import create_spreadsheet_values
 from stringsheet.parser import create_language_sheet_values
+from stringsheet.parser import create_language_sheets_values
 from stringsheet.parser import parse_resources
 
 
@@ -117,5 +118,15 @@ class CreateTemplateSpreadsheetValuesTestCase(BaseTestCase):
             self.assertEqual(row, self.values[index])
 
 
+class CreateLanguageSheetsValuesTestCase(BaseTestCase):
+    def test_sheets_match_single_sheets(self):
+        languages = ['Template', 'de', 'pl']
+        sheets = create_language_sheets_values(self.resources, languages)
+        self.assertEqual(len(languages), len(sheets))
+        for language, values in zip(languages, sheets):
+            self.assertEqual(
+                create_language_sheet_values(self.resources, language), values)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,143 @@
+import re
+import unittest
+
+from stringsheet.a1 import column_index
+from stringsheet.diff import diff_sheet_values
+
+_RANGE_PATTERN = re.compile(r"^'.*'!([A-Z]+)(\d+):([A-Z]+)(\d+)$")
+
+
+def apply_diff(values, sheet_diff):
+    """Apply the diff to a copy of ``values`` like the Sheets API would."""
+    rows = [list(row) for row in values]
+    for request in sheet_diff.requests:
+        if 'deleteDimension' in request:
+            dimension_range = request['deleteDimension']['range']
+            del rows[dimension_range['startIndex']:dimension_range['endIndex']]
+        else:
+            dimension_range = request['insertDimension']['range']
+            start = dimension_range['startIndex']
+            count = dimension_range['endIndex'] - start
+            rows[start:start] = [[] for _ in range(count)]
+
+    for value_range in sheet_diff.value_ranges:
+        match = _RANGE_PATTERN.match(value_range['range'])
+        start_column = column_index(match.group(1))
+        start_row = int(match.group(2)) - 1
+        for offset, row_values in enumerate(value_range['values']):
+            row_index = start_row + offset
+            while len(rows) <= row_index:
+                rows.append([])
+            row = rows[row_index]
+            end_column = start_column + len(row_values)
+            while len(row) < end_column:
+                row.append('')
+            row[start_column:end_column] = row_values
+    return rows
+
+
+HEADER = ['id', 'comment', 'default', 'de']
+
+
+class DiffSheetValuesTestCase(unittest.TestCase):
+    def diff(self, remote, local):
+        sheet_diff = diff_sheet_values(1, 'de', remote, local)
+        return sheet_diff, apply_diff(remote, sheet_diff)
+
+    def test_unchanged_sheet_has_no_changes(self):
+        remote = [HEADER, ['a', '', 'A', 'A (de)'], ['b', '', 'B']]
+        local = [HEADER, ['a', '', 'A', 'A (de)'], ['b', '', 'B', '']]
+        sheet_diff, _ = self.diff(remote, local)
+        self.assertEqual([], sheet_diff.requests)
+        self.assertEqual([], sheet_diff.value_ranges)
+
+    def test_writes_only_changed_cells(self):
+        remote = [HEADER, ['a', '', 'A', 'A (de)'], ['b', '', 'B', 'B (de)']]
+        local = [HEADER, ['a', '', 'A', 'A (de)'], ['b', '', 'New B', '']]
+        sheet_diff, result = self.diff(remote, local)
+        self.assertEqual([], sheet_diff.requests)
+        self.assertEqual(1, sheet_diff.updated_cells)
+        self.assertEqual(["'de'!C3:C3"],
+                         [it['range'] for it in sheet_diff.value_ranges])
+        self.assertEqual(['b', '', 'New B', 'B (de)'], result[2])
+
+    def test_inserts_new_rows(self):
+        remote = [HEADER, ['a', '', 'A', 'A (de)'], ['c', '', 'C', 'C (de)']]
+        local = [HEADER, ['a', '', 'A', ''], ['b', '', 'B', ''],
+                 ['c', '', 'C', ''], ['d', '', 'D', '']]
+        sheet_diff, result = self.diff(remote, local)
+        self.assertEqual(2, sheet_diff.inserted_rows)
+        self.assertEqual(1, len(sheet_diff.requests))
+        self.assertEqual([HEADER, ['a', '', 'A', 'A (de)'],
+                          ['b', '', 'B', ''], ['c', '', 'C', 'C (de)'],
+                          ['d', '', 'D', '']],
+                         [row + [''] * (4 - len(row)) for row in result])
+
+    def test_deletes_removed_rows(self):
+        remote = [HEADER, ['a', '', 'A', 'A (de)'], ['b', '', 'B', 'B (de)'],
+                  ['c', '', 'C', 'C (de)']]
+        local = [HEADER, ['a', '', 'A', ''], ['c', '', 'C', '']]
+        sheet_diff, result = self.diff(remote, local)
+        self.assertEqual(1, sheet_diff.deleted_rows)
+        self.assertEqual([], sheet_diff.value_ranges)
+        self.assertEqual([HEADER, ['a', '', 'A', 'A (de)'],
+                          ['c', '', 'C', 'C (de)']], result)
+
+    def test_moves_reordered_rows(self):
+        remote = [HEADER, ['b', '', 'B', 'B (de)'], ['a', '', 'A', 'A (de)'],
+                  ['c', '', 'C', 'C (de)']]
+        local = [HEADER, ['a', '', 'A', ''], ['b', '', 'B', ''],
+                 ['c', '', 'C', '']]
+        _, result = self.diff(remote, local)
+        self.assertEqual([HEADER, ['a', '', 'A', 'A (de)'],
+                          ['b', '', 'B', 'B (de)'], ['c', '', 'C', 'C (de)']],
+                         result)
+
+    def test_local_translations_are_uploaded(self):
+        remote = [HEADER, ['a', '', 'A', 'Old']]
+        local = [HEADER, ['a', '', 'A', 'New']]
+        _, result = self.diff(remote, local)
+        self.assertEqual(['a', '', 'A', 'New'], result[1])
+
+    def test_keeps_translations_when_column_is_added(self):
+        remote = [HEADER, ['a', '', 'A', 'A (de)'], ['b', '', 'B', 'B (de)']]
+        local = [HEADER + ['pl'], ['a', '', 'A', '', 'A (pl)'],
+                 ['b', '', 'B', '', '']]
+        sheet_diff, result = self.diff(remote, local)
+        self.assertEqual([], sheet_diff.requests)
+        self.assertEqual(2, sheet_diff.updated_cells)
+        self.assertEqual([HEADER + ['pl'], ['a', '', 'A', 'A (de)', 'A (pl)'],
+                          ['b', '', 'B', 'B (de)']], result)
+
+    def test_keeps_translations_when_columns_are_reordered(self):
+        remote = [['id', 'comment', 'default', 'pl', 'de'],
+                  ['a', '', 'A', 'A (pl)', 'A (de)'],
+                  ['b', '', 'B', 'B (pl)', '']]
+        local = [['id', 'comment', 'default', 'de', 'pl'],
+                 ['b', '', 'B', 'B (de)', ''], ['a', '', 'A', '', '']]
+        _, result = self.diff(remote, local)
+        self.assertEqual([['id', 'comment', 'default', 'de', 'pl'],
+                          ['b', '', 'B', 'B (de)', 'B (pl)'],
+                          ['a', '', 'A', 'A (de)', 'A (pl)']], result)
+
+    def test_keeps_columns_which_only_exist_in_sheet(self):
+        remote = [['id', 'comment', 'default', 'pl', 'de'],
+                  ['a', '', 'A', 'A (pl)', 'A (de)'],
+                  ['c', '', 'C', 'C (pl)', 'C (de)']]
+        local = [HEADER, ['a', '', 'A', ''], ['b', '', 'B', 'B (de)'],
+                 ['c', '', 'C', '']]
+        _, result = self.diff(remote, local)
+        self.assertEqual([HEADER + ['pl'], ['a', '', 'A', 'A (de)', 'A (pl)'],
+                          ['b', '', 'B', 'B (de)', ''],
+                          ['c', '', 'C', 'C (de)', 'C (pl)']],
+                         [row + [''] * (5 - len(row)) for row in result])
+
+    def test_writes_whole_empty_sheet(self):
+        local = [HEADER, ['a', '', 'A', '']]
+        _, result = self.diff([], local)
+        self.assertEqual(local, [row + [''] * (4 - len(row))
+                                 for row in result])
+
+
+if __name__ == '__main__':
+    unittest.main()
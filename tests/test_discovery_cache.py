@@ -0,0 +1,114 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import httplib2
+from apiclient import discovery
+
+from stringsheet import api
+from stringsheet.fakesheets import create_discovery_document
+
+URL = api.DISCOVERY_URL
+
+
+class FakeHttp(object):
+    """Transport returning a discovery document or failing like offline."""
+
+    def __init__(self, version='v4', offline=False, status=200):
+        document = create_discovery_document('https://sheets.example.com/')
+        document['version'] = version
+        self.content = json.dumps(document).encode('utf-8')
+        self.offline = offline
+        self.status = status
+        self.requests = 0
+
+    def request(self, uri, *args, **kwargs):
+        self.requests += 1
+        if self.offline:
+            raise httplib2.ServerNotFoundError('Unable to find the server')
+        return httplib2.Response({'status': self.status}), self.content
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class DiscoveryCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.directory, 'credentials',
+                                       'discovery.json')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def load(self, http, url=URL):
+        return api.load_discovery_document(http, url, self.cache_path,
+                                           ttl=60, clock=self.clock)
+
+    def test_fetches_and_stores_document(self):
+        http = FakeHttp()
+        document = self.load(http)
+        self.assertEqual(1, http.requests)
+        self.assertEqual('v4', json.loads(document)['version'])
+        self.assertTrue(os.path.isfile(self.cache_path))
+
+    def test_uses_cached_document(self):
+        self.load(FakeHttp())
+        http = FakeHttp()
+        self.clock.now += 59
+        document = self.load(http)
+        self.assertEqual(0, http.requests)
+        self.assertEqual('v4', json.loads(document)['version'])
+
+    def test_fetches_expired_document(self):
+        self.load(FakeHttp())
+        http = FakeHttp()
+        self.clock.now += 61
+        self.load(http)
+        self.assertEqual(1, http.requests)
+
+    def test_fetches_document_of_other_url(self):
+        self.load(FakeHttp())
+        http = FakeHttp()
+        self.load(http, URL + '&other')
+        self.assertEqual(1, http.requests)
+
+    def test_fetches_document_of_other_version(self):
+        self.load(FakeHttp(version='v3'))
+        http = FakeHttp()
+        self.load(http)
+        self.assertEqual(1, http.requests)
+
+    def test_uses_expired_document_when_offline(self):
+        self.load(FakeHttp())
+        self.clock.now += 1000
+        document = self.load(FakeHttp(offline=True))
+        self.assertEqual('v4', json.loads(document)['version'])
+
+    def test_uses_expired_document_on_server_error(self):
+        self.load(FakeHttp())
+        self.clock.now += 1000
+        document = self.load(FakeHttp(status=503))
+        self.assertEqual('v4', json.loads(document)['version'])
+
+    def test_offline_without_cache_fails(self):
+        with self.assertRaises(httplib2.ServerNotFoundError):
+            self.load(FakeHttp(offline=True))
+
+    def test_builds_service_offline(self):
+        self.load(FakeHttp())
+        http = FakeHttp(offline=True)
+        service = discovery.build_from_document(self.load(http), http=http)
+        self.assertTrue(hasattr(service, 'spreadsheets'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from stringsheet import api
+from stringsheet import main
+from stringsheet.fakesheets import FakeSheetsServer
+from stringsheet.parser import parse_resources
+
+
+@contextlib.contextmanager
+def _quiet():
+    stdout = sys.stdout
+    sys.stdout = io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+    try:
+        yield
+    finally:
+        sys.stdout = stdout
+
+
+class FakeSheetsApiTestCase(unittest.TestCase):
+    """Test the fake server through the regular API helpers."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeSheetsServer().start()
+        cls.service = api.get_service(endpoint=cls.server.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def create(self, languages=None):
+        body = api.create_spreadsheet_body('Test', True,
+                                           languages or ['de'], 10)
+        return api.create_spreadsheet(self.service, body)['spreadsheetId']
+
+    def test_creates_spreadsheet_with_sheets(self):
+        spreadsheet_id = self.create(['de', 'pl'])
+        spreadsheet = api.get_spreadsheet(self.service, spreadsheet_id)
+        self.assertEqual(['Overview', 'Template', 'de', 'pl'],
+                         [it['properties']['title']
+                          for it in spreadsheet['sheets']])
+
+    def test_writes_and_reads_values(self):
+        spreadsheet_id = self.create()
+        values = [['id', 'comment', 'default', 'de'], ['a', '', 'A', 'A (de)']]
+        response = api.batch_update_values(self.service, spreadsheet_id, {
+            'valueInputOption': 'RAW',
+            'data': [api.create_value_range('de', values)]
+        })
+        self.assertEqual(8, response['totalUpdatedCells'])
+
+        response = api.batch_get_values(self.service, spreadsheet_id,
+                                        ["'de'", "'de'!C2:D2"])
+        self.assertEqual(values, response['valueRanges'][0]['values'])
+        self.assertEqual([['A', 'A (de)']],
+                         response['valueRanges'][1]['values'])
+
+    def test_trims_trailing_empty_cells(self):
+        spreadsheet_id = self.create()
+        api.batch_update_values(self.service, spreadsheet_id, {
+            'valueInputOption': 'RAW',
+            'data': [api.create_value_range('de', [['a', ''], ['', '']])]
+        })
+        response = api.batch_get_values(self.service, spreadsheet_id, ["'de'"])
+        self.assertEqual([['a']], response['valueRanges'][0]['values'])
+
+    def test_inserts_and_deletes_rows(self):
+        spreadsheet_id = self.create()
+        api.batch_update_values(self.service, spreadsheet_id, {
+            'valueInputOption': 'RAW',
+            'data': [api.create_value_range('de', [['a'], ['b']])]
+        })
+        api.batch_update(self.service, spreadsheet_id, [
+            api.create_delete_rows_request(2, 0, 1),
+            api.create_insert_rows_request(2, 1, 2)
+        ])
+        response = api.batch_get_values(self.service, spreadsheet_id, ["'de'"])
+        self.assertEqual([['b']], response['valueRanges'][0]['values'])
+
+    def test_adds_sheet(self):
+        spreadsheet_id = self.create()
+        api.batch_update(self.service, spreadsheet_id,
+                         [api.create_add_sheet_request(10, 'fr')])
+        spreadsheet = api.get_spreadsheet(self.service, spreadsheet_id)
+        self.assertIn({'sheetId': 10, 'title': 'fr'},
+                      [dict((key, it['properties'][key])
+                            for key in ('sheetId', 'title'))
+                       for it in spreadsheet['sheets']])
+
+    def test_unknown_spreadsheet_is_error(self):
+        from googleapiclient.errors import HttpError
+        with self.assertRaises(HttpError) as context:
+            api.get_spreadsheet(self.service, 'unknown')
+        self.assertEqual(404, context.exception.resp.status)
+
+
+class FakeSheetsRoundTripTestCase(unittest.TestCase):
+    """Test that strings survive upload and download through the fake API."""
+
+    def setUp(self):
+        self.server = FakeSheetsServer().start()
+        self.target_dir = tempfile.mkdtemp()
+        self.endpoint = os.environ.get(api.ENDPOINT_ENV_VAR)
+        os.environ[api.ENDPOINT_ENV_VAR] = self.server.url
+
+    def tearDown(self):
+        if self.endpoint is None:
+            del os.environ[api.ENDPOINT_ENV_VAR]
+        else:
+            os.environ[api.ENDPOINT_ENV_VAR] = self.endpoint
+        shutil.rmtree(self.target_dir)
+        self.server.stop()
+
+    def round_trip(self, multi_sheet):
+        with _quiet():
+            main.create('Test', 'test-resources/res', multi_sheet)
+        spreadsheet_id, = self.server.api.spreadsheets.keys()
+        with _quiet():
+            main.download(spreadsheet_id, self.target_dir)
+
+        expected = parse_resources('test-resources/res')
+        downloaded = parse_resources(self.target_dir)
+        self.assertEqual(sorted(expected.languages()),
+                         sorted(downloaded.languages()))
+        for language in expected.languages():
+            self.assertEqual(
+                [it.name for it in expected[language].sorted_strings],
+                [it.name for it in downloaded[language].sorted_strings])
+
+    def test_single_sheet_round_trip(self):
+        self.round_trip(False)
+
+    def test_multi_sheet_round_trip(self):
+        self.round_trip(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
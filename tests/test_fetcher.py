@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from googleapiclient.errors import HttpError
+
+from stringsheet import api
+from stringsheet import fetcher
+from stringsheet import main
+from stringsheet.fakesheets import FakeSheetsServer
+from stringsheet.parser import parse_resources
+from stringsheet.scheduler import RequestScheduler
+
+LANGUAGES = ['de', 'pl', 'fr', 'it', 'es']
+
+
+class SplitBatchesTestCase(unittest.TestCase):
+    def test_splits_ranges(self):
+        self.assertEqual([['a', 'b'], ['c', 'd'], ['e']],
+                         fetcher.split_batches(['a', 'b', 'c', 'd', 'e'], 2))
+
+    def test_divides_ranges_between_connections(self):
+        self.assertEqual([['a', 'b'], ['c', 'd'], ['e']],
+                         fetcher.split_batches(['a', 'b', 'c', 'd', 'e'],
+                                               connections=3))
+        self.assertEqual([['a', 'b', 'c']],
+                         fetcher.split_batches(['a', 'b', 'c']))
+
+    def test_empty_ranges(self):
+        self.assertEqual([], fetcher.split_batches([], 2))
+
+
+class IterValueRangesTestCase(unittest.TestCase):
+    """Test fetching of sheets from the fake Sheets API server."""
+
+    def setUp(self):
+        self.server = FakeSheetsServer().start()
+        self.service_factory = lambda: api.get_service(endpoint=self.server.url)
+        self.service = self.service_factory()
+        body = api.create_spreadsheet_body('Test', True, list(LANGUAGES), 10)
+        self.spreadsheet_id = api.create_spreadsheet(
+            self.service, body)['spreadsheetId']
+        api.batch_update_values(self.service, self.spreadsheet_id, {
+            'valueInputOption': 'RAW',
+            'data': [api.create_value_range(language, [[language]])
+                     for language in LANGUAGES]
+        })
+        self.ranges = ["'%s'" % language for language in LANGUAGES]
+
+    def tearDown(self):
+        self.server.stop()
+
+    def fetch(self, batch_size, connections):
+        batches = list(fetcher.iter_value_ranges(
+            self.service, self.spreadsheet_id, self.ranges, batch_size,
+            connections, self.service_factory))
+        return batches, sorted(value_range['values'][0][0]
+                               for value_ranges in batches
+                               for value_range in value_ranges)
+
+    def test_fetches_sequentially(self):
+        batches, languages = self.fetch(2, 1)
+        self.assertEqual([2, 2, 1], [len(batch) for batch in batches])
+        self.assertEqual(sorted(LANGUAGES), languages)
+
+    def test_fetches_concurrently(self):
+        batches, languages = self.fetch(1, 3)
+        self.assertEqual(5, len(batches))
+        self.assertEqual(sorted(LANGUAGES), languages)
+
+    def test_raises_errors(self):
+        previous = api.get_scheduler()
+        api.set_scheduler(RequestScheduler([], max_retries=0))
+        self.server.api.fail_next(1, 400)
+        try:
+            with self.assertRaises(HttpError):
+                self.fetch(1, 3)
+        finally:
+            api.set_scheduler(previous)
+
+
+class DownloadTestCase(unittest.TestCase):
+    """Test that batched download saves all languages."""
+
+    def setUp(self):
+        self.server = FakeSheetsServer().start()
+        self.target_dir = tempfile.mkdtemp()
+        self.endpoint = os.environ.get(api.ENDPOINT_ENV_VAR)
+        os.environ[api.ENDPOINT_ENV_VAR] = self.server.url
+
+    def tearDown(self):
+        if self.endpoint is None:
+            del os.environ[api.ENDPOINT_ENV_VAR]
+        else:
+            os.environ[api.ENDPOINT_ENV_VAR] = self.endpoint
+        shutil.rmtree(self.target_dir)
+        self.server.stop()
+
+    def test_downloads_in_batches(self):
+        main._output.lines = []
+        try:
+            main.create('Test', 'test-resources/res', True)
+            spreadsheet_id, = self.server.api.spreadsheets.keys()
+            main.download(spreadsheet_id, self.target_dir, batch_size=1,
+                          connections=2)
+        finally:
+            del main._output.lines
+
+        expected = parse_resources('test-resources/res')
+        downloaded = parse_resources(self.target_dir)
+        self.assertEqual(sorted(expected.languages()),
+                         sorted(downloaded.languages()))
+        for language in expected.languages():
+            self.assertEqual(expected[language].count(),
+                             downloaded[language].count())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from stringsheet import api
+from stringsheet.fakesheets import FakeSheetsServer
+from stringsheet.metadata import MetadataCache
+from stringsheet.scheduler import RequestScheduler
+
+
+class MetadataCacheTestCase(unittest.TestCase):
+    """Test that sheet properties are fetched once with a field mask."""
+
+    def setUp(self):
+        self.server = FakeSheetsServer().start()
+        self.service = api.get_service(endpoint=self.server.url)
+        self.previous = api.get_scheduler()
+        self.scheduler = RequestScheduler([])
+        api.set_scheduler(self.scheduler)
+
+        body = api.create_spreadsheet_body('Test', True, ['de', 'pl'], 10)
+        self.response = api.create_spreadsheet(self.service, body)
+        self.spreadsheet_id = self.response['spreadsheetId']
+        self.cache = MetadataCache()
+
+    def tearDown(self):
+        api.set_scheduler(self.previous)
+        self.server.stop()
+
+    def requests(self):
+        return self.scheduler.requests
+
+    def titles(self):
+        return [sheet['title'] for sheet in
+                self.cache.get_sheets(self.service, self.spreadsheet_id)]
+
+    def test_fetches_only_sheet_properties(self):
+        sheets = self.cache.get_sheets(self.service, self.spreadsheet_id)
+        self.assertEqual(['Overview', 'Template', 'de', 'pl'],
+                         [sheet['title'] for sheet in sheets])
+        self.assertEqual(set(['sheetId', 'title', 'gridProperties']),
+                         set(sheets[2]))
+
+    def test_fetches_once(self):
+        start = self.requests()
+        self.titles()
+        self.titles()
+        self.assertEqual(start + 1, self.requests())
+
+    def test_uses_stored_create_response(self):
+        self.cache.store(self.spreadsheet_id, self.response)
+        start = self.requests()
+        self.assertEqual(['Overview', 'Template', 'de', 'pl'], self.titles())
+        self.assertEqual(start, self.requests())
+
+    def test_invalidate_fetches_added_sheets(self):
+        self.titles()
+        api.batch_update(self.service, self.spreadsheet_id,
+                         [api.create_add_sheet_request(10, 'fr')])
+        self.assertNotIn('fr', self.titles())
+        self.cache.invalidate(self.spreadsheet_id)
+        self.assertIn('fr', self.titles())
+
+
+if __name__ == '__main__':
+    unittest.main()
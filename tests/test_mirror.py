@@ -0,0 +1,179 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from stringsheet import api
+from stringsheet import main
+from stringsheet import mirror
+from stringsheet.fakesheets import FakeSheetsServer
+
+
+class CellsFromValuesTestCase(unittest.TestCase):
+    def test_creates_cells(self):
+        cells = mirror.cells_from_values([
+            ['id', 'comment', 'default', 'de', 'pl'],
+            ['title', 'A title', 'Title', 'Titel', ''],
+            ['items[0]', '', 'Item', 'Element']
+        ])
+        self.assertEqual({
+            ('title', 'default'): ('Title', 'A title'),
+            ('title', 'de'): ('Titel', 'A title'),
+            ('items[0]', 'default'): ('Item', ''),
+            ('items[0]', 'de'): ('Element', '')
+        }, cells)
+
+    def test_stops_at_invalid_row(self):
+        cells = mirror.cells_from_values([
+            ['id', 'comment', 'default'],
+            ['first', '', 'First'],
+            ['', '', ''],
+            ['second', '', 'Second']
+        ])
+        self.assertEqual([('first', 'default')], list(cells))
+
+    def test_empty_values(self):
+        self.assertEqual({}, mirror.cells_from_values([]))
+
+
+class MirrorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.mirror = mirror.Mirror.for_spreadsheet('sheet', self.directory)
+
+    def tearDown(self):
+        self.mirror.close()
+        shutil.rmtree(self.directory)
+
+    def revisions(self):
+        rows = self.mirror._connect().execute(
+            'SELECT string_id, language, revision FROM cells')
+        return {(string_id, language): revision
+                for string_id, language, revision in rows}
+
+    def test_not_synchronized(self):
+        self.assertIsNone(self.mirror.last_sync())
+        self.assertFalse(self.mirror.exists())
+        self.assertEqual({}, self.mirror.load_cells())
+
+    def test_records_cells(self):
+        cells = {('a', 'default'): ('A', ''), ('a', 'de'): ('A (de)', '')}
+        changes = self.mirror.record(cells, 'upload')
+        self.assertEqual(sorted(cells), changes.added)
+        self.assertEqual(cells, self.mirror.load_cells())
+        self.assertEqual((1, 'upload'), self.mirror.last_sync()[:2])
+
+    def test_detects_changes(self):
+        self.mirror.record({('a', 'default'): ('A', ''),
+                            ('b', 'default'): ('B', '')}, 'upload')
+        changes = self.mirror.changes({('a', 'default'): ('A', 'Comment'),
+                                       ('c', 'default'): ('C', '')})
+        self.assertEqual([('c', 'default')], changes.added)
+        self.assertEqual([('a', 'default')], changes.modified)
+        self.assertEqual([('b', 'default')], changes.removed)
+
+    def test_updates_only_changed_cells(self):
+        self.mirror.record({('a', 'default'): ('A', ''),
+                            ('b', 'default'): ('B', '')}, 'upload')
+        self.mirror.record({('a', 'default'): ('A', ''),
+                            ('b', 'default'): ('B2', '')}, 'download')
+        self.assertEqual({('a', 'default'): 1, ('b', 'default'): 2},
+                         self.revisions())
+        self.assertEqual((2, 'download'), self.mirror.last_sync()[:2])
+
+    def test_persists_between_connections(self):
+        cells = {('a', 'default'): ('A', '')}
+        self.mirror.record(cells, 'upload')
+        self.mirror.close()
+        with mirror.Mirror(self.mirror.path) as reopened:
+            self.assertEqual(cells, reopened.load_cells())
+            self.assertFalse(any(reopened.changes(cells)))
+
+
+class MirrorCommandsTestCase(unittest.TestCase):
+    """Test commands with mirroring against the fake Sheets API server."""
+
+    def setUp(self):
+        self.server = FakeSheetsServer().start()
+        self.directory = tempfile.mkdtemp()
+        self.mirror_dir = os.path.join(self.directory, 'mirrors')
+        self.res_dir = os.path.join(self.directory, 'res')
+        shutil.copytree('test-resources/res', self.res_dir)
+        self.endpoint = os.environ.get(api.ENDPOINT_ENV_VAR)
+        os.environ[api.ENDPOINT_ENV_VAR] = self.server.url
+
+        body = api.create_spreadsheet_body('Test', False, [], 10)
+        self.spreadsheet_id = api.create_spreadsheet(
+            api.get_service(), body)['spreadsheetId']
+        main._output.lines = []
+
+    def tearDown(self):
+        del main._output.lines
+        if self.endpoint is None:
+            del os.environ[api.ENDPOINT_ENV_VAR]
+        else:
+            os.environ[api.ENDPOINT_ENV_VAR] = self.endpoint
+        shutil.rmtree(self.directory)
+        self.server.stop()
+
+    def upload(self):
+        start = api.get_scheduler().requests
+        main.upload(self.spreadsheet_id, self.res_dir,
+                    mirror_dir=self.mirror_dir)
+        return api.get_scheduler().requests - start
+
+    def status(self):
+        return main.status(self.spreadsheet_id, self.res_dir,
+                           mirror_dir=self.mirror_dir)
+
+    def test_status_without_mirror(self):
+        self.assertIsNone(self.status())
+
+    def test_skips_upload_without_changes(self):
+        self.assertGreater(self.upload(), 0)
+        self.assertEqual(0, self.upload())
+        self.assertFalse(any(self.status()))
+
+    def test_status_shows_local_changes(self):
+        self.upload()
+        path = os.path.join(self.res_dir, 'values-de', 'strings.xml')
+        with open(path) as f:
+            content = f.read()
+        with open(path, 'w') as f:
+            f.write(content.replace('String (de)', 'Changed (de)'))
+
+        changes = self.status()
+        self.assertEqual([], changes.added)
+        self.assertEqual([('string', 'de')], changes.modified)
+        self.assertEqual([], changes.removed)
+        self.assertGreater(self.upload(), 0)
+
+    def test_uploads_only_changed_cells(self):
+        self.upload()
+        path = os.path.join(self.res_dir, 'values-de', 'strings.xml')
+        with open(path) as f:
+            content = f.read()
+        with open(path, 'w') as f:
+            f.write(content.replace('String (de)', 'Changed (de)'))
+
+        main._output.lines = []
+        self.upload()
+        self.assertIn(' > Updated cells: 1', main._output.lines)
+        values = api.batch_get_values(api.get_service(), self.spreadsheet_id,
+                                      ['A:Z'])['valueRanges'][0]['values']
+        cells = mirror.cells_from_values(values)
+        self.assertEqual('Changed (de)', cells[('string', 'de')][0])
+
+    def test_download_records_spreadsheet(self):
+        self.upload()
+        target_dir = os.path.join(self.directory, 'downloaded')
+        main.download(self.spreadsheet_id, target_dir,
+                      mirror_dir=self.mirror_dir)
+        with mirror.Mirror.for_spreadsheet(self.spreadsheet_id,
+                                           self.mirror_dir) as stored:
+            self.assertEqual('download', stored.last_sync().direction)
+        self.assertFalse(any(self.status()))
+
+
+if __name__ == '__main__':
+    unittest.main()
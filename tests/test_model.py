@@ -0,0 +1,277 @@
+import pickle
+import unittest
+
+from stringsheet.comparator import ARRAY
+from stringsheet.comparator import PLURAL
+from stringsheet.comparator import STRING
+from stringsheet.model import PluralItem
+from stringsheet.model import PluralString
+from stringsheet.model import ResourceContainer
+from stringsheet.model import Resources
+from stringsheet.model import String
+from stringsheet.model import StringArray
+from stringsheet.parser import parse_resources
+
+
+class CompactModelTestCase(unittest.TestCase):
+    """Test that models don't store per-instance dictionaries."""
+
+    def test_string_has_no_dict(self):
+        string = String('name', 'Text', '')
+        self.assertFalse(hasattr(string, '__dict__'))
+
+    def test_pickled_string_is_equal(self):
+        string = pickle.loads(pickle.dumps(String('name', 'Text', 'Comment'),
+                                           pickle.HIGHEST_PROTOCOL))
+        self.assertEqual('name', string.name)
+        self.assertEqual('Text', string.text)
+        self.assertEqual('Comment', string.comment)
+
+    def test_names_are_shared_between_languages(self):
+        resources = parse_resources('test-resources/res')
+        default_name = resources['default']._strings['string'].name
+        for language in resources.languages():
+            name = resources[language]._strings['string'].name
+            self.assertIs(default_name, name)
+
+
+class PluralFallbackTestCase(unittest.TestCase):
+    """Test that missing plural quantities are taken from 'other'."""
+
+    def setUp(self):
+        self.plural = PluralString('plural', 'Parent comment')
+        self.plural['one'] = PluralItem('one', 'One', '')
+        self.plural['other'] = PluralItem('other', 'Other', 'Comment')
+        self.plural.fill_missing(self.plural.comment)
+
+    def test_contains_all_quantities(self):
+        self.assertEqual(6, len(self.plural))
+        self.assertIn('few', self.plural)
+
+    def test_missing_items_reference_other(self):
+        self.plural['other'].text = 'Changed'
+        self.assertEqual('Changed', self.plural['many'].text)
+        self.assertEqual('many', self.plural['many'].quantity)
+        self.assertEqual('Parent comment', self.plural['many'].comment)
+
+    def test_sorted_items_include_missing_quantities(self):
+        quantities = [item.quantity for item in self.plural.sorted_items]
+        self.assertEqual(['zero', 'one', 'two', 'few', 'many', 'other'],
+                         quantities)
+
+    def test_sorted_items_follow_changes_of_other(self):
+        self.assertEqual('Other', self.plural.sorted_items[0].text)
+        self.plural['other'].text = 'Changed'
+        self.assertEqual(['Changed', 'One', 'Changed', 'Changed', 'Changed',
+                          'Changed'],
+                         [item.text for item in self.plural.sorted_items])
+
+    def test_sorted_items_reuse_stored_items(self):
+        one = self.plural['one']
+        self.assertIs(one, self.plural.sorted_items[1])
+        self.assertIs(one, self.plural.sorted_items[1])
+
+    def test_complete_plural_caches_sorted_items(self):
+        plural = PluralString('plural', '')
+        for quantity in ['zero', 'one', 'two', 'few', 'many', 'other']:
+            plural[quantity] = PluralItem(quantity, quantity, '')
+        plural.fill_missing('')
+        self.assertIs(plural.sorted_items, plural.sorted_items)
+
+    def test_requires_other_quantity(self):
+        plural = PluralString('plural', '')
+        with self.assertRaises(KeyError):
+            plural.fill_missing('')
+
+
+class ResourcesTextTestCase(unittest.TestCase):
+    """Test that texts can be looked up by string ids."""
+
+    def setUp(self):
+        self.resources = Resources()
+        self.resources.add_string(String('string', 'String', ''))
+        array = StringArray('array', '')
+        array.add_item('First', '')
+        array.add_item('Second', '')
+        self.resources.add_array(array)
+        self.resources.add_plural_item('plural', 'One', '', 'one')
+
+    def test_finds_array_text_by_index(self):
+        self.assertEqual('Second', self.resources.get_array_text('array', 1))
+
+    def test_missing_array_item_is_empty(self):
+        self.assertEqual('', self.resources.get_array_text('array', 2))
+        self.assertEqual('', self.resources.get_array_text('missing', 0))
+
+    def test_finds_texts_of_column(self):
+        keys = [
+            (STRING, 'string', None),
+            (STRING, 'missing', None),
+            (ARRAY, 'array', 0),
+            (ARRAY, 'array', 5),
+            (PLURAL, 'plural', 'one'),
+            (PLURAL, 'plural', 'other'),
+        ]
+        self.assertEqual(['String', '', 'First', '', 'One', ''],
+                         self.resources.get_texts(keys))
+
+
+class MergeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources = Resources()
+        self.resources.add_string(String('title', 'Title', ''))
+        self.resources.add_array_item('items', 'First', '', 0)
+
+        self.other = Resources()
+        self.other.add_string(String('title', 'New title', ''))
+        self.other.add_string(String('subtitle', 'Subtitle', ''))
+        self.other.add_plural_item('days', '%d days', '', 'other')
+
+    def test_overwrites_existing_entries(self):
+        self.assertEqual(1, self.resources.merge(self.other))
+        self.assertEqual('New title',
+                         self.resources.get_string_text('title'))
+        self.assertEqual('Subtitle',
+                         self.resources.get_string_text('subtitle'))
+        self.assertEqual('First', self.resources.get_array_text('items', 0))
+        self.assertEqual('%d days',
+                         self.resources.get_plural_text('days', 'other'))
+
+    def test_keeps_existing_entries(self):
+        self.assertEqual(1, self.resources.merge(self.other, False))
+        self.assertEqual('Title', self.resources.get_string_text('title'))
+        self.assertEqual('Subtitle',
+                         self.resources.get_string_text('subtitle'))
+
+    def test_container_update_merges_resources(self):
+        container = ResourceContainer()
+        self.assertEqual(0, container.update('de', self.resources))
+        self.assertEqual(1, container.update('de', self.other))
+        self.assertEqual(4, container['de'].count())
+
+
+class SortedViewsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources = Resources()
+        for name in ['b', 'd', 'a']:
+            self.resources.add_string(String(name, name.upper(), ''))
+
+    def names(self):
+        return [string.name for string in self.resources.sorted_strings]
+
+    def test_caches_sorted_list(self):
+        self.assertEqual(['a', 'b', 'd'], self.names())
+        self.assertIs(self.resources.sorted_strings,
+                      self.resources.sorted_strings)
+
+    def test_inserts_added_names(self):
+        self.names()
+        self.resources.add_string(String('c', 'C', ''))
+        self.resources.add_string(String('e', 'E', ''))
+        self.assertEqual(['a', 'b', 'c', 'd', 'e'], self.names())
+
+    def test_replaces_existing_entries(self):
+        self.names()
+        self.resources.add_string(String('b', 'New', ''))
+        self.assertEqual(['A', 'New', 'D'],
+                         [string.text for string in
+                          self.resources.sorted_strings])
+
+    def test_merge_updates_view(self):
+        self.names()
+        other = Resources()
+        other.add_string(String('c', 'C', ''))
+        self.resources.merge(other)
+        self.assertEqual(['a', 'b', 'c', 'd'], self.names())
+
+    def test_pickle_drops_views(self):
+        self.names()
+        self.assertNotIn('_sorted_strings', self.resources.__getstate__())
+        resources = pickle.loads(pickle.dumps(self.resources,
+                                              pickle.HIGHEST_PROTOCOL))
+        resources.add_string(String('c', 'C', ''))
+        self.assertEqual(['a', 'b', 'c', 'd'],
+                         [string.name for string in resources.sorted_strings])
+
+    def test_plural_items_are_updated(self):
+        plural = PluralString('days', '')
+        plural['other'] = PluralItem('other', 'Days', '')
+        self.assertEqual(['other'],
+                         [item.quantity for item in plural.sorted_items])
+        plural['one'] = PluralItem('one', 'Day', '')
+        self.assertEqual(['one', 'other'],
+                         [item.quantity for item in plural.sorted_items])
+        plural = pickle.loads(pickle.dumps(plural, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(['one', 'other'],
+                         [item.quantity for item in plural.sorted_items])
+
+
+class CountersTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources = Resources()
+        self.resources.add_string(String('title', 'Title', ''))
+        self.resources.add_string(String('empty', '', ''))
+        self.resources.add_array_item('items', 'First', '', 0)
+        self.resources.add_array_item('items', '', '', 1)
+        self.resources.add_plural_item('days', '%d days', '', 'other')
+
+    def assertCounts(self, item_count, translated_count, resources=None):
+        resources = resources or self.resources
+        self.assertEqual(item_count, resources.item_count())
+        self.assertEqual(translated_count, resources.translated_count())
+
+    def test_counts_added_items(self):
+        self.assertCounts(5, 3)
+
+    def test_counts_replaced_items(self):
+        self.resources.add_string(String('empty', 'Not empty', ''))
+        self.resources.add_plural_item('days', '', '', 'other')
+        self.assertCounts(5, 3)
+
+    def test_counts_replaced_arrays_and_plurals(self):
+        array = StringArray('items', '')
+        array.add_item('Only', '')
+        self.resources.add_array(array)
+        plural = PluralString('days', '')
+        plural['other'] = PluralItem('other', '%d days', '')
+        plural.fill_missing('')
+        self.resources.add_plural(plural)
+        self.assertCounts(9, 8)
+
+    def test_counts_merged_resources(self):
+        other = Resources()
+        other.add_string(String('title', '', ''))
+        other.add_string(String('subtitle', 'Subtitle', ''))
+        self.assertEqual(1, self.resources.merge(other))
+        self.assertCounts(6, 3)
+
+    def test_counts_parsed_resources(self):
+        resources = parse_resources('test-resources/res')
+        for language in ['default'] + resources.languages():
+            strings = resources[language]
+            items = list(strings.sorted_strings)
+            for array in strings.sorted_arrays:
+                items.extend(array)
+            for plural in strings.sorted_plurals:
+                items.extend(plural.sorted_items)
+            self.assertCounts(len(items),
+                              sum(1 for item in items if item.text),
+                              strings)
+
+    def test_keeps_counts_when_pickled(self):
+        resources = pickle.loads(pickle.dumps(self.resources,
+                                              pickle.HIGHEST_PROTOCOL))
+        self.assertCounts(5, 3, resources)
+
+    def test_container_counts_translations(self):
+        container = ResourceContainer()
+        container['default'] = self.resources
+        translated = Resources()
+        translated.add_string(String('title', 'Titel', ''))
+        container['de'] = translated
+        self.assertEqual(1, container.translated_count('de'))
+        self.assertEqual(4, container.untranslated_count('de'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+
+from stringsheet.cache import ParseCache
+from stringsheet.parser import create_spreadsheet_values
+from stringsheet.parser import parse_directory
+from stringsheet.parser import parse_resources
+
+
+class BaseParseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ParseCache(os.path.join(self.temp_dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+
+class ParseCacheTestCase(BaseParseCacheTestCase):
+    """Test that the cache only parses files which have changed."""
+
+    def setUp(self):
+        super(ParseCacheTestCase, self).setUp()
+        self.file_path = os.path.join(self.temp_dir, 'strings.xml')
+        shutil.copy('test-resources/strings_basic.xml', self.file_path)
+
+    def test_parses_new_file(self):
+        resources = self.cache.parse_file(self.file_path)
+        self.assertEqual(2, resources.count())
+        self.assertEqual(1, self.cache.misses)
+        self.assertEqual(0, self.cache.hits)
+
+    def test_reuses_unchanged_file(self):
+        self.cache.parse_file(self.file_path)
+        cache = ParseCache(self.cache.directory)
+        resources = cache.parse_file(self.file_path)
+        self.assertEqual(2, resources.count())
+        self.assertIn('test_string', resources)
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(0, cache.misses)
+
+    def test_reuses_touched_file_with_same_content(self):
+        self.cache.parse_file(self.file_path)
+        stat = os.stat(self.file_path)
+        os.utime(self.file_path, (stat.st_atime + 10, stat.st_mtime + 10))
+        self.cache.parse_file(self.file_path)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_parses_modified_file(self):
+        self.cache.parse_file(self.file_path)
+        shutil.copy('test-resources/strings_arrays.xml', self.file_path)
+        resources = self.cache.parse_file(self.file_path)
+        self.assertEqual(2, self.cache.misses)
+        self.assertNotIn('test_string', resources)
+        self.assertIn('string_2', resources)
+
+    def test_ignores_corrupted_entry(self):
+        self.cache.parse_file(self.file_path)
+        entry_name = os.listdir(self.cache.directory)[0]
+        with open(os.path.join(self.cache.directory, entry_name), 'wb') as f:
+            f.write(b'invalid')
+        resources = self.cache.parse_file(self.file_path)
+        self.assertEqual(2, resources.count())
+        self.assertEqual(2, self.cache.misses)
+
+    def test_ignores_entry_with_invalid_pickle(self):
+        self.cache.parse_file(self.file_path)
+        entry_name = os.listdir(self.cache.directory)[0]
+        with open(os.path.join(self.cache.directory, entry_name), 'wb') as f:
+            f.write(zlib.compress(b'invalid'))
+        resources = self.cache.parse_file(self.file_path)
+        self.assertEqual(2, resources.count())
+        self.assertEqual(2, self.cache.misses)
+
+
+class CachedDirectoryParseTestCase(BaseParseCacheTestCase):
+    """Test that parsing with cache gives the same results as without it."""
+
+    def test_directory_is_same(self):
+        directory = 'test-resources/strings'
+        expected = parse_directory(directory)
+        for _ in range(2):
+            resources = parse_directory(directory, cache=self.cache)
+            self.assertEqual(expected.count(), resources.count())
+
+    def test_resources_are_same(self):
+        expected = create_spreadsheet_values(
+            parse_resources('test-resources/res'))
+        for _ in range(2):
+            resources = parse_resources('test-resources/res', jobs=2,
+                                        cache=self.cache)
+            self.assertEqual(expected, create_spreadsheet_values(resources))
+
+
+if __name__ == '__main__':
+    unittest.main()
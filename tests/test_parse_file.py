@@ -6,6 +6,8 @@ from stringsheet.model import Resources
 
 
 class BaseParseTestCase(unittest.TestCase):
+    streaming = False
+
     @property
     def test_file(self):
         raise NotImplementedError
@@ -16,7 +18,7 @@ class BaseParseTestCase(unittest.TestCase):
 
     def setUp(self):
         self.resources = Resources()
-        parse_file(self.test_file, self.resources)
+        parse_file(self.test_file, self.resources, self.streaming)
         with open(self.output_file, mode='rb') as f:
             self.raw_text = f.read()
 
@@ -275,5 +277,39 @@ class ParseWithCommentsTestCase(BaseParseTestCase):
         self.assertEqual('Plural comment', plural['other'].comment)
 
 
+class StreamingParseBasicStringsTestCase(ParseBasicStringsTestCase):
+    streaming = True
+
+
+class StreamingParseNotTranslatableStringsTestCase(
+        ParseNotTranslatableStringsTestCase):
+    streaming = True
+
+
+class StreamingParseNotTranslatableRootTestCase(
+        ParseNotTranslatableRootTestCase):
+    streaming = True
+
+
+class StreamingParseInvalidRootTestCase(ParseInvalidRootTestCase):
+    streaming = True
+
+
+class StreamingParseArraysTestCase(ParseArraysTestCase):
+    streaming = True
+
+
+class StreamingParsePluralsTestCase(ParsePluralsTestCase):
+    streaming = True
+
+
+class StreamingParseOutputTestCase(ParseOutputTestCase):
+    streaming = True
+
+
+class StreamingParseWithCommentsTestCase(ParseWithCommentsTestCase):
+    streaming = True
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 
+from stringsheet.parser import create_spreadsheet_values
 from stringsheet.parser import parse_resources
 
 
@@ -43,5 +44,22 @@ class ResourcesParseTestCase(unittest.TestCase):
         self.assertNotIn('partly_added', self.resources['pl'])
 
 
+class ParallelResourcesParseTestCase(unittest.TestCase):
+    """Test that parsing in multiple processes gives the same result as
+    parsing in a single process.
+    """
+
+    def setUp(self):
+        self.serial = parse_resources('test-resources/res')
+        self.parallel = parse_resources('test-resources/res', jobs=3)
+
+    def test_finds_same_languages(self):
+        self.assertEqual(self.serial.languages(), self.parallel.languages())
+
+    def test_values_are_identical(self):
+        self.assertEqual(create_spreadsheet_values(self.serial),
+                         create_spreadsheet_values(self.parallel))
+
+
 if __name__ == '__main__':
     unittest.main()
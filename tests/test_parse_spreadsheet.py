@@ -70,5 +70,36 @@ class RowWithIncorrectlyNamedIdTestCase(BaseSpreadsheetDataTestCase):
             self.assertIn('string_2', strings)
 
 
+class ArraysAndPluralsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources = ResourceContainer()
+        parse_spreadsheet_values(self.resources, [
+            ['id', 'comment', 'default', 'de'],
+            ['items[0]', '', 'First', 'Erste'],
+            ['items[1]', '', 'Second'],
+            ['days{one}', 'Days', '%d day', '%d Tag'],
+            ['days{other}', 'Days', '%d days', '%d Tage'],
+            ['title', '', 'Title', 'Titel'],
+            ['invalid id', '', 'Invalid', 'Invalid (de)'],
+            ['after_invalid', '', 'After', 'Danach']
+        ])
+
+    def test_parses_all_kinds_in_every_language(self):
+        for language in ['default', 'de']:
+            strings = self.resources[language]
+            self.assertEqual(3, strings.count())
+            self.assertEqual(5, strings.item_count())
+
+    def test_fills_texts_of_language(self):
+        strings = self.resources['de']
+        self.assertEqual('Erste', strings.get_array_text('items', 0))
+        self.assertEqual('', strings.get_array_text('items', 1))
+        self.assertEqual('%d Tage', strings.get_plural_text('days', 'other'))
+        self.assertEqual('Titel', strings.get_string_text('title'))
+
+    def test_stops_at_invalid_id(self):
+        self.assertNotIn('after_invalid', self.resources['default'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from googleapiclient.errors import HttpError
+
+from stringsheet import api
+from stringsheet import planner
+from stringsheet.fakesheets import FakeSheetsServer
+from stringsheet.scheduler import RequestScheduler
+
+
+def _rows(count, width=4, prefix='r'):
+    return [['%s%d_%d' % (prefix, row, column) for column in range(width)]
+            for row in range(count)]
+
+
+class PlanChunksTestCase(unittest.TestCase):
+    def test_small_body_is_single_chunk(self):
+        value_ranges = [api.create_value_range('de', _rows(10)),
+                        api.create_value_range('pl', _rows(10))]
+        chunks = planner.plan_chunks(value_ranges)
+        self.assertEqual(1, len(chunks))
+        self.assertEqual(80, chunks[0].num_cells)
+        self.assertEqual(["de!A1:D10", "pl!A1:D10"],
+                         [it['range'] for it in chunks[0].value_ranges])
+
+    def test_splits_by_cells(self):
+        value_ranges = [api.create_value_range('de', _rows(10))]
+        chunks = planner.plan_chunks(value_ranges, max_cells=12)
+        self.assertEqual(4, len(chunks))
+        self.assertEqual(["de!A1:D3", "de!A4:D6", "de!A7:D9", "de!A10:D10"],
+                         [it.value_ranges[0]['range'] for it in chunks])
+        self.assertTrue(all(it.num_cells <= 12 for it in chunks))
+
+    def test_splits_by_bytes(self):
+        value_ranges = [api.create_value_range('de', _rows(100))]
+        chunks = planner.plan_chunks(value_ranges, max_bytes=1000)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(len(json.dumps(chunk.value_ranges)), 1000)
+
+    def test_keeps_offset_of_ranges(self):
+        value_ranges = [{'range': "'de'!C3:D6", 'values': _rows(4, 2)}]
+        chunks = planner.plan_chunks(value_ranges, max_cells=4)
+        self.assertEqual(["'de'!C3:D4", "'de'!C5:D6"],
+                         [it.value_ranges[0]['range'] for it in chunks])
+
+    def test_range_without_sheet(self):
+        value_ranges = [{'range': 'A:Z', 'values': _rows(4, 30)}]
+        chunks = planner.plan_chunks(value_ranges, max_cells=60)
+        self.assertEqual(['A1:AD2', 'A3:AD4'],
+                         [it.value_ranges[0]['range'] for it in chunks])
+
+    def test_oversized_row_is_separate_chunk(self):
+        value_ranges = [api.create_value_range('de', _rows(3, 10))]
+        chunks = planner.plan_chunks(value_ranges, max_cells=5)
+        self.assertEqual(3, len(chunks))
+
+    def test_preserves_all_values_in_order(self):
+        rows = _rows(57, 3)
+        value_ranges = [api.create_value_range('de', rows)]
+        chunks = planner.plan_chunks(value_ranges, max_cells=20)
+        uploaded = [row for chunk in chunks
+                    for value_range in chunk.value_ranges
+                    for row in value_range['values']]
+        self.assertEqual(rows, uploaded)
+        self.assertEqual(list(range(len(chunks))),
+                         [chunk.index for chunk in chunks])
+
+    def test_digest_depends_on_values(self):
+        first = planner.plan_chunks([api.create_value_range('de', _rows(2))])
+        second = planner.plan_chunks([api.create_value_range('pl', _rows(2))])
+        self.assertNotEqual(planner.plan_digest(first),
+                            planner.plan_digest(second))
+
+
+class UploadStateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'uploads', 'id.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_loads_completed_chunks(self):
+        planner.UploadState(self.path, 'digest').mark_completed(2)
+        state = planner.UploadState(self.path, 'digest')
+        self.assertTrue(state.load())
+        self.assertEqual(set([2]), state.completed)
+
+    def test_ignores_state_of_other_plan(self):
+        planner.UploadState(self.path, 'digest').mark_completed(2)
+        state = planner.UploadState(self.path, 'other')
+        self.assertFalse(state.load())
+        self.assertEqual(set(), state.completed)
+
+    def test_missing_state(self):
+        self.assertFalse(planner.UploadState(self.path, 'digest').load())
+
+    def test_clear_removes_file(self):
+        state = planner.UploadState(self.path, 'digest')
+        state.mark_completed(0)
+        state.clear()
+        self.assertFalse(os.path.exists(self.path))
+
+
+class UploadChunksTestCase(unittest.TestCase):
+    """Test uploading of chunks to the fake Sheets API server."""
+
+    def setUp(self):
+        self.server = FakeSheetsServer().start()
+        self.service_factory = lambda: api.get_service(endpoint=self.server.url)
+        self.service = self.service_factory()
+        self.directory = tempfile.mkdtemp()
+        body = api.create_spreadsheet_body('Test', True, ['de'], 10)
+        self.spreadsheet_id = api.create_spreadsheet(
+            self.service, body)['spreadsheetId']
+        self.rows = _rows(50)
+        self.chunks = planner.plan_chunks(
+            [api.create_value_range('de', self.rows)], max_cells=40)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        self.server.stop()
+
+    def state(self):
+        return planner.UploadState(os.path.join(self.directory, 'state.json'),
+                                   planner.plan_digest(self.chunks))
+
+    def sheet_values(self):
+        response = api.batch_get_values(self.service, self.spreadsheet_id,
+                                        ["'de'"])
+        return response['valueRanges'][0].get('values', [])
+
+    def test_uploads_all_chunks(self):
+        uploaded = []
+        responses = planner.upload_chunks(
+            self.service, self.spreadsheet_id, self.chunks,
+            callback=lambda chunk, response: uploaded.append(chunk.index))
+        self.assertEqual(len(self.chunks), len(responses))
+        self.assertEqual(list(range(len(self.chunks))), uploaded)
+        self.assertEqual(self.rows, self.sheet_values())
+
+    def test_uploads_concurrently(self):
+        responses = planner.upload_chunks(
+            self.service, self.spreadsheet_id, self.chunks, connections=4,
+            service_factory=self.service_factory)
+        self.assertEqual(len(self.chunks), len(responses))
+        self.assertEqual(self.rows, self.sheet_values())
+
+    def test_resumes_failed_upload(self):
+        previous = api.get_scheduler()
+        api.set_scheduler(RequestScheduler([], max_retries=0))
+        try:
+            with self.assertRaises(HttpError):
+                planner.upload_chunks(
+                    self.service, self.spreadsheet_id, self.chunks,
+                    self.state(), callback=lambda chunk, response:
+                    self.server.api.fail_next(1, 400))
+        finally:
+            api.set_scheduler(previous)
+
+        state = self.state()
+        self.assertTrue(state.load())
+        self.assertEqual(set([0]), state.completed)
+
+        responses = planner.upload_chunks(self.service, self.spreadsheet_id,
+                                          self.chunks, state)
+        self.assertEqual(len(self.chunks) - 1, len(responses))
+        self.assertEqual(set(range(len(self.chunks))), state.completed)
+        self.assertEqual(self.rows, self.sheet_values())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,267 @@
+import errno
+import socket
+import threading
+import time
+import unittest
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from stringsheet import api
+from stringsheet.fakesheets import FakeSheetsServer
+from stringsheet.scheduler import RequestScheduler
+from stringsheet.scheduler import TokenBucket
+from stringsheet.scheduler import is_retryable
+
+
+def _http_error(status, content=b'{}', headers=None):
+    info = {'status': status}
+    info.update(headers or {})
+    return HttpError(httplib2.Response(info), content)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeRequest(object):
+    """Request raising the given errors before returning ``result``."""
+
+    def __init__(self, errors=(), result='result', method='GET'):
+        self.errors = list(errors)
+        self.result = result
+        self.method = method
+        self.calls = 0
+
+    def execute(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    def test_allows_burst_up_to_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1, 3, clock)
+        self.assertEqual([0, 0, 0], [bucket.reserve() for _ in range(3)])
+
+    def test_spaces_requests_over_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, 1, clock)
+        self.assertEqual([0, 0.5, 1.0], [bucket.reserve() for _ in range(3)])
+
+    def test_refills_over_time(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1, 1, clock)
+        bucket.reserve()
+        clock.now = 10
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(1, bucket.reserve())
+
+    def test_per_minute(self):
+        bucket = TokenBucket.per_minute(60, FakeClock())
+        self.assertEqual(1, bucket.rate)
+        self.assertEqual(60, bucket.capacity)
+
+
+class IsRetryableTestCase(unittest.TestCase):
+    def test_quota_and_server_errors_are_retryable(self):
+        for status in (429, 500, 502, 503, 504):
+            self.assertTrue(is_retryable(_http_error(status)))
+
+    def test_client_errors_are_not_retryable(self):
+        for status in (400, 401, 403, 404):
+            self.assertFalse(is_retryable(_http_error(status)))
+
+    def test_rate_limit_forbidden_is_retryable(self):
+        error = _http_error(403, b'{"error": {"errors": '
+                                 b'[{"reason": "userRateLimitExceeded"}]}}')
+        self.assertTrue(is_retryable(error))
+
+    def test_connection_errors_are_retryable(self):
+        self.assertTrue(is_retryable(httplib2.ServerNotFoundError()))
+        self.assertFalse(is_retryable(ValueError()))
+
+    def test_only_rejected_writes_are_retryable(self):
+        self.assertTrue(is_retryable(_http_error(429), idempotent=False))
+        self.assertTrue(is_retryable(
+            _http_error(403, b'{"reason": "rateLimitExceeded"}'),
+            idempotent=False))
+        self.assertTrue(is_retryable(
+            socket.error(errno.ECONNREFUSED, 'Connection refused'),
+            idempotent=False))
+        self.assertFalse(is_retryable(_http_error(503), idempotent=False))
+        self.assertFalse(is_retryable(socket.timeout(), idempotent=False))
+        self.assertFalse(is_retryable(
+            socket.error(errno.ECONNRESET, 'Connection reset'),
+            idempotent=False))
+
+
+class RequestSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def scheduler(self, buckets=(), **kwargs):
+        return RequestScheduler(list(buckets), sleep=self.clock.sleep,
+                                clock=self.clock, random=lambda: 0.5,
+                                **kwargs)
+
+    def test_returns_result(self):
+        scheduler = self.scheduler()
+        self.assertEqual('result', scheduler.execute(FakeRequest()))
+        self.assertEqual(0, scheduler.retries)
+        self.assertEqual([], self.clock.sleeps)
+
+    def test_retries_with_exponential_backoff(self):
+        scheduler = self.scheduler()
+        request = FakeRequest([_http_error(429), _http_error(503),
+                               _http_error(500)])
+        self.assertEqual('result', scheduler.execute(request))
+        self.assertEqual(4, request.calls)
+        self.assertEqual(3, scheduler.retries)
+        self.assertEqual([1.5, 2.5, 4.5], self.clock.sleeps)
+        self.assertEqual(8.5, scheduler.backoff_seconds)
+
+    def test_delay_is_limited(self):
+        scheduler = self.scheduler(max_delay=5)
+        self.assertEqual(5, scheduler.backoff_delay(10))
+
+    def test_honors_retry_after(self):
+        scheduler = self.scheduler()
+        request = FakeRequest([_http_error(429, headers={'retry-after': '30'})])
+        scheduler.execute(request)
+        self.assertEqual([30], self.clock.sleeps)
+
+    def test_raises_non_retryable_error(self):
+        scheduler = self.scheduler()
+        request = FakeRequest([_http_error(400)])
+        with self.assertRaises(HttpError):
+            scheduler.execute(request)
+        self.assertEqual(1, request.calls)
+
+    def test_does_not_repeat_write_after_server_error(self):
+        scheduler = self.scheduler()
+        request = FakeRequest([_http_error(503)], method='POST')
+        with self.assertRaises(HttpError):
+            scheduler.execute(request)
+        self.assertEqual(1, request.calls)
+
+    def test_retries_rejected_write(self):
+        scheduler = self.scheduler()
+        request = FakeRequest([_http_error(429)], method='POST')
+        self.assertEqual('result', scheduler.execute(request))
+        self.assertEqual(2, request.calls)
+
+    def test_retries_write_marked_as_idempotent(self):
+        scheduler = self.scheduler()
+        request = FakeRequest([socket.timeout()], method='POST')
+        self.assertEqual('result', scheduler.execute(request, idempotent=True))
+        self.assertEqual(2, request.calls)
+
+    def test_raises_after_max_retries(self):
+        scheduler = self.scheduler(max_retries=2)
+        request = FakeRequest([_http_error(503)] * 3)
+        with self.assertRaises(HttpError):
+            scheduler.execute(request)
+        self.assertEqual(3, request.calls)
+        self.assertEqual(2, scheduler.retries)
+
+    def test_throttles_to_quota(self):
+        bucket = TokenBucket(1, 2, self.clock)
+        scheduler = self.scheduler([bucket])
+        for _ in range(4):
+            scheduler.execute(FakeRequest())
+        self.assertEqual([1, 1], self.clock.sleeps)
+        self.assertEqual(2, scheduler.throttled_seconds)
+        self.assertEqual(4, scheduler.requests)
+
+    def test_uses_slowest_bucket(self):
+        scheduler = self.scheduler([TokenBucket(1, 1, self.clock),
+                                    TokenBucket(0.5, 1, self.clock)])
+        scheduler.execute(FakeRequest())
+        scheduler.execute(FakeRequest())
+        self.assertEqual([2], self.clock.sleeps)
+
+    def test_counts_are_thread_safe(self):
+        scheduler = RequestScheduler([], sleep=lambda seconds: None,
+                                     random=lambda: 0)
+
+        def run():
+            for _ in range(100):
+                scheduler.execute(FakeRequest([_http_error(503)]))
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(800, scheduler.retries)
+        self.assertEqual(1600, scheduler.requests)
+
+
+class SchedulerFakeServerTestCase(unittest.TestCase):
+    """Test that API helpers survive transient errors of the server."""
+
+    def setUp(self):
+        self.server = FakeSheetsServer().start()
+        self.service = api.get_service(endpoint=self.server.url)
+        self.previous = api.get_scheduler()
+        self.scheduler = RequestScheduler([], sleep=lambda seconds: None)
+        api.set_scheduler(self.scheduler)
+
+    def tearDown(self):
+        api.set_scheduler(self.previous)
+        self.server.stop()
+
+    def test_retries_failed_requests(self):
+        body = api.create_spreadsheet_body('Test', False, ['de'], 10)
+        self.server.api.fail_next(2, 429)
+        response = api.create_spreadsheet(self.service, body)
+        self.assertIn('spreadsheetId', response)
+        self.assertEqual(2, self.scheduler.retries)
+
+    def test_retries_value_writes_after_server_error(self):
+        body = api.create_spreadsheet_body('Test', False, [], 10)
+        spreadsheet_id = api.create_spreadsheet(
+            self.service, body)['spreadsheetId']
+        self.server.api.fail_next(1, 503)
+        response = api.batch_update_values(self.service, spreadsheet_id, {
+            'valueInputOption': 'RAW',
+            'data': [{'range': 'A1:B1', 'values': [['id', 'x']]}]
+        })
+        self.assertEqual(2, response['totalUpdatedCells'])
+        self.assertEqual(1, self.scheduler.retries)
+
+    def test_does_not_repeat_timed_out_row_insert(self):
+        body = api.create_spreadsheet_body('Test', False, [], 10)
+        spreadsheet_id = api.create_spreadsheet(
+            self.service, body)['spreadsheetId']
+        spreadsheet = self.server.api.spreadsheets[spreadsheet_id]
+        grid = spreadsheet.sheets[0].properties['gridProperties']
+        row_count = grid['rowCount']
+
+        # The server applies the request after the client gave up waiting
+        service = api.get_service(http=httplib2.Http(timeout=0.1),
+                                  endpoint=self.server.url)
+        self.server.latency = 0.3
+        request = api.create_insert_rows_request(0, 1, 2)
+        with self.assertRaises(socket.timeout):
+            api.batch_update(service, spreadsheet_id, [request])
+        time.sleep(0.5)
+
+        self.assertEqual(0, self.scheduler.retries)
+        self.assertEqual(row_count + 1, grid['rowCount'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import io
+import json
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+import unittest
+
+from stringsheet import api
+from stringsheet import cli
+from stringsheet import main
+from stringsheet import timings
+from stringsheet.fakesheets import FakeSheetsServer
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecorderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cpu_clock = FakeClock()
+        self.recorder = timings.Recorder('test', self.clock, self.cpu_clock)
+
+    def advance(self, seconds, cpu_seconds):
+        self.clock.now += seconds
+        self.cpu_clock.now += cpu_seconds
+
+    def test_sums_phases_with_same_name(self):
+        for _ in range(2):
+            with self.recorder.phase('parse'):
+                self.advance(1.5, 1.0)
+        with self.recorder.phase('write'):
+            self.advance(0.5, 0.25)
+
+        report = self.recorder.report()
+        self.assertEqual('test', report['command'])
+        self.assertEqual(3.5, report['wall_seconds'])
+        parse, write = report['phases']
+        self.assertEqual(('parse', 2, 3.0, 2.0),
+                         (parse['name'], parse['calls'],
+                          parse['wall_seconds'], parse['cpu_seconds']))
+        self.assertEqual(('write', 1, 0.5, 0.25),
+                         (write['name'], write['calls'],
+                          write['wall_seconds'], write['cpu_seconds']))
+
+    def test_outer_phase_includes_nested_phase(self):
+        with self.recorder.phase('upload'):
+            self.advance(1, 1)
+            with self.recorder.phase('send_values'):
+                self.advance(2, 0)
+        phases = dict((phase['name'], phase)
+                      for phase in self.recorder.report()['phases'])
+        self.assertEqual(3, phases['upload']['wall_seconds'])
+        self.assertEqual(2, phases['send_values']['wall_seconds'])
+
+    def test_records_failed_phase(self):
+        with self.assertRaises(ValueError):
+            with self.recorder.phase('parse'):
+                self.advance(1, 1)
+                raise ValueError()
+        phase, = self.recorder.report()['phases']
+        self.assertEqual(1, phase['wall_seconds'])
+
+    def test_phase_without_recorder_does_nothing(self):
+        with timings.phase('parse'):
+            pass
+        self.assertIsNone(timings.stop())
+
+
+class InstrumentedCommandTestCase(unittest.TestCase):
+    """Test instrumentation of commands against the fake Sheets API server."""
+
+    def setUp(self):
+        self.server = FakeSheetsServer().start()
+        self.directory = tempfile.mkdtemp()
+        self.endpoint = os.environ.get(api.ENDPOINT_ENV_VAR)
+        os.environ[api.ENDPOINT_ENV_VAR] = self.server.url
+        main._output.lines = []
+
+    def tearDown(self):
+        del main._output.lines
+        if self.endpoint is None:
+            del os.environ[api.ENDPOINT_ENV_VAR]
+        else:
+            os.environ[api.ENDPOINT_ENV_VAR] = self.endpoint
+        shutil.rmtree(self.directory)
+        self.server.stop()
+
+    def run_cli(self, *arguments):
+        argv = sys.argv
+        sys.argv = ['stringsheet'] + list(arguments)
+        try:
+            cli.run(cli.parse_args())
+        finally:
+            sys.argv = argv
+
+    def test_counts_http_traffic(self):
+        traffic = api.get_traffic()
+        requests = traffic.requests
+        bytes_received = traffic.bytes_received
+        api.get_service()
+        self.assertEqual(requests + 1, traffic.requests)
+        self.assertGreater(traffic.bytes_received, bytes_received)
+
+    def test_writes_timings_of_phases(self):
+        path = os.path.join(self.directory, 'timings.json')
+        self.run_cli('create', 'Test', 'test-resources/res', '--timings',
+                     path)
+        with open(path) as f:
+            report = json.load(f)
+
+        self.assertEqual('create', report['command'])
+        phases = dict((phase['name'], phase) for phase in report['phases'])
+        for name in ['authenticate', 'parse', 'create_spreadsheet',
+                     'build_values', 'send_values', 'format']:
+            self.assertIn(name, phases)
+        self.assertEqual(3, report['api_requests'])
+        self.assertEqual(1, phases['send_values']['api_requests'])
+        self.assertGreater(phases['send_values']['bytes_sent'], 0)
+        self.assertEqual(0, phases['parse']['http_requests'])
+
+    def run_cli_capturing_stderr(self, *arguments):
+        stderr = sys.stderr
+        sys.stderr = io.StringIO() if sys.version_info[0] >= 3 \
+            else io.BytesIO()
+        try:
+            self.run_cli(*arguments)
+            return sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+
+    def test_timings_require_file(self):
+        with self.assertRaises(SystemExit):
+            self.run_cli_capturing_stderr('create', 'Test',
+                                          'test-resources/res', '--timings')
+
+    def test_writes_timings_to_standard_error(self):
+        output = self.run_cli_capturing_stderr(
+            'create', 'Test', 'test-resources/res', '--timings', '-')
+        self.assertEqual('create', json.loads(output)['command'])
+
+    def test_writes_profile(self):
+        path = os.path.join(self.directory, 'stats.prof')
+        self.run_cli('create', 'Test', 'test-resources/res', '--profile',
+                     path)
+        stats = pstats.Stats(path)
+        self.assertTrue(any(function[2] == 'create'
+                            for function in stats.stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from stringsheet.model import Resources
+from stringsheet.model import String
+from stringsheet.model import StringArray
+from stringsheet.parser import parse_resources
+from stringsheet.writer import get_strings_text
+from stringsheet.writer import write_strings_to_directory
+
+
+class WriteStringsTestCase(unittest.TestCase):
+    """Test that the writer only rewrites files which have changed."""
+
+    def setUp(self):
+        self.target_dir = tempfile.mkdtemp()
+        self.resources = parse_resources('test-resources/res')
+        self.languages = self.resources.languages()
+
+    def tearDown(self):
+        shutil.rmtree(self.target_dir)
+
+    def file_path(self, language):
+        return os.path.join(self.target_dir, 'values-' + language,
+                            'strings.xml')
+
+    def write(self, jobs=1):
+        results = write_strings_to_directory(self.resources, self.target_dir,
+                                             jobs)
+        return sum(1 for result in results if result.changed)
+
+    def test_writes_all_files(self):
+        num_changed = self.write()
+        self.assertEqual(len(self.languages), num_changed)
+        for language in self.languages:
+            with open(self.file_path(language), 'rb') as f:
+                self.assertEqual(get_strings_text(self.resources[language]),
+                                 f.read())
+
+    def test_skips_unchanged_files(self):
+        write_strings_to_directory(self.resources, self.target_dir)
+        file_path = self.file_path('pl')
+        os.utime(file_path, (0, 0))
+
+        num_changed = self.write()
+        self.assertEqual(0, num_changed)
+        self.assertEqual(0, os.path.getmtime(file_path))
+
+    def test_writes_changed_file(self):
+        write_strings_to_directory(self.resources, self.target_dir)
+        self.resources['de'].add_string(String('string', 'Changed', ''))
+
+        num_changed = self.write()
+        self.assertEqual(1, num_changed)
+        with open(self.file_path('de'), 'rb') as f:
+            self.assertIn(b'Changed', f.read())
+
+    def test_parallel_write_is_same(self):
+        self.assertEqual(len(self.languages), self.write(jobs=3))
+        self.assertEqual(0, self.write())
+        self.resources['pl'].add_string(String('string', 'Changed', ''))
+        self.assertEqual(1, self.write(jobs=3))
+
+    def test_reports_all_languages(self):
+        results = write_strings_to_directory(self.resources, self.target_dir,
+                                             jobs=2)
+        self.assertEqual(self.languages, [it.language for it in results])
+
+    def test_leaves_no_temporary_files(self):
+        write_strings_to_directory(self.resources, self.target_dir)
+        self.resources['de'].add_string(String('string', 'Changed', ''))
+        write_strings_to_directory(self.resources, self.target_dir)
+        self.assertEqual(['strings.xml'],
+                         os.listdir(os.path.dirname(self.file_path('de'))))
+
+    def test_new_files_use_umask_without_changing_it(self):
+        umask = os.umask(0o022)
+        os.umask(umask)
+
+        def fail(mask):
+            raise AssertionError('umask changed while writing')
+
+        umask_function = os.umask
+        os.umask = fail
+        try:
+            self.write()
+        finally:
+            os.umask = umask_function
+        self.assertEqual(0o666 & ~umask,
+                         os.stat(self.file_path('de')).st_mode & 0o777)
+
+
+class StringsTextTestCase(unittest.TestCase):
+    """Test that the streaming writer produces correctly formatted XML."""
+
+    def test_empty_resources_are_self_closing(self):
+        self.assertEqual(b"<?xml version='1.0' encoding='utf-8'?>\n"
+                         b"<resources/>\n",
+                         get_strings_text(Resources()))
+
+    def test_escapes_text_and_keeps_empty_items(self):
+        resources = Resources()
+        resources.add_string(String('string', 'A & <b>', ''))
+        array = StringArray('array', '')
+        array.add_item('Item', '')
+        array.add_item(None, '')
+        resources.add_array(array)
+        self.assertEqual(b"<?xml version='1.0' encoding='utf-8'?>\n"
+                         b"<resources>\n"
+                         b"\t<string name=\"string\">A &amp; &lt;b&gt;</string>\n"
+                         b"\t<string-array name=\"array\">\n"
+                         b"\t\t<item>Item</item>\n"
+                         b"\t\t<item/>\n"
+                         b"\t</string-array>\n"
+                         b"</resources>\n",
+                         get_strings_text(resources))
+
+
+if __name__ == '__main__':
+    unittest.main()